@@ -1,24 +1,47 @@
 import streamlit as st
-import importlib
-import os
+from datetime import datetime
 
 from theme_handler import selected_theme
-from kpi_design import render_kpi_card
-from utils.data_handler import load_all_data
-from utils.ui_controller import setup_sidebar, render_footer
+from utils.data_handler import (
+    DATA_FILES, DEBUG_MUTATION, StaleVersionError, current_versions, load_all_data, data_version, verify_unmodified,
+)
+from utils.report_cache import get_report_cache, report_cache_key
+from utils.query_engine import frame_data_files
+from utils.report_context import build_report_config
+from utils.report_registry import get_report_meta, load_report, required_data_files
+from utils.tracing import TRACE_ENABLED, finish_trace, span, start_trace
+from utils.ui_controller import (
+    select_report, setup_sidebar, render_chart, render_debug_panel, render_footer, render_kpis, render_metric_chart,
+)
+from utils.warmup import WARMUP_ENABLED, get_warmup_worker, record_usage
 
 selected_theme()
+if WARMUP_ENABLED:
+    get_warmup_worker()
 
-data_files = {
-    'employee_master': 'data/employee_master.xlsx',
-    'leave': 'data/HRMS_Leave.xlsx',
-    'sales': 'data/Sales_INR.xlsx'
-}
-data = load_all_data(data_files)
-emp_df = data['employee_master']
+# Only the datasets the selected report declares are loaded (with the SQL
+# engine only the employee master; the rest is queried from the database)
+selected_report = select_report()
+trace = start_trace(selected_report, enabled=TRACE_ENABLED or st.session_state.get("debug_trace", False),
+                    report=selected_report)
+report_meta = get_report_meta(selected_report)
+data_files = required_data_files(selected_report, DATA_FILES)
+with span("load_all_data") as s:
+    # One snapshot of the published data versions for the whole rerun
+    versions = current_versions(data_files)
+    try:
+        data = load_all_data(frame_data_files(data_files), versions)
+    except StaleVersionError:
+        st.rerun()  # A data file changed under this rerun: start over on the new version
+    emp_df = data['employee_master']
+    version = data_version(data_files, versions)
+    s.set(rows_out=len(emp_df))
 
-filtered_emp, filter_dict = setup_sidebar(emp_df)
+with span("setup_sidebar", rows_in=len(emp_df)) as s:
+    filtered_emp, filter_dict = setup_sidebar(emp_df, version, report_meta["filters"])
+    s.set(rows_out=len(filtered_emp))
 data['employee_master'] = filtered_emp
+record_usage(selected_report, filter_dict)
 
 st.markdown("""
     <div class="custom-header">
@@ -27,35 +50,54 @@ st.markdown("""
     </div>
     """, unsafe_allow_html=True)
 
-report_folder = "reports"
-report_modules = [f[:-3] for f in os.listdir(report_folder) if f.endswith(".py") and not f.startswith("_")]
-selected_report = st.session_state.get("selected_report")
-if not selected_report:
-    selected_report = report_modules[0]
-    st.session_state["selected_report"] = selected_report
-
 if selected_report:
-    mod = importlib.import_module(f"reports.{selected_report}")
+    mod = load_report(selected_report)
     if hasattr(mod, "run_report"):
-        report = mod.run_report(data, {})
-        st.title(selected_report.replace("_", " ").title())
-
-        # KPIs: 4 per row, wrap to next row
-        kpis = report.get("kpis", [])
-        for i in range(0, len(kpis), 4):
-            cols = st.columns(4)
-            for j, kpi in enumerate(kpis[i:i+4]):
-                with cols[j]:
-                    st.markdown(render_kpi_card(kpi["label"], kpi["value"], kpi.get("type", "Integer")), unsafe_allow_html=True)
-
-        # Charts: 2 per row, wrap to next row
-        charts = report.get("charts", [])
-        for i in range(0, len(charts), 2):
-            cols = st.columns(2)
-            for j, chart in enumerate(charts[i:i+2]):
-                with cols[j]:
-                    st.plotly_chart(chart, use_container_width=True)
+        # Reports that return a dict are served from the shared result cache;
+        # reports that render themselves ("cacheable": False) always run.
+        report_cache = get_report_cache()
+        cache_key = report_cache_key(selected_report, version, filter_dict, datetime.now())
+        report = report_cache.get(cache_key) if report_meta["cacheable"] else None
+        if trace is not None and report_meta["cacheable"]:
+            trace.attrs["report_cache"] = "miss" if report is None else "hit"
+        if report is None:
+            try:
+                config = build_report_config(emp_df, filter_dict, version, data_files, datetime.now(), versions)
+            except StaleVersionError:
+                st.rerun()
+            with span("run_report", rows_in=len(filtered_emp)):
+                report = mod.run_report(data, config)
+            # A report with failed chart steps is shown but not cached, so the next render retries them
+            if isinstance(report, dict) and report_meta["cacheable"] and not report.get("errors"):
+                report_cache.put(cache_key, report)
+            if DEBUG_MUTATION:
+                changed = verify_unmodified(frame_data_files(data_files), versions)
+                if changed:
+                    st.error(f"Report '{selected_report}' modified shared data in place: {', '.join(changed)}")
+
+        if isinstance(report, dict):
+            st.title(report_meta["title"])
+            if report.get("message"):
+                st.info(report["message"])
+            if report.get("errors"):
+                failed = ", ".join(f"{name} ({reason})" for name, reason in report["errors"].items())
+                st.warning(f"Some charts could not be computed and are not shown: {failed}")
+
+            # KPIs: one batched block, 4 per row
+            render_kpis(report.get("kpis", []))
+
+            # Charts: 2 per row, wrap to next row; chart data with a type choice is its own fragment
+            charts = report.get("charts", [])
+            for i in range(0, len(charts), 2):
+                cols = st.columns(2)
+                for j, chart in enumerate(charts[i:i+2]):
+                    with cols[j]:
+                        if isinstance(chart, dict):
+                            render_metric_chart(chart, f"{selected_report}_{chart['metric']}")
+                        else:
+                            render_chart(chart, f"{selected_report}_{i + j}")
     else:
         st.error(f"Report module '{selected_report}' must have a 'run_report(data, config)' function.")
 
+render_debug_panel(finish_trace(trace), get_report_cache().stats())
 render_footer()
@@ -0,0 +1,280 @@
+# batch_report.py
+
+"""
+Headless batch runner for registered reports.
+
+Runs a report that returns a dict (KPIs + figures) for many filter slices in
+a process pool and writes KPIs to CSV/Parquet and figures to static HTML.
+
+Examples:
+    python batch_report.py executive_summary_revised --product company department
+    python batch_report.py executive_summary_revised --filter zone=North,South --product band
+    python batch_report.py executive_summary_revised --slices-file slices.json --workers 8
+
+Each finished slice leaves a kpis/<slice_id>.json marker, so rerunning the
+same command skips completed slices (use --force to recompute them). The
+output directory records its report, data version and engine in run.json,
+and a run with a different report, data or engine refuses to reuse it.
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+from utils.chart_renderers import render_prepared
+from utils.columnar_store import cached_version
+from utils.data_handler import DATA_DIR, DATA_FILES, data_version, read_dataset
+from utils.filter_index import FilterIndex, filter_signature
+from utils.query_engine import ENGINES, frame_data_files
+from utils.report_context import build_report_config
+from utils.report_registry import discover_reports, load_report, required_data_files
+
+# Loaded once in the parent; forked workers share it read-only (copy-on-write)
+_STATE = {}
+
+RUN_MANIFEST = "run.json"
+
+
+def _load_state(report_name, data_dir, engine="pandas"):
+    data_files = {
+        key: os.path.join(data_dir, os.path.basename(path))
+        for key, path in required_data_files(report_name, DATA_FILES).items()
+    }
+    data = {key: read_dataset(key, path) for key, path in frame_data_files(data_files, engine).items()}
+    versions = {path: cached_version(path) for path in data_files.values()}
+    config = build_report_config(data["employee_master"], {}, data_version(data_files, versions), data_files,
+                                 datetime.now(), versions, engine)
+    _STATE.update(
+        report_name=report_name,
+        data=data,
+        index=FilterIndex(data["employee_master"]),
+        config={**config, "chart_workers": 1},
+    )
+
+
+def _init_worker(report_name, data_dir, engine):
+    if not _STATE:
+        _load_state(report_name, data_dir, engine)
+
+
+def check_run(out_dir, run):
+    """
+    Claim out_dir for run ({report, data_version, engine}): write its
+    manifest, or exit when the directory holds results of another run.
+    """
+    path = os.path.join(out_dir, RUN_MANIFEST)
+    if os.path.exists(path):
+        with open(path) as f:
+            previous = json.load(f)
+    elif os.path.isdir(os.path.join(out_dir, "kpis")) and os.listdir(os.path.join(out_dir, "kpis")):
+        previous = {}  # Results without a manifest: their run is unknown
+    else:
+        previous = None
+    if previous is not None and previous != run:
+        raise SystemExit(f"{out_dir} holds results of another run ({previous or 'unknown'}); "
+                         f"use a new --out for {run}")
+    os.makedirs(os.path.join(out_dir, "kpis"), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(run, f)
+
+
+def slice_id(filters):
+    """
+    Short stable identifier of a filter slice.
+    """
+    return hashlib.sha1(repr(filter_signature(filters)).encode()).hexdigest()[:12]
+
+
+def slice_label(filters):
+    return "; ".join(f"{dim}={'|'.join(map(str, values))}" for dim, values in filters.items() if values) or "All"
+
+
+def _check_dimension(dim, index):
+    if dim not in index.options:
+        raise SystemExit(f"Unknown filter '{dim}' (expected one of: {', '.join(index.options)})")
+
+
+def _parse_values(dim, items, index):
+    """
+    Map CLI or slices-file values (compared as text) to the actual category
+    values of dim.
+    """
+    _check_dimension(dim, index)
+    by_text = {str(value): value for value in index.options[dim]}
+    values = []
+    for item in items:
+        if str(item) not in by_text:
+            raise SystemExit(f"Unknown value '{item}' for filter '{dim}'")
+        values.append(by_text[str(item)])
+    return values
+
+
+def _parse_slice(entry, index):
+    if not isinstance(entry, dict):
+        raise SystemExit(f"Slice {entry!r} is not a {{dim: [values]}} object")
+    return {
+        dim: _parse_values(dim, values if isinstance(values, list) else [values], index)
+        for dim, values in entry.items()
+    }
+
+
+def build_slices(index, fixed=None, product=None, slices=None):
+    """
+    Combine fixed filters with either explicit slices or the cartesian
+    product of all values of the product dimensions. Unknown dimensions
+    or values exit with an error instead of selecting everyone or no one.
+    """
+    fixed = fixed or {}
+    if slices is not None:
+        return [{**fixed, **_parse_slice(entry, index)} for entry in slices]
+    product = product or []
+    for dim in product:
+        _check_dimension(dim, index)
+    combos = itertools.product(*[index.options[dim] for dim in product])
+    return [{**fixed, **{dim: [value] for dim, value in zip(product, combo)}} for combo in combos]
+
+
+def _run_slice(task):
+    filters, out_dir = task
+    sid = slice_id(filters)
+    marker = os.path.join(out_dir, "kpis", f"{sid}.json")
+
+    data = dict(_STATE["data"])
+    data["employee_master"] = _STATE["index"].apply(data["employee_master"], filters)
+    try:
+        mod = load_report(_STATE["report_name"])
+        report = mod.run_report(data, {**_STATE["config"], "filters": filters})
+    except Exception as exc:
+        return sid, repr(exc)
+    if not isinstance(report, dict):
+        return sid, "report does not return a dict; it cannot run headless"
+    if report.get("errors"):
+        # No marker is written, so a rerun of the batch retries this slice
+        return sid, f"charts failed: {report['errors']}"
+
+    figure_dir = os.path.join(out_dir, "figures", sid)
+    os.makedirs(figure_dir, exist_ok=True)
+    for i, chart in enumerate(report.get("charts", [])):
+        # Prepared chart data is written in its default chart type
+        fig = render_prepared(chart) if isinstance(chart, dict) else chart
+        if fig is None:
+            continue
+        fig.write_html(os.path.join(figure_dir, f"{i:02d}.html"), include_plotlyjs="cdn")
+
+    label = slice_label(filters)
+    rows = [
+        {
+            "slice_id": sid,
+            "slice": label,
+            **{dim: "|".join(map(str, values)) for dim, values in filters.items()},
+            "kpi": kpi["label"],
+            "value": float(kpi["value"]),
+            "type": kpi.get("type", "Integer"),
+        }
+        for kpi in report.get("kpis", [])
+    ]
+    tmp_path = marker + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(rows, f)
+    os.replace(tmp_path, marker)
+    return sid, None
+
+
+def collect_kpis(out_dir, formats):
+    """
+    Merge the per-slice KPI files into kpis.csv / kpis.parquet.
+    """
+    kpi_dir = os.path.join(out_dir, "kpis")
+    rows = []
+    for filename in sorted(os.listdir(kpi_dir)):
+        if filename.endswith(".json"):
+            with open(os.path.join(kpi_dir, filename)) as f:
+                rows.extend(json.load(f))
+    df = pd.DataFrame(rows)
+    if "csv" in formats:
+        df.to_csv(os.path.join(out_dir, "kpis.csv"), index=False)
+    if "parquet" in formats:
+        df.to_parquet(os.path.join(out_dir, "kpis.parquet"), index=False)
+    return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a Worklense report for many filter slices.")
+    parser.add_argument("report", help="Report module name, e.g. executive_summary_revised")
+    parser.add_argument("--product", nargs="*", default=[], metavar="DIM",
+                        help="Dimensions to expand into one slice per value combination")
+    parser.add_argument("--filter", action="append", default=[], metavar="DIM=V1,V2",
+                        help="Filter applied to every slice (repeatable)")
+    parser.add_argument("--slices-file", help="JSON list of {dim: [values]} slices")
+    parser.add_argument("--out", default="batch_output", help="Output directory")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Directory holding the data files")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--format", nargs="+", choices=["csv", "parquet"], default=["csv"])
+    parser.add_argument("--engine", choices=ENGINES, default="pandas",
+                        help="Query engine for the report group-bys (see utils/query_engine.py)")
+    parser.add_argument("--force", action="store_true", help="Recompute slices that are already done")
+    args = parser.parse_args(argv)
+
+    if args.report not in discover_reports():
+        parser.error(f"Unknown report '{args.report}'")
+
+    _load_state(args.report, args.data_dir, args.engine)
+    index = _STATE["index"]
+    fixed = {}
+    for item in args.filter:
+        dim, _, text = item.partition("=")
+        fixed[dim] = _parse_values(dim, text.split(","), index)
+    slices = None
+    if args.slices_file:
+        with open(args.slices_file) as f:
+            slices = json.load(f)
+        if not isinstance(slices, list):
+            raise SystemExit(f"{args.slices_file} must hold a JSON list of {{dim: [values]}} slices")
+    all_slices = build_slices(index, fixed, args.product, slices)
+
+    check_run(args.out, {"report": args.report, "data_version": _STATE["config"]["data_version"],
+                         "engine": args.engine})
+    pending = [
+        s for s in all_slices
+        if args.force or not os.path.exists(os.path.join(args.out, "kpis", f"{slice_id(s)}.json"))
+    ]
+    total, done = len(all_slices), len(all_slices) - len(pending)
+    print(f"{args.report}: {total} slices, {done} already done, {len(pending)} to run", flush=True)
+
+    tasks = [(s, args.out) for s in pending]
+    failures = []
+    if args.workers <= 1 or len(tasks) <= 1:
+        results = map(_run_slice, tasks)
+        pool = None
+    else:
+        # fork shares the parent's loaded data with the workers; other start
+        # methods load it once per worker in the initializer instead.
+        method = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+        pool = multiprocessing.get_context(method).Pool(
+            args.workers, initializer=_init_worker, initargs=(args.report, args.data_dir, args.engine)
+        )
+        results = pool.imap_unordered(_run_slice, tasks)
+    try:
+        for sid, error in results:
+            done += 1
+            if error:
+                failures.append(sid)
+            print(f"[{done}/{total}] {sid}" + (f" FAILED: {error}" if error else ""), flush=True)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    collect_kpis(args.out, args.format)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,383 @@
+# benchmarks/load_test.py
+
+"""
+Concurrent-session load test for app.py.
+
+Starts one or more `streamlit run app.py` servers (--workers) and drives N
+simulated sessions against them over Streamlit's websocket protocol, the
+same way browsers do: each session sends rerun requests carrying its widget
+states and waits for the script_finished message. Sessions follow seeded
+random scripts of sidebar actions (switch report, pick or clear filter
+values, change chart style), optionally with think time between steps.
+
+Reported per run:
+
+* rerun latency (request sent -> script finished) p50/p95/p99/max, overall
+  and per action, and the bytes each rerun sent back;
+* throughput: completed reruns per second of the timed phase;
+* per-server resident memory: idle after a warm-up session has visited
+  every report, peak while the sessions run, and the growth per session.
+
+AppTest is not used for the concurrent sessions because it is not safe to
+drive several instances from threads of one process; a real server also
+measures the websocket and serialization cost of each rerun.
+
+Examples:
+    python -m benchmarks.load_test --sessions 20 --steps 15
+    python -m benchmarks.load_test --rows 200k --sessions 50 --workers 2 --think 1.0
+    python -m benchmarks.load_test --url ws://localhost:8501 --sessions 10 --output load.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+
+import numpy as np
+import pandas as pd
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from websockets.asyncio.client import connect
+
+from benchmarks.synthetic_data import generate_datasets, parse_size, write_datasets
+
+REPORT_LABEL = "Select Report"
+STYLE_LABEL = "Chart Style (Plotly Theme)"
+SIDEBAR = 1  # first element of a sidebar delta path
+
+# Relative frequency of each scripted action
+ACTION_WEIGHTS = {"filter": 0.55, "clear": 0.15, "report": 0.2, "style": 0.1}
+PERCENTILES = (50, 95, 99)
+
+
+def _rss_mb(pid):
+    """
+    Resident memory of process pid in MB (Linux /proc), or None.
+    """
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class Server:
+    """
+    A `streamlit run` process serving the app on one port.
+    """
+
+    def __init__(self, app, port, data_dir=None):
+        self.app = app
+        self.port = port
+        self.url = f"ws://127.0.0.1:{port}"
+        env = dict(os.environ)
+        if data_dir:
+            env["WORKLENSE_DATA_DIR"] = data_dir
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "streamlit", "run", app,
+             "--server.headless", "true", "--server.port", str(port),
+             "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false"],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        self.idle_mb = None
+        self.peak_mb = None
+
+    def wait_ready(self, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Streamlit server on port {self.port} exited with {self.process.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{self.port}/_stcore/health", timeout=1):
+                    return
+            except OSError:
+                time.sleep(0.25)
+        raise TimeoutError(f"Streamlit server on port {self.port} did not start within {timeout}s")
+
+    def rss_mb(self):
+        return _rss_mb(self.process.pid)
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+class Session:
+    """
+    One simulated browser session: its widget values and the sidebar
+    widgets rendered by the last run.
+    """
+
+    def __init__(self, ws, rng):
+        self.ws = ws
+        self.rng = rng
+        self.values = {}   # widget id -> (value field, value)
+        self.widgets = {}  # label -> (kind, widget id, options)
+
+    async def rerun(self):
+        """
+        Send a rerun with the current widget values and wait for it to
+        finish. Returns (latency seconds, bytes received, exceptions shown).
+        """
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        for widget_id, (field, value) in self.values.items():
+            state = msg.rerun_script.widget_states.widgets.add()
+            state.id = widget_id
+            if field == "string_array_value":
+                state.string_array_value.data.extend(value)
+            else:
+                setattr(state, field, value)
+
+        start = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        widgets, received, errors = {}, 0, 0
+        while True:
+            data = await self.ws.recv()
+            received += len(data)
+            forward = ForwardMsg.FromString(data)
+            kind = forward.WhichOneof("type")
+            if kind == "script_finished":
+                break
+            if kind != "delta" or forward.delta.WhichOneof("type") != "new_element":
+                continue
+            element = forward.delta.new_element
+            name = element.WhichOneof("type")
+            if name == "exception":
+                errors += 1
+            elif name in ("selectbox", "multiselect") and forward.metadata.delta_path[:1] == [SIDEBAR]:
+                widget = getattr(element, name)
+                widgets[widget.label] = (name, widget.id, list(widget.options))
+        latency = time.perf_counter() - start
+
+        self.widgets = widgets
+        live = {widget_id for _, widget_id, _ in widgets.values()}
+        self.values = {k: v for k, v in self.values.items() if k in live}
+        return latency, received, errors
+
+    def _set(self, label, field, value):
+        self.values[self.widgets[label][1]] = (field, value)
+
+    def next_action(self):
+        """
+        Pick and apply a scripted action; returns its name.
+        """
+        filters = [label for label, (kind, _, options) in self.widgets.items() if kind == "multiselect" and options]
+        selected = [label for label in filters if self.values.get(self.widgets[label][1], (None, []))[1]]
+        choices = {
+            "filter": bool(filters),
+            "clear": bool(selected),
+            "report": REPORT_LABEL in self.widgets,
+            "style": STYLE_LABEL in self.widgets,
+        }
+        actions = [a for a, ok in choices.items() if ok]
+        if not actions:
+            return "rerun"
+        action = self.rng.choices(actions, weights=[ACTION_WEIGHTS[a] for a in actions])[0]
+        if action == "filter":
+            label = self.rng.choice(filters)
+            options = self.widgets[label][2]
+            self._set(label, "string_array_value", self.rng.sample(options, min(len(options), self.rng.randint(1, 2))))
+        elif action == "clear":
+            self._set(self.rng.choice(selected), "string_array_value", [])
+        else:
+            label = REPORT_LABEL if action == "report" else STYLE_LABEL
+            self._set(label, "string_value", self.rng.choice(self.widgets[label][2]))
+        return action
+
+
+async def _open(url):
+    return await connect(f"{url}/_stcore/stream", subprotocols=["streamlit"], max_size=None)
+
+
+async def warm_up(url):
+    """
+    Visit every report once so the servers' shared caches are loaded before timing.
+    """
+    ws = await _open(url)
+    try:
+        session = Session(ws, random.Random(0))
+        await session.rerun()
+        for option in session.widgets.get(REPORT_LABEL, (None, None, []))[2]:
+            session._set(REPORT_LABEL, "string_value", option)
+            await session.rerun()
+    finally:
+        await ws.close()
+
+
+async def run_session(index, url, steps, seed, think, delay, records):
+    rng = random.Random(seed * 100_003 + index)
+    await asyncio.sleep(delay)
+    ws = await _open(url)
+    try:
+        session = Session(ws, rng)
+        action = "load"
+        for step in range(steps + 1):
+            latency, received, errors = await session.rerun()
+            records.append({
+                "session": index, "server": url, "step": step, "action": action,
+                "latency_ms": latency * 1000, "bytes": received, "errors": errors, "finished": time.perf_counter(),
+            })
+            if think:
+                await asyncio.sleep(rng.expovariate(1 / think))
+            action = session.next_action()
+    finally:
+        await ws.close()
+
+
+async def _sample_memory(servers, stop, interval=0.25):
+    while not stop.is_set():
+        for server in servers:
+            rss = server.rss_mb()
+            if rss is not None:
+                server.peak_mb = max(server.peak_mb or 0, rss)
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_load(urls, sessions, steps, seed=0, think=0.0, ramp=0.0, servers=()):
+    """
+    Run sessions spread round-robin over urls; returns (records, wall seconds).
+    """
+    for url in urls:
+        await warm_up(url)
+    for server in servers:
+        server.idle_mb = server.rss_mb()
+
+    records = []
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(_sample_memory(servers, stop))
+    start = time.perf_counter()
+    results = await asyncio.gather(*[
+        run_session(i, urls[i % len(urls)], steps, seed, think, ramp * i / max(sessions, 1), records)
+        for i in range(sessions)
+    ], return_exceptions=True)
+    wall = time.perf_counter() - start
+    stop.set()
+    await sampler
+    failed = [r for r in results if isinstance(r, BaseException)]
+    if failed:
+        print(f"{len(failed)} session(s) failed: {failed[0]!r}", file=sys.stderr)
+    return records, wall
+
+
+def summarize(records, wall, servers=(), sessions=0):
+    """
+    Latency percentiles, throughput and memory as a dict.
+    """
+    frame = pd.DataFrame(records)
+    if frame.empty:
+        return {"reruns": 0}
+
+    def latency_stats(latency):
+        stats = {f"p{p}_ms": round(float(np.percentile(latency, p)), 1) for p in PERCENTILES}
+        stats["max_ms"] = round(float(latency.max()), 1)
+        stats["count"] = int(len(latency))
+        return stats
+
+    per_server = max(sessions // max(len(servers), 1), 1)
+    return {
+        "reruns": int(len(frame)),
+        "sessions": int(frame["session"].nunique()),
+        "wall_s": round(wall, 2),
+        "throughput_rps": round(len(frame) / wall, 2) if wall else None,
+        "errors": int(frame["errors"].sum()),
+        "mean_kb": round(frame["bytes"].mean() / 1024, 1),
+        "latency": latency_stats(frame["latency_ms"]),
+        "by_action": {action: latency_stats(part["latency_ms"]) for action, part in frame.groupby("action")},
+        "servers": [
+            {
+                "port": server.port,
+                "idle_mb": round(server.idle_mb, 1) if server.idle_mb else None,
+                "peak_mb": round(server.peak_mb, 1) if server.peak_mb else None,
+                "per_session_mb": round((server.peak_mb - server.idle_mb) / per_server, 2)
+                if server.peak_mb and server.idle_mb else None,
+            }
+            for server in servers
+        ],
+    }
+
+
+def format_summary(summary):
+    if not summary.get("reruns"):
+        return "No reruns completed"
+    lat = summary["latency"]
+    lines = [
+        f"{summary['sessions']} sessions, {summary['reruns']} reruns in {summary['wall_s']}s "
+        f"-> {summary['throughput_rps']} reruns/s, {summary['errors']} errors, {summary['mean_kb']} KB/rerun",
+        f"latency p50 {lat['p50_ms']:,.0f} ms  p95 {lat['p95_ms']:,.0f} ms  "
+        f"p99 {lat['p99_ms']:,.0f} ms  max {lat['max_ms']:,.0f} ms",
+    ]
+    for action, stats in summary["by_action"].items():
+        lines.append(f"  {action:<7} n={stats['count']:<5} p50 {stats['p50_ms']:>8,.0f} ms  "
+                     f"p95 {stats['p95_ms']:>8,.0f} ms  p99 {stats['p99_ms']:>8,.0f} ms")
+    for server in summary["servers"]:
+        lines.append(f"server :{server['port']}: idle {server['idle_mb']} MB, peak {server['peak_mb']} MB, "
+                     f"{server['per_session_mb']} MB/session")
+    return "\n".join(lines)
+
+
+def synthetic_data_dir(rows, seed):
+    """
+    Directory with synthetic xlsx data of this size, generated on first use.
+    """
+    out_dir = os.path.join("data", "synthetic", f"{rows}-seed{seed}")
+    if not os.path.exists(os.path.join(out_dir, "employee_master.xlsx")):
+        print(f"Generating {rows:,} synthetic employees in {out_dir} ...", flush=True)
+        write_datasets(generate_datasets(rows, seed), out_dir)
+    return out_dir
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test app.py with concurrent simulated sessions.")
+    parser.add_argument("--sessions", type=int, default=10, help="Concurrent sessions")
+    parser.add_argument("--steps", type=int, default=20, help="Scripted actions per session after the first load")
+    parser.add_argument("--workers", type=int, default=1, help="Streamlit server processes to start")
+    parser.add_argument("--port", type=int, default=8700, help="Port of the first server")
+    parser.add_argument("--think", type=float, default=0.0, help="Mean think time between actions (s)")
+    parser.add_argument("--ramp", type=float, default=0.0, help="Spread session starts over this many seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", help="Data directory for the servers (WORKLENSE_DATA_DIR)")
+    parser.add_argument("--rows", type=parse_size, help="Use synthetic data of this many employees")
+    parser.add_argument("--url", action="append", default=[],
+                        help="Drive an already running server instead (ws://host:port, repeatable)")
+    parser.add_argument("--app", default="app.py")
+    parser.add_argument("--output", help="Write the summary and raw reruns to this JSON file")
+    args = parser.parse_args(argv)
+
+    data_dir = synthetic_data_dir(args.rows, args.seed) if args.rows else args.data_dir
+    servers = []
+    try:
+        if not args.url:
+            servers = [Server(args.app, args.port + i, data_dir) for i in range(args.workers)]
+            for server in servers:
+                server.wait_ready()
+        urls = args.url or [server.url for server in servers]
+        records, wall = asyncio.run(run_load(urls, args.sessions, args.steps, args.seed, args.think, args.ramp, servers))
+    finally:
+        for server in servers:
+            server.stop()
+
+    summary = summarize(records, wall, servers, args.sessions)
+    print(format_summary(summary))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"summary": summary, "reruns": records}, f, indent=2)
+    return 0 if summary.get("reruns") and not summary["errors"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,314 @@
+# benchmarks/run_benchmarks.py
+
+"""
+Offline micro-benchmarks for the report hot paths.
+
+Each case in BENCHMARKS is registered with @benchmark(name) and builds, from
+a Fixture (synthetic data of one size, see benchmarks/synthetic_data.py), a
+zero-argument callable for one hot function: sidebar filtering, KPI
+evaluation, the manpower charts, the distribution prepares and a full
+report run. Setup (data generation, schema normalization, prebuilt indexes)
+is not timed.
+
+For every case and size the runner records the median and best wall time
+over --repeat calls (after one warm-up call) and the peak traced allocation
+of one extra call (tracemalloc, so NumPy buffers are included). Results are
+compared against a baseline JSON file; a case regresses when its median time
+or peak memory exceeds the baseline by more than --tolerance, and the exit
+status is 1 so the run can gate a change. Baselines are machine-specific:
+record one with --save-baseline on the machine you compare on.
+
+Examples:
+    python -m benchmarks.run_benchmarks --save-baseline
+    python -m benchmarks.run_benchmarks --sizes 10k 100k 1m --only kpis filter
+    python -m benchmarks.run_benchmarks --sizes 5m --repeat 3 --output bench.json
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_data import generate_datasets, parse_size
+from reports import executive_summary_revised as revised
+from utils.chart_logic import prepare_manpower_charts
+from utils.data_handler import normalize_dataset
+from utils.filter_index import FilterIndex
+from utils.report_context import ReportContext
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+# Differences below these are never reported as regressions
+NOISE_FLOOR_MS = 1.0
+NOISE_FLOOR_MB = 1.0
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """
+    Register a case: fn(fixture) -> zero-argument callable to time.
+    """
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+class Fixture:
+    """
+    Synthetic datasets of one size, normalized like utils/data_handler loads them.
+    """
+
+    def __init__(self, rows, seed=0, now="2025-04-30"):
+        self.rows = rows
+        self.now = pd.Timestamp(now)
+        self.data = {
+            key: normalize_dataset(key, df)
+            for key, df in generate_datasets(rows, seed, self.now).items()
+        }
+        self.fy_list = revised.get_last_fy_list(self.context().current_fy, n=5)
+
+    @property
+    def employees(self):
+        return self.data["employee_master"]
+
+    def context(self, employees=None, config=None):
+        """
+        Fresh ReportContext (its derived columns are computed on first use).
+        """
+        data = dict(self.data)
+        if employees is not None:
+            data["employee_master"] = employees
+        return ReportContext(data, config or {}, self.now)
+
+    @cached_property
+    def filter_index(self):
+        return FilterIndex(self.employees)
+
+    @cached_property
+    def selection(self):
+        """
+        A typical sidebar selection: the two largest departments in one zone.
+        """
+        departments = self.employees["department"].value_counts().index[:2].tolist()
+        return {"department": departments, "zone": [self.employees["zone"].mode()[0]]}
+
+    @cached_property
+    def filtered(self):
+        return self.filter_index.apply(self.employees, self.selection)
+
+
+@benchmark("filter_index_build")
+def bench_filter_index_build(fx):
+    return lambda: FilterIndex(fx.employees)
+
+
+@benchmark("setup_sidebar_filter")
+def bench_setup_sidebar_filter(fx):
+    # The data path of ui_controller.setup_sidebar (widgets excluded)
+    index, selection = fx.filter_index, fx.selection
+    return lambda: index.apply(fx.employees, selection)
+
+
+@benchmark("calc_kpis")
+def bench_calc_kpis(fx):
+    return lambda: revised.calc_kpis(fx.employees, fx.fy_list, fx.now)
+
+
+@benchmark("calc_kpis_filtered")
+def bench_calc_kpis_filtered(fx):
+    filtered = fx.filtered
+    return lambda: revised.calc_kpis(filtered, fx.fy_list, fx.now)
+
+
+@benchmark("prepare_manpower_charts")
+def bench_prepare_manpower_charts(fx):
+    return lambda: prepare_manpower_charts(fx.employees, fx.fy_list, fx.now)
+
+
+def _distribution_case(name):
+    prepare = getattr(revised, f"prepare_{name}_distribution")
+
+    def case(fx):
+        return lambda: prepare(fx.context())
+    benchmark(f"prepare_{name}_distribution")(case)
+
+
+for _name in ("age", "tenure", "experience", "education", "salary"):
+    _distribution_case(_name)
+
+
+@benchmark("run_report_revised")
+def bench_run_report(fx):
+    # End to end on one thread, so the numbers do not depend on core count
+    config = {"filters": fx.selection, "chart_workers": 1}
+    return lambda: revised.run_report({**fx.data, "employee_master": fx.filtered}, config)
+
+
+def time_call(fn, repeat):
+    """
+    (median ms, best ms) of repeat calls after one warm-up call.
+    """
+    fn()
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), min(times)
+
+
+def peak_memory(fn):
+    """
+    Peak traced allocation (MB) of one call.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1e6
+
+
+def run_benchmarks(sizes, cases=None, repeat=5, seed=0, log=print):
+    """
+    Run cases (names, default all) at each size; returns a list of result dicts.
+    """
+    results = []
+    for rows in sizes:
+        start = time.perf_counter()
+        fx = Fixture(rows, seed)
+        log(f"{rows:,} employees: generated in {time.perf_counter() - start:.1f}s "
+            f"({len(fx.data['leave']):,} leave, {len(fx.data['sales']):,} sales rows)")
+        for name in cases or BENCHMARKS:
+            fn = BENCHMARKS[name](fx)
+            median_ms, best_ms = time_call(fn, repeat)
+            results.append({
+                "case": name,
+                "rows": rows,
+                "median_ms": round(median_ms, 3),
+                "best_ms": round(best_ms, 3),
+                "peak_mb": round(peak_memory(fn), 3),
+            })
+        del fx
+        gc.collect()
+    return results
+
+
+def result_key(result):
+    return f"{result['case']}@{result['rows']}"
+
+
+def compare(results, baseline, tolerance):
+    """
+    Annotate results with ratios to the baseline; returns the regressed ones.
+    """
+    previous = {result_key(r): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        base = previous.get(result_key(r))
+        if base is None:
+            continue
+        r["time_ratio"] = round(r["median_ms"] / base["median_ms"], 3) if base["median_ms"] else None
+        r["mem_ratio"] = round(r["peak_mb"] / base["peak_mb"], 3) if base["peak_mb"] else None
+        slower = (r["median_ms"] > base["median_ms"] * (1 + tolerance)
+                  and r["median_ms"] - base["median_ms"] > NOISE_FLOOR_MS)
+        bigger = r["peak_mb"] > base["peak_mb"] * (1 + tolerance) and r["peak_mb"] - base["peak_mb"] > NOISE_FLOOR_MB
+        if slower or bigger:
+            regressions.append(r)
+    return regressions
+
+
+def environment():
+    return {
+        "recorded": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def format_table(results):
+    table = pd.DataFrame(results)
+    for col in ("time_ratio", "mem_ratio"):
+        if col not in table:
+            table[col] = np.nan
+    table["rows"] = table["rows"].map("{:,}".format)
+    return table[["case", "rows", "median_ms", "best_ms", "peak_mb", "time_ratio", "mem_ratio"]].to_string(
+        index=False, na_rep="-", float_format=lambda v: f"{v:,.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Worklense report hot paths on synthetic data.")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, type=parse_size,
+                        help="Employee master sizes, e.g. 10k 100k 1m 5m")
+    parser.add_argument("--only", nargs="*", default=[], metavar="PATTERN",
+                        help="Run only cases whose name matches one of these regexes")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed calls per case")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown / memory growth over the baseline (0.25 = 25%%)")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    parser.add_argument("--list", action="store_true", help="List the cases and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return 0
+    cases = [name for name in BENCHMARKS if not args.only or any(re.search(p, name) for p in args.only)]
+    if not cases:
+        parser.error("No benchmark matches --only")
+
+    logging.getLogger("utils.data_handler").setLevel(logging.WARNING)
+    results = run_benchmarks(args.sizes, cases, args.repeat, args.seed)
+
+    regressions = []
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+    print(format_table(results))
+
+    report = {"environment": environment(), "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        # Cases and sizes not run this time keep their previous baseline
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                kept = {result_key(r): r for r in json.load(f).get("results", [])}
+            kept.update({result_key(r): r for r in results})
+            report["results"] = list(kept.values())
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+    elif regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.tolerance:.0%} against {args.baseline}:")
+        for r in regressions:
+            print(f"  {result_key(r)}: time x{r['time_ratio']}, memory x{r['mem_ratio']}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,302 @@
+# benchmarks/synthetic_data.py
+
+"""
+Seeded synthetic HR data for benchmarks and local runs.
+
+Generates the three datasets of utils/data_handler.DATA_FILES with the
+columns the reports read:
+
+* employee_master: one row per employee. Join dates follow a workforce that
+  grows by GROWTH per year, exits follow an early-leaver / long-stayer
+  mixture (so attrition is front-loaded in tenure and higher in some
+  functions), and the dimensions are skewed (a few large departments and
+  areas, a band pyramid) and nested (business units per company, areas per
+  zone) like a real org.
+* leave: leave spells of employees in the last LEAVE_YEARS years, mostly
+  one or two days, never outside the employee's service.
+* sales: transactions per cost center over the last SALES_YEARS years,
+  with cost centers taken from the employee master so the sales report can
+  join them.
+
+Everything is vectorized (a few seconds per million employees), and the same
+(rows, seed, today) always produces the same frames.
+
+Examples:
+    python -m benchmarks.synthetic_data 100000 --out data/synthetic
+    python -m benchmarks.synthetic_data 5000000 --out /tmp/worklense --format parquet
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+GROWTH = 0.12  # headcount growth per year
+HISTORY_YEARS = 20
+LEAVE_YEARS = 2
+SALES_YEARS = 2
+EXCEL_MAX_ROWS = 1_048_575
+
+FILE_NAMES = {
+    "employee_master": "employee_master",
+    "leave": "HRMS_Leave",
+    "sales": "Sales_INR",
+}
+
+COMPANIES = ["Brightlane", "Rapidstar", "Yarrowtech"]
+BUSINESS_UNITS = ["Retail", "Enterprise", "Digital", "Services"]  # per company
+FUNCTIONS = ["Sales", "Operations", "Technology", "Finance", "Human Resources", "Marketing"]
+DEPARTMENTS = [
+    "Field Sales", "Inside Sales", "Customer Support", "Logistics", "Engineering",
+    "Data", "Infrastructure", "Accounts", "Treasury", "Talent", "Payroll", "Brand",
+]
+ZONES = ["North", "South", "East", "West"]
+AREAS = ["Delhi", "Jaipur", "Lucknow", "Bangalore", "Chennai", "Hyderabad",
+         "Kolkata", "Bhubaneswar", "Mumbai", "Pune", "Ahmedabad", "Indore"]
+BANDS = ["B1", "B2", "B3", "B4", "B5", "B6"]
+EMPLOYMENT_TYPES = ["Permanent", "Contract"]
+GENDERS = ["Male", "Female"]
+QUALIFICATIONS = ["Graduate", "Post Graduate", "Diploma", "Professional", "Doctorate"]
+LEAVE_TYPES = ["Casual Leave", "Annual Leave", "Sick Leave", "Maternity Leave"]
+
+# Department -> function (index into FUNCTIONS); area -> zone (index into ZONES)
+DEPARTMENT_FUNCTION = [0, 0, 1, 1, 2, 2, 2, 3, 3, 4, 4, 5]
+AREA_ZONE = [0, 0, 0, 1, 1, 1, 2, 2, 3, 3, 3, 2]
+
+BAND_WEIGHTS = [0.38, 0.27, 0.17, 0.10, 0.06, 0.02]
+BAND_MEDIAN_CTC = [360_000, 620_000, 1_050_000, 1_900_000, 3_400_000, 6_500_000]
+BAND_AGE_AT_JOIN = [23, 27, 31, 35, 40, 45]
+# Relative speed of leaving per function (Sales churns, Finance stays)
+FUNCTION_ATTRITION = [1.6, 1.2, 1.0, 0.7, 0.8, 1.1]
+
+
+def zipf_weights(n, s=1.1):
+    """
+    Normalized Zipf weights 1/k^s for k = 1..n (a few large categories).
+    """
+    weights = 1.0 / np.arange(1, n + 1) ** s
+    return weights / weights.sum()
+
+
+def _categorical(codes, categories):
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+
+def _days(values):
+    return pd.TimedeltaIndex(np.asarray(values).astype("int64").astype("timedelta64[D]").astype("timedelta64[s]"))
+
+
+def generate_employee_master(n, seed=0, today=None):
+    """
+    n employees (past and present) as of today (default: 2025-04-30).
+    """
+    rng = np.random.default_rng(seed)
+    today = pd.Timestamp(today or "2025-04-30").normalize()
+    start = today - pd.DateOffset(years=HISTORY_YEARS)
+    span_days = (today - start).days
+
+    # Join dates: inverse CDF of an exponentially growing hiring rate
+    growth = np.log1p(GROWTH)
+    u = rng.random(n)
+    years_after_start = np.log1p(u * np.expm1(growth * HISTORY_YEARS)) / growth
+    joined = np.minimum((years_after_start * 365.25).astype("int64"), span_days)
+    date_of_joining = start + _days(joined)
+
+    company = rng.choice(len(COMPANIES), n, p=[0.55, 0.30, 0.15])
+    business_unit = company * len(BUSINESS_UNITS) + rng.choice(len(BUSINESS_UNITS), n, p=zipf_weights(len(BUSINESS_UNITS)))
+    department = rng.choice(len(DEPARTMENTS), n, p=zipf_weights(len(DEPARTMENTS), 0.9))
+    function = np.asarray(DEPARTMENT_FUNCTION)[department]
+    area = rng.choice(len(AREAS), n, p=zipf_weights(len(AREAS), 0.8))
+    zone = np.asarray(AREA_ZONE)[area]
+    band = rng.choice(len(BANDS), n, p=BAND_WEIGHTS)
+    employment_type = (rng.random(n) < np.where(band == 0, 0.25, 0.05)).astype(np.int8)
+
+    # Time to exit: 35% early leavers (exponential, ~1 year), the rest long
+    # stayers (Weibull, ~7 years); contractors and high-churn functions sooner
+    early = rng.random(n) < 0.35
+    years_to_exit = np.where(early, rng.exponential(1.0, n), 7.0 * rng.weibull(1.5, n))
+    years_to_exit /= np.asarray(FUNCTION_ATTRITION)[function] * np.where(employment_type == 1, 2.0, 1.0)
+    exit_days = joined + np.maximum((years_to_exit * 365.25).astype("int64"), 30)
+    exited = exit_days < span_days
+    date_of_exit = pd.Series(start + _days(np.minimum(exit_days, span_days))).where(exited)
+
+    age_at_join = np.asarray(BAND_AGE_AT_JOIN)[band] + rng.gamma(2.0, 2.0, n)
+    date_of_birth = date_of_joining - _days(age_at_join * 365.25)
+    prior_exp = np.clip(age_at_join - 22 + rng.normal(0, 1.0, n), 0, None)
+    service_days = np.where(exited, exit_days, span_days) - joined
+    total_exp_yrs = np.round(prior_exp + service_days / 365.25, 1)
+
+    ctc = np.asarray(BAND_MEDIAN_CTC)[band] * rng.lognormal(0.0, 0.25, n)
+    ctc *= 1.03 ** (service_days / 365.25)  # annual increments
+    total_ctc_pa = (np.round(ctc, -3)).astype("int64")
+
+    female = rng.random(n) < np.where(np.isin(department, [2, 9, 11]), 0.5, 0.3)
+    qualification = rng.choice(len(QUALIFICATIONS), n, p=[0.48, 0.30, 0.12, 0.08, 0.02])
+
+    # Cost centers follow the sales extract's format: company-function-zone-band-type-area.
+    # Strings are built once per distinct combination, not per row.
+    parts = [
+        (company, [c[:2].upper() for c in COMPANIES]),
+        (function, [f[:3].upper() for f in FUNCTIONS]),
+        (zone, [z[:2].upper() for z in ZONES]),
+        (band // 2, ["A", "B", "C"]),
+        (employment_type, ["X", "Y"]),
+        (area, [a[:3].upper() for a in AREAS]),
+    ]
+    combo = np.zeros(n, dtype="int64")
+    for codes, labels in parts:
+        combo = combo * len(labels) + codes
+    combos, cost_center = np.unique(combo, return_inverse=True)
+    names = []
+    for value in combos:
+        labels = []
+        for codes, part in reversed(parts):
+            value, code = divmod(int(value), len(part))
+            labels.append(part[code])
+        names.append("-".join(reversed(labels)))
+
+    return pd.DataFrame({
+        "employee_id": np.arange(1, n + 1, dtype="int64"),
+        "date_of_joining": date_of_joining,
+        "date_of_exit": date_of_exit,
+        "date_of_birth": date_of_birth,
+        "total_ctc_pa": total_ctc_pa,
+        "total_exp_yrs": total_exp_yrs,
+        "gender": _categorical(female.astype(np.int8), GENDERS),
+        "qualification_type": _categorical(qualification, QUALIFICATIONS),
+        "company": _categorical(company, COMPANIES),
+        "business_unit": _categorical(business_unit, [f"{c} {b}" for c in COMPANIES for b in BUSINESS_UNITS]),
+        "department": _categorical(department, DEPARTMENTS),
+        "function": _categorical(function, FUNCTIONS),
+        "zone": _categorical(zone, ZONES),
+        "area": _categorical(area, AREAS),
+        "band": _categorical(band, BANDS),
+        "employment_type": _categorical(employment_type, EMPLOYMENT_TYPES),
+        "cost_center": _categorical(cost_center, names),
+    })
+
+
+def generate_leave(employees, seed=0, today=None, spells_per_year=6.0):
+    """
+    Leave spells of employees in the LEAVE_YEARS years before today.
+    """
+    rng = np.random.default_rng(seed + 1)
+    today = pd.Timestamp(today or "2025-04-30").normalize()
+    window_start = today - pd.DateOffset(years=LEAVE_YEARS)
+
+    first = employees["date_of_joining"].clip(lower=window_start)
+    last = employees["date_of_exit"].fillna(today).clip(upper=today)
+    service = ((last - first).dt.days).to_numpy()
+    service = np.where(np.isfinite(service), service, -1)
+    eligible = np.flatnonzero(service > 0)
+
+    counts = rng.poisson(spells_per_year * service[eligible] / 365.25)
+    rows = np.repeat(eligible, counts)
+    m = len(rows)
+    offset = (rng.random(m) * service[rows]).astype("int64")
+    leave_type = rng.choice(len(LEAVE_TYPES), m, p=[0.36, 0.34, 0.29, 0.01])
+    female = (employees["gender"] == "Female").to_numpy()[rows]
+    leave_type = np.where((leave_type == 3) & ~female, 2, leave_type)  # maternity only for women
+    duration = np.where(leave_type == 3, 90 + rng.integers(0, 90, m), 1 + rng.binomial(1, 0.45, m))
+    duration = np.where((leave_type == 1) & (rng.random(m) < 0.1), rng.integers(3, 11, m), duration)
+
+    start_date = pd.Series(first.to_numpy()[rows]) + _days(offset)
+    end_date = (start_date + _days(duration - 1)).clip(upper=pd.Series(last.to_numpy()[rows]))
+    frame = pd.DataFrame({
+        "employee_id": employees["employee_id"].to_numpy()[rows],
+        "start_date": start_date,
+        "end_date": end_date,
+        "leave_type": _categorical(leave_type, LEAVE_TYPES),
+        "value": ((end_date - start_date).dt.days + 1).to_numpy(),
+    })
+    return frame.sort_values(["employee_id", "start_date"], ignore_index=True)
+
+
+def generate_sales(employees, seed=0, today=None, sales_per_head=20.0):
+    """
+    Sales transactions per cost center in the SALES_YEARS years before today,
+    in proportion to the center's current Sales-function headcount.
+    """
+    rng = np.random.default_rng(seed + 2)
+    today = pd.Timestamp(today or "2025-04-30").normalize()
+    window = (today - (today - pd.DateOffset(years=SALES_YEARS))).days
+
+    sellers = employees[(employees["function"] == "Sales") & employees["date_of_exit"].isna()]
+    per_center = sellers["cost_center"].value_counts()
+    per_center = per_center[per_center > 0]
+    counts = rng.poisson(sales_per_head * per_center.to_numpy())
+    centers = np.repeat(per_center.index.astype(str).to_numpy(), counts)
+    m = len(centers)
+
+    # Seasonal: Q4 of the FY (Jan-Mar) sells more
+    days = (rng.random(m) * window).astype("int64")
+    sale_date = today - _days(days)
+    boost = sale_date.month.isin([1, 2, 3])
+    amount = rng.lognormal(np.log(180_000), 0.6, m) * np.where(boost, 1.3, 1.0)
+    return pd.DataFrame({
+        "cost_center": pd.Categorical(centers),
+        "sale_date": sale_date,
+        "sale_amount_inr": np.round(amount).astype("int64"),
+    })
+
+
+def generate_datasets(n, seed=0, today=None):
+    """
+    {dataset: DataFrame} for n employees, keyed like DATA_FILES.
+    """
+    employees = generate_employee_master(n, seed, today)
+    return {
+        "employee_master": employees,
+        "leave": generate_leave(employees, seed, today),
+        "sales": generate_sales(employees, seed, today),
+    }
+
+
+def write_datasets(datasets, out_dir, file_format="xlsx"):
+    """
+    Write datasets under out_dir with the DATA_FILES file names. Excel caps a
+    sheet at EXCEL_MAX_ROWS rows, so larger frames need file_format="parquet".
+    Returns {dataset: path}.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {}
+    for key, df in datasets.items():
+        path = os.path.join(out_dir, f"{FILE_NAMES[key]}.{file_format}")
+        if file_format == "xlsx":
+            if len(df) > EXCEL_MAX_ROWS:
+                raise ValueError(f"{key} has {len(df):,} rows, more than an Excel sheet holds; use parquet")
+            df.to_excel(path, index=False)
+        else:
+            df.to_parquet(path, index=False)
+        paths[key] = path
+    return paths
+
+
+def parse_size(text):
+    """
+    "10k" -> 10000, "5m" -> 5000000, "2500" -> 2500.
+    """
+    text = text.strip().lower().replace("_", "")
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate seeded synthetic Worklense data.")
+    parser.add_argument("rows", type=parse_size, help="Employee master rows, e.g. 10k, 1m")
+    parser.add_argument("--out", default="data/synthetic", help="Output directory")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--today", help="As-of date of the data (default 2025-04-30)")
+    parser.add_argument("--format", choices=["xlsx", "parquet"], default="xlsx")
+    args = parser.parse_args(argv)
+
+    datasets = generate_datasets(args.rows, args.seed, args.today)
+    for key, path in write_datasets(datasets, args.out, args.format).items():
+        print(f"{key}: {len(datasets[key]):,} rows -> {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,6 +10,10 @@ def render_kpi_card(label, value, value_type="Integer"):
         value_str = f"{value:,.1f}%"
     elif value_type == "Years":
         value_str = f"{value:,.1f} yrs"
+    elif value_type == "Days":
+        value_str = f"{value:,.1f} days"
+    elif value_type == "Decimal":
+        value_str = f"{value:,.2f}"
     else:
         value_str = f"{value:,.0f}"
 
@@ -20,3 +24,14 @@ def render_kpi_card(label, value, value_type="Integer"):
         <span class="kpi-value">{value_str}</span>
     </div>
     """
+
+def render_kpi_grid(kpis, per_row=4):
+    """
+    Returns one HTML block with all KPI cards laid out per_row to a row,
+    so the whole grid is sent to the browser as a single element.
+    """
+    cards = "".join(
+        "".join(line.strip() for line in render_kpi_card(kpi["label"], kpi["value"], kpi.get("type", "Integer")).splitlines())
+        for kpi in kpis
+    )
+    return f'<div class="kpi-grid" style="grid-template-columns: repeat({per_row}, minmax(0, 1fr));">{cards}</div>'
@@ -1,212 +1,166 @@
-import streamlit as st
 import pandas as pd
 import plotly.express as px
-from datetime import datetime
-from kpi_design import render_kpi_card
+from utils.chart_pipeline import run_prepare_steps
+from utils.fiscal_calendar import fy_label, fy_labels, last_fiscal_years, parse_fy_label
+from utils.kpi_engine import compute_kpis, kpi_cache_key
+from utils.report_context import ReportContext
+from utils.tracing import traced
+
+REPORT_META = {
+    "title": "Executive Summary",
+    "datasets": {
+        "employee_master": [
+            "date_of_joining", "date_of_exit", "date_of_birth", "total_ctc_pa", "total_exp_yrs",
+            "gender", "qualification_type", "company", "business_unit", "department",
+            "function", "zone", "area", "band", "employment_type",
+        ],
+    },
+    "filters": ["company", "business_unit", "department", "function", "zone", "area", "band", "employment_type"],
+}
 
 def get_last_fy_list(current_fy, n=5):
-    return [f"FY-{str(current_fy-i)[-2:]}" for i in range(n-1,-1,-1)]
-
-def prepare_manpower_growth_data(df, fy_list):
-    if 'date_of_joining' not in df.columns: return pd.DataFrame(columns=['FY','Headcount'])
-    df = df.copy()
-    df['FY'] = pd.to_datetime(df['date_of_joining'], errors='coerce').dt.year.apply(lambda y: f"FY-{str(y)[-2:]}" if pd.notnull(y) else None)
-    grouped = df.groupby('FY').size().reset_index(name='Headcount')
-    grouped = grouped[grouped['FY'].isin(fy_list)]
-    grouped = grouped.set_index('FY').reindex(fy_list).reset_index().fillna(0)
-    return grouped
-
-def prepare_manpower_cost_data(df, fy_list):
-    if 'date_of_joining' not in df.columns or 'total_ctc_pa' not in df.columns: return pd.DataFrame(columns=['FY','Total Cost'])
-    df = df.copy()
-    df['FY'] = pd.to_datetime(df['date_of_joining'], errors='coerce').dt.year.apply(lambda y: f"FY-{str(y)[-2:]}" if pd.notnull(y) else None)
-    grouped = df.groupby('FY')['total_ctc_pa'].sum().reset_index(name='Total Cost')
-    grouped = grouped[grouped['FY'].isin(fy_list)]
-    grouped = grouped.set_index('FY').reindex(fy_list).reset_index().fillna(0)
-    return grouped
-
-def prepare_attrition_data(df, fy_list):
-    if 'date_of_exit' not in df.columns: return pd.DataFrame(columns=['FY','Attrition %'])
-    df = df.copy()
-    df['FY'] = pd.to_datetime(df['date_of_exit'], errors='coerce').dt.year.apply(lambda y: f"FY-{str(y)[-2:]}" if pd.notnull(y) else None)
-    attrition_df = df[df['date_of_exit'].notna()].groupby('FY').size().reset_index(name='Leavers')
-    headcount_df = df.groupby('FY').size().reset_index(name='Headcount')
-    merged = pd.merge(attrition_df, headcount_df, on='FY', how='left')
-    merged['Attrition %'] = (merged['Leavers'] / merged['Headcount']) * 100
-    merged = merged[merged['FY'].isin(fy_list)]
-    merged = merged.set_index('FY').reindex(fy_list).reset_index().fillna(0)
-    return merged[['FY', 'Attrition %']]
-
-def prepare_gender_data(df):
-    if 'gender' not in df.columns: return pd.DataFrame(columns=['Gender','Count'])
-    df = df.copy()
-    if 'date_of_exit' in df.columns:
-        df = df[df['date_of_exit'].isna()]
-    counts = df['gender'].value_counts().reset_index()
+    return [fy_label(fy) for fy in last_fiscal_years(current_fy, n)]
+
+@traced()
+def prepare_manpower_growth_data(ctx, fy_list):
+    if not ctx.has('date_of_joining'): return pd.DataFrame(columns=['FY','Headcount'])
+    fy_years = [parse_fy_label(fy) for fy in fy_list]
+    return pd.DataFrame({'FY': fy_labels(fy_years), 'Headcount': ctx.fy_flows(fy_years)['joiners'].to_numpy()})
+
+@traced()
+def prepare_manpower_cost_data(ctx, fy_list):
+    if not ctx.has('date_of_joining') or not ctx.has('total_ctc_pa'): return pd.DataFrame(columns=['FY','Total Cost'])
+    fy_years = [parse_fy_label(fy) for fy in fy_list]
+    return pd.DataFrame({'FY': fy_labels(fy_years), 'Total Cost': ctx.fy_flows(fy_years)['joiner_ctc'].to_numpy()})
+
+@traced()
+def prepare_attrition_data(ctx, fy_list):
+    if not ctx.has('date_of_exit'): return pd.DataFrame(columns=['FY','Attrition %'])
+    fy_years = [parse_fy_label(fy) for fy in fy_list]
+    # Leavers in the FY over its average month-end headcount (year to date for the current FY)
+    attrition = ctx.attrition.fy_attrition(fy_years)['attrition'].to_numpy()
+    return pd.DataFrame({'FY': fy_labels(fy_years), 'Attrition %': attrition.round(1)})
+
+@traced()
+def prepare_gender_data(ctx):
+    if not ctx.has('gender'): return pd.DataFrame(columns=['Gender','Count'])
+    counts = ctx.engine.value_counts('gender')
     counts.columns = ['Gender', 'Count']
     return counts
 
-def prepare_age_distribution(df):
-    if 'date_of_birth' not in df.columns: return pd.DataFrame(columns=['Age Group','Count'])
-    df = df.copy()
-    if 'date_of_exit' in df.columns:
-        df = df[df['date_of_exit'].isna()]
+def binned_frame(ctx, measure, bins, labels, name):
+    """
+    Active employees per bin of measure, as [name, 'Count'] in bin order.
+    """
+    counts = ctx.engine.binned_counts(measure, bins)
+    return pd.DataFrame({name: pd.Categorical(labels, categories=labels, ordered=True), 'Count': counts})
+
+@traced()
+def prepare_age_distribution(ctx):
+    if not ctx.has('date_of_birth'): return pd.DataFrame(columns=['Age Group','Count'])
     bins = [0, 20, 25, 30, 35, 40, 45, 50, 55, 60, 100]
     labels = ['<20', '20-24', '25-29', '30-34', '35-39', '40-44', '45-49', '50-54', '55-59', '60+']
-    df['Age'] = df['date_of_birth'].apply(lambda dob: (pd.Timestamp.now() - pd.to_datetime(dob, errors='coerce')).days // 365 if pd.notnull(dob) else 0)
-    df['Age Group'] = pd.cut(df['Age'], bins=bins, labels=labels)
-    counts = df['Age Group'].value_counts().reset_index()
-    counts.columns = ['Age Group', 'Count']
-    return counts.sort_values('Age Group')
-
-def prepare_tenure_distribution(df):
-    if 'total_exp_yrs' not in df.columns: return pd.DataFrame(columns=['Tenure Group','Count'])
-    df = df.copy()
-    if 'date_of_exit' in df.columns:
-        df = df[df['date_of_exit'].isna()]
+    return binned_frame(ctx, 'age', bins, labels, 'Age Group')
+
+@traced()
+def prepare_tenure_distribution(ctx):
+    if not ctx.has('date_of_joining'): return pd.DataFrame(columns=['Tenure Group','Count'])
     bins = [0, 0.5, 1, 3, 5, 10, 40]
     labels = ['0-6 Months', '6-12 Months', '1-3 Years', '3-5 Years', '5-10 Years', '10+ Years']
-    df['Tenure Group'] = pd.cut(df['total_exp_yrs'], bins=bins, labels=labels)
-    counts = df['Tenure Group'].value_counts().reset_index()
-    counts.columns = ['Tenure Group', 'Count']
-    return counts.sort_values('Tenure Group')
-
-def prepare_experience_distribution(df):
-    if 'total_exp_yrs' not in df.columns: return pd.DataFrame(columns=['Experience Group','Count'])
-    df = df.copy()
-    if 'date_of_exit' in df.columns:
-        df = df[df['date_of_exit'].isna()]
+    return binned_frame(ctx, 'tenure', bins, labels, 'Tenure Group')
+
+@traced()
+def prepare_experience_distribution(ctx):
+    if not ctx.has('total_exp_yrs'): return pd.DataFrame(columns=['Experience Group','Count'])
     bins = [0, 1, 3, 5, 10, 40]
     labels = ['<1 Year', '1-3 Years', '3-5 Years', '5-10 Years', '10+ Years']
-    df['Experience Group'] = pd.cut(df['total_exp_yrs'], bins=bins, labels=labels)
-    counts = df['Experience Group'].value_counts().reset_index()
-    counts.columns = ['Experience Group', 'Count']
-    return counts.sort_values('Experience Group')
-
-def prepare_education_distribution(df):
-    if 'qualification_type' not in df.columns: return pd.DataFrame(columns=['Qualification','Count'])
-    df = df.copy()
-    if 'date_of_exit' in df.columns:
-        df = df[df['date_of_exit'].isna()]
-    counts = df['qualification_type'].value_counts().reset_index()
+    return binned_frame(ctx, 'total_exp_yrs', bins, labels, 'Experience Group')
+
+@traced()
+def prepare_education_distribution(ctx):
+    if not ctx.has('qualification_type'): return pd.DataFrame(columns=['Qualification','Count'])
+    counts = ctx.engine.value_counts('qualification_type')
     counts.columns = ['Qualification', 'Count']
     return counts
 
-def render_line_chart(df, x, y):
-    template = st.session_state.get("plotly_template", "plotly")
-    if df.empty or x not in df.columns or y not in df.columns: st.write("No Data"); return
-    fig = px.line(df, x=x, y=y, markers=True, template=template, text=y)
+KPI_SPECS = [
+    {"label": "Active Employees", "metric": "active", "type": "Integer"},
+    {"label": "Attrition Rate (FY {fy})", "metric": "attrition_fy", "type": "Percentage"},
+    {"label": "Joiners (FY {fy})", "metric": "joiners_fy", "type": "Integer"},
+    {"label": "Total Cost (INR)", "metric": "total_ctc", "type": "Currency"},
+    {"label": "Female Ratio", "metric": "female_ratio", "type": "Percentage"},
+    {"label": "Avg Tenure", "metric": "avg_tenure", "type": "Years"},
+    {"label": "Avg Age", "metric": "avg_age", "type": "Years"},
+    {"label": "Avg Total Exp", "metric": "avg_exp", "type": "Years"},
+]
+
+def line_chart(df, x, y, title):
+    if df.empty or x not in df.columns or y not in df.columns: return None
+    fig = px.line(df, x=x, y=y, markers=True, text=y, title=title)
     fig.update_traces(textposition="top center")
-    st.plotly_chart(fig, use_container_width=True)
-
-def render_bar_chart(df, x, y):
-    template = st.session_state.get("plotly_template", "plotly")
-    if df.empty or x not in df.columns or y not in df.columns: st.write("No Data"); return
-    fig = px.bar(df, x=x, y=y, template=template, text_auto=True)
-    st.plotly_chart(fig, use_container_width=True)
-
-def render_pie_chart(df, names, values):
-    template = st.session_state.get("plotly_template", "plotly")
-    if df.empty or names not in df.columns or values not in df.columns: st.write("No Data"); return
-    fig = px.pie(df, names=names, values=values, hole=0, template=template)
+    return fig
+
+def bar_chart(df, x, y, title):
+    if df.empty or x not in df.columns or y not in df.columns: return None
+    return px.bar(df, x=x, y=y, text_auto=True, title=title)
+
+def pie_chart(df, names, values, title):
+    if df.empty or names not in df.columns or values not in df.columns: return None
+    fig = px.pie(df, names=names, values=values, hole=0, title=title)
     fig.update_traces(textinfo='label+percent+value')
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
 
-def render_donut_chart(df, names, values):
-    template = st.session_state.get("plotly_template", "plotly")
-    if df.empty or names not in df.columns or values not in df.columns: st.write("No Data"); return
-    fig = px.pie(df, names=names, values=values, hole=0.5, template=template)
+def donut_chart(df, names, values, title):
+    if df.empty or names not in df.columns or values not in df.columns: return None
+    fig = px.pie(df, names=names, values=values, hole=0.5, title=title)
     fig.update_traces(textinfo='label+percent+value')
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
 
 def run_report(data, config):
-    st.markdown(
-        """
-        <style>
-            .block-container {padding-top:2.1rem;}
-        </style>
-        """, unsafe_allow_html=True
-    )
-    st.title("Executive Summary")
-    df = data.get("employee_master", pd.DataFrame())
-    now = datetime.now()
-    current_fy = now.year + 1 if now.month >= 4 else now.year
-    fy_list = get_last_fy_list(current_fy, n=5)
-
-    today = pd.Timestamp.now().normalize()
-    fy_start = pd.Timestamp(f"{current_fy-1}-04-01")
-    fy_end = pd.Timestamp(f"{current_fy}-03-31")
-
-    mask_active = (df['date_of_joining'] <= today) & ((df['date_of_exit'].isna()) | (df['date_of_exit'] > today))
-    active = mask_active.sum()
-    leavers = df['date_of_exit'].between(fy_start, fy_end).sum() if 'date_of_exit' in df.columns else 0
-    headcount_start = ((df['date_of_joining'] <= fy_start) & ((df['date_of_exit'].isna()) | (df['date_of_exit'] > fy_start))).sum()
-    headcount_end = ((df['date_of_joining'] <= fy_end) & ((df['date_of_exit'].isna()) | (df['date_of_exit'] > fy_end))).sum()
-    avg_headcount = (headcount_start + headcount_end) / 2 if (headcount_start + headcount_end) else 1
-    attrition = (leavers / avg_headcount) * 100 if avg_headcount else 0
-    joiners = df['date_of_joining'].between(fy_start, fy_end).sum() if 'date_of_joining' in df.columns else 0
-    total_cost = df['total_ctc_pa'].sum() if 'total_ctc_pa' in df.columns else 0
-    female = mask_active & (df['gender'] == 'Female') if 'gender' in df.columns else 0
-    total_active = mask_active.sum()
-    female_ratio = (female.sum() / total_active * 100) if isinstance(female, pd.Series) and total_active > 0 else 0
-    avg_tenure = df['total_exp_yrs'].mean() if 'total_exp_yrs' in df.columns else 0
-
-    def calc_age(dob):
-        if pd.isnull(dob): return None
-        return (now - pd.to_datetime(dob, errors='coerce')).days // 365
-    avg_age = df['date_of_birth'].apply(calc_age).mean() if 'date_of_birth' in df.columns else 0
-    avg_total_exp = df['total_exp_yrs'].mean() if 'total_exp_yrs' in df.columns else 0
-
-    kpis = [
-        {"label": "Active Employees", "value": active, "type": "Integer"},
-        {"label": f"Attrition Rate (FY {str(current_fy-1)[-2:]}-{str(current_fy)[-2:]})", "value": attrition, "type": "Percentage"},
-        {"label": f"Joiners (FY {str(current_fy-1)[-2:]}-{str(current_fy)[-2:]})", "value": joiners, "type": "Integer"},
-        {"label": "Total Cost (INR)", "value": total_cost, "type": "Currency"},
-        {"label": "Female Ratio", "value": female_ratio, "type": "Percentage"},
-        {"label": "Avg Tenure", "value": avg_tenure, "type": "Years"},
-        {"label": "Avg Age", "value": avg_age, "type": "Years"},
-        {"label": "Avg Total Exp", "value": avg_total_exp, "type": "Years"},
-    ]
+    ctx = ReportContext(data, config)
+    fy_list = get_last_fy_list(ctx.current_fy, n=5)
 
-    for i in range(0, len(kpis), 4):
-        cols = st.columns(4)
-        for j in range(4):
-            idx = i + j
-            if idx >= len(kpis): break
-            kpi = kpis[idx]
-            with cols[j]:
-                st.markdown(render_kpi_card(kpi['label'], kpi['value'], kpi['type']), unsafe_allow_html=True)
+    kpis = compute_kpis(ctx.employees, KPI_SPECS, ctx.now, kpi_cache_key(config), ctx.timeline)
 
     charts = [
-        ("Manpower Growth", lambda df: prepare_manpower_growth_data(df, fy_list), render_line_chart, {"x": "FY", "y": "Headcount"}),
-        ("Manpower Cost Trend", lambda df: prepare_manpower_cost_data(df, fy_list), render_bar_chart, {"x": "FY", "y": "Total Cost"}),
-        ("Attrition Trend", lambda df: prepare_attrition_data(df, fy_list), render_line_chart, {"x": "FY", "y": "Attrition %"}),
-        ("Gender Diversity", prepare_gender_data, render_donut_chart, {"names": "Gender", "values": "Count"}),
-        ("Age Distribution", prepare_age_distribution, render_pie_chart, {"names": "Age Group", "values": "Count"}),
-        ("Tenure Distribution", prepare_tenure_distribution, render_pie_chart, {"names": "Tenure Group", "values": "Count"}),
-        ("Total Experience Distribution", prepare_experience_distribution, render_bar_chart, {"x": "Experience Group", "y": "Count"}),
-        ("Education Type Distribution", prepare_education_distribution, render_donut_chart, {"names": "Qualification", "values": "Count"}),
+        ("Manpower Growth", lambda ctx: prepare_manpower_growth_data(ctx, fy_list), line_chart, {"x": "FY", "y": "Headcount"}),
+        ("Manpower Cost Trend", lambda ctx: prepare_manpower_cost_data(ctx, fy_list), bar_chart, {"x": "FY", "y": "Total Cost"}),
+        ("Attrition Trend", lambda ctx: prepare_attrition_data(ctx, fy_list), line_chart, {"x": "FY", "y": "Attrition %"}),
+        ("Gender Diversity", prepare_gender_data, donut_chart, {"names": "Gender", "values": "Count"}),
+        ("Age Distribution", prepare_age_distribution, pie_chart, {"names": "Age Group", "values": "Count"}),
+        ("Tenure Distribution", prepare_tenure_distribution, pie_chart, {"names": "Tenure Group", "values": "Count"}),
+        ("Total Experience Distribution", prepare_experience_distribution, bar_chart, {"x": "Experience Group", "y": "Count"}),
+        ("Education Type Distribution", prepare_education_distribution, donut_chart, {"names": "Qualification", "values": "Count"}),
     ]
 
-    for i in range(0, len(charts), 2):
-        cols = st.columns(2, gap="large")
-        for j in range(2):
-            idx = i + j
-            if idx >= len(charts): break
-            title, prepare_func, render_func, params = charts[idx]
-            with cols[j]:
-                st.markdown(f"##### {title}")
-                df_chart = prepare_func(df)
-                if isinstance(params, dict):
-                    render_func(df_chart, **params)
-                else:
-                    render_func(df_chart, params)
+    # Prepare all chart data concurrently; the app renders the figures (and applies the theme)
+    chart_data = run_prepare_steps(
+        [lambda prepare_func=prepare_func: prepare_func(ctx) for _, prepare_func, _, _ in charts],
+        max_workers=config.get("chart_workers"),
+        timeout=config.get("chart_timeout"),
+        default=pd.DataFrame,
+        names=[title for title, _, _, _ in charts],
+    )
+
+    figures = []
+    for (title, _, build_chart, params), df_chart in zip(charts, chart_data):
+        fig = build_chart(df_chart, title=title, **params)
+        if fig is not None:
+            figures.append(fig)
+
+    return {
+        "kpis": kpis,
+        "charts": figures,
+        "fy_list": fy_list,
+        "as_of": ctx.now,
+        "errors": chart_data.errors,
+    }
 
 # Run command:
 # streamlit run app.py
 
 # UAT Checklist:
 # - Only "Chart Style (Plotly Theme)" in sidebar (from main app/theme handler), not here.
-# - All KPI cards use new design from kpi_design.py.
+# - All KPI cards use new design from kpi_design.py (rendered by the app).
 # - KPIs and chart data/format are correct.
 # - 8 charts display, 2 per row, layout smooth.
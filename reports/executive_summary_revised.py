@@ -1,153 +1,188 @@
-from datetime import datetime
 import pandas as pd
 from utils.chart_logic import prepare_manpower_charts
+from utils.chart_pipeline import run_prepare_steps
+from utils.chart_renderers import metric_chart, needed_inputs
+from utils.fiscal_calendar import fy_label, fy_labels, last_fiscal_years, parse_fy_label
+from utils.kpi_engine import compute_kpis, kpi_cache_key
+from utils.report_context import ReportContext
+from utils.tracing import traced
 import plotly.express as px
 
+REPORT_META = {
+    "title": "Executive Summary Revised",
+    "datasets": {
+        "employee_master": [
+            "date_of_joining", "date_of_exit", "date_of_birth", "total_ctc_pa", "total_exp_yrs",
+            "gender", "qualification_type", "company", "business_unit", "department",
+            "function", "zone", "area", "band", "employment_type",
+        ],
+    },
+    "filters": ["company", "business_unit", "department", "function", "zone", "area", "band", "employment_type"],
+}
+
 def get_last_fy_list(current_fy, n=5):
-    return [f"FY-{str(current_fy-i)[-2:]}" for i in range(n-1, -1, -1)]
-
-def prepare_attrition_data(df, fy_list):
-    if 'date_of_exit' not in df.columns: return pd.DataFrame(columns=['FY','Attrition %'])
-    df = df.copy()
-    df['FY'] = pd.to_datetime(df['date_of_exit'], errors='coerce').dt.year.apply(
-        lambda y: f"FY-{str(y)[-2:]}" if pd.notnull(y) else None)
-    attrition_df = df[df['date_of_exit'].notna()].groupby('FY').size().reset_index(name='Leavers')
-    headcount_df = df.groupby('FY').size().reset_index(name='Headcount')
-    merged = pd.merge(attrition_df, headcount_df, on='FY', how='left')
-    merged['Attrition %'] = (merged['Leavers'] / merged['Headcount']) * 100
-    merged = merged[merged['FY'].isin(fy_list)]
-    merged = merged.set_index('FY').reindex(fy_list).reset_index().fillna(0)
-    return merged[['FY', 'Attrition %']]
-
-def prepare_gender_data(df):
-    if 'gender' not in df.columns: return pd.DataFrame(columns=['Gender','Count'])
-    df = df[df['date_of_exit'].isna()] if 'date_of_exit' in df.columns else df.copy()
-    counts = df['gender'].value_counts().reset_index()
+    return [fy_label(fy) for fy in last_fiscal_years(current_fy, n)]
+
+@traced()
+def prepare_attrition_data(ctx, fy_list):
+    if not ctx.has('date_of_exit'): return pd.DataFrame(columns=['FY','Attrition %'])
+    fy_years = [parse_fy_label(fy) for fy in fy_list]
+    # Leavers in the FY over its average month-end headcount (year to date for the current FY)
+    attrition = ctx.attrition.fy_attrition(fy_years)['attrition'].to_numpy()
+    return pd.DataFrame({'FY': fy_labels(fy_years), 'Attrition %': attrition.round(1)})
+
+@traced()
+def prepare_rolling_attrition(ctx, fy_list, dim="department"):
+    if not ctx.has('date_of_exit'): return pd.DataFrame()
+    start = pd.Timestamp(parse_fy_label(fy_list[0]) - 1, 4, 1)
+    dims = (dim,) if dim and ctx.has(dim) else ()
+    return ctx.attrition.rolling_attrition(start, ctx.now, dims=dims).round(1)
+
+@traced()
+def prepare_cohort_survival(ctx, fy_list, max_months=36):
+    if not ctx.has('date_of_joining'): return pd.DataFrame(columns=['Cohort','Months','Retained %'])
+    fy_years = [parse_fy_label(fy) for fy in fy_list]
+    survival = ctx.attrition.cohort_survival(fy_years, max_months=max_months).droplevel('segment')
+    survival = survival.rename(index=fy_label).rename_axis('Cohort')
+    long = (survival * 100).round(1).stack().dropna().rename('Retained %').reset_index()
+    return long.rename(columns={'months': 'Months'})
+
+@traced()
+def prepare_gender_data(ctx):
+    if not ctx.has('gender'): return pd.DataFrame(columns=['Gender','Count'])
+    counts = ctx.engine.value_counts('gender')
     counts.columns = ['Gender', 'Count']
     return counts
 
-def prepare_age_distribution(df):
-    if 'date_of_birth' not in df.columns: return pd.DataFrame(columns=['Age Group','Count'])
-    df = df[df['date_of_exit'].isna()] if 'date_of_exit' in df.columns else df.copy()
+def distribution_chart(ctx, metric, measure, bins, labels, label):
+    """
+    CHART_CONFIG chart data of measure: active employees per bin for the
+    pie/bar types, the raw values for the others (histogram, box, violin,
+    density). The app draws it in the type chosen next to the chart.
+    """
+    needs_values, needs_counts = needed_inputs(metric)
+    counts = pd.Series(ctx.engine.binned_counts(measure, bins), index=labels) if needs_counts else None
+    values = ctx.engine.values(measure) if needs_values else None
+    return metric_chart(metric, values, counts, label=label)
+
+@traced()
+def prepare_age_distribution(ctx):
+    if not ctx.has('date_of_birth'): return None
     bins = [0, 20, 25, 30, 35, 40, 45, 50, 55, 60, 100]
     labels = ['<20', '20-24', '25-29', '30-34', '35-39', '40-44', '45-49', '50-54', '55-59', '60+']
-    df['Age'] = df['date_of_birth'].apply(
-        lambda dob: (pd.Timestamp.now() - pd.to_datetime(dob, errors='coerce')).days // 365
-        if pd.notnull(dob) else 0)
-    df['Age Group'] = pd.cut(df['Age'], bins=bins, labels=labels)
-    counts = df['Age Group'].value_counts().reset_index()
-    counts.columns = ['Age Group', 'Count']
-    return counts.sort_values('Age Group')
-
-def prepare_tenure_distribution(df):
-    if 'total_exp_yrs' not in df.columns: return pd.DataFrame(columns=['Tenure Group','Count'])
-    df = df[df['date_of_exit'].isna()] if 'date_of_exit' in df.columns else df.copy()
+    return distribution_chart(ctx, 'age_distribution', 'age', bins, labels, 'Age (Years)')
+
+@traced()
+def prepare_tenure_distribution(ctx):
+    if not ctx.has('date_of_joining'): return None
     bins = [0, 0.5, 1, 3, 5, 10, 40]
     labels = ['0-6 Months', '6-12 Months', '1-3 Years', '3-5 Years', '5-10 Years', '10+ Years']
-    df['Tenure Group'] = pd.cut(df['total_exp_yrs'], bins=bins, labels=labels)
-    counts = df['Tenure Group'].value_counts().reset_index()
-    counts.columns = ['Tenure Group', 'Count']
-    return counts.sort_values('Tenure Group')
-
-def prepare_experience_distribution(df):
-    if 'total_exp_yrs' not in df.columns: return pd.DataFrame(columns=['Experience Group','Count'])
-    df = df[df['date_of_exit'].isna()] if 'date_of_exit' in df.columns else df.copy()
+    return distribution_chart(ctx, 'tenure_distribution', 'tenure', bins, labels, 'Tenure (Years)')
+
+@traced()
+def prepare_experience_distribution(ctx):
+    if not ctx.has('total_exp_yrs'): return None
     bins = [0, 1, 3, 5, 10, 40]
     labels = ['<1 Year', '1-3 Years', '3-5 Years', '5-10 Years', '10+ Years']
-    df['Experience Group'] = pd.cut(df['total_exp_yrs'], bins=bins, labels=labels)
-    counts = df['Experience Group'].value_counts().reset_index()
-    counts.columns = ['Experience Group', 'Count']
-    return counts.sort_values('Experience Group')
-
-def prepare_education_distribution(df):
-    if 'qualification_type' not in df.columns: return pd.DataFrame(columns=['Qualification','Count'])
-    df = df[df['date_of_exit'].isna()] if 'date_of_exit' in df.columns else df.copy()
-    counts = df['qualification_type'].value_counts().reset_index()
+    return distribution_chart(ctx, 'total_experience', 'total_exp_yrs', bins, labels, 'Experience (Years)')
+
+@traced()
+def prepare_education_distribution(ctx):
+    if not ctx.has('qualification_type'): return pd.DataFrame(columns=['Qualification','Count'])
+    counts = ctx.engine.value_counts('qualification_type')
     counts.columns = ['Qualification', 'Count']
     return counts
 
-def calc_kpis(df, fy_list, now):
-    today = now
-    current_fy = now.year + 1 if now.month >= 4 else now.year
-    fy_start = datetime(current_fy - 1, 4, 1)
-    fy_end = datetime(current_fy, 3, 31)
-
-    mask_active = (df['date_of_joining'] <= today) & (
-        df['date_of_exit'].isna() | (df['date_of_exit'] > today)
-    )
-    active = mask_active.sum()
-    leavers = df['date_of_exit'].between(fy_start, fy_end).sum() if 'date_of_exit' in df.columns else 0
-    headcount_start = ((df['date_of_joining'] <= fy_start) & (
-        df['date_of_exit'].isna() | (df['date_of_exit'] > fy_start))).sum()
-    headcount_end = ((df['date_of_joining'] <= fy_end) & (
-        df['date_of_exit'].isna() | (df['date_of_exit'] > fy_end))).sum()
-    avg_headcount = (headcount_start + headcount_end) / 2 if (headcount_start + headcount_end) else 1
-    attrition = (leavers / avg_headcount) * 100 if avg_headcount else 0
-    joiners = df['date_of_joining'].between(fy_start, fy_end).sum() if 'date_of_joining' in df.columns else 0
-    total_cost = df.loc[mask_active, 'total_ctc_pa'].sum() if 'total_ctc_pa' in df.columns else 0
-    female = mask_active & (df['gender'] == 'Female') if 'gender' in df.columns else 0
-    total_active = mask_active.sum()
-    female_ratio = (female.sum() / total_active * 100) if isinstance(female, pd.Series) and total_active > 0 else 0
-    avg_tenure = df['total_exp_yrs'].mean() if 'total_exp_yrs' in df.columns else 0
-
-    def calc_age(dob):
-        if pd.isnull(dob): return None
-        return (now - pd.to_datetime(dob, errors='coerce')).days // 365
-
-    avg_age = df['date_of_birth'].apply(calc_age).mean() if 'date_of_birth' in df.columns else 0
-    avg_total_exp = df['total_exp_yrs'].mean() if 'total_exp_yrs' in df.columns else 0
-
-    return [
-        {"label": "Active Employees", "value": active, "type": "Integer"},
-        {"label": f"Attrition Rate (FY {str(current_fy-1)[-2:]}-{str(current_fy)[-2:]})", "value": attrition, "type": "Percentage"},
-        {"label": f"Joiners (FY {str(current_fy-1)[-2:]}-{str(current_fy)[-2:]})", "value": joiners, "type": "Integer"},
-        {"label": "Total Cost (INR Cr)", "value": total_cost / 1e7, "type": "Currency"},
-        {"label": "Diversity Ratio", "value": female_ratio, "type": "Percentage"},
-        {"label": "Average Tenure", "value": avg_tenure, "type": "Years"},
-        {"label": "Average Age", "value": avg_age, "type": "Years"},
-        {"label": "Average Exp", "value": avg_total_exp, "type": "Years"},
-    ]
+@traced()
+def prepare_salary_distribution(ctx):
+    if not ctx.has('total_ctc_pa'): return None
+    groups = ctx.active['band'] if ctx.has('band') else None
+    return metric_chart('salary_distribution', ctx.active['total_ctc_pa'], groups=groups, label='CTC (INR)')
+
+KPI_SPECS = [
+    {"label": "Active Employees", "metric": "active", "type": "Integer"},
+    {"label": "Attrition Rate (FY {fy})", "metric": "attrition_fy", "type": "Percentage"},
+    {"label": "Joiners (FY {fy})", "metric": "joiners_fy", "type": "Integer"},
+    {"label": "Total Cost (INR Cr)", "metric": "active_ctc", "type": "Currency", "scale": 1e-7},
+    {"label": "Diversity Ratio", "metric": "female_ratio", "type": "Percentage"},
+    {"label": "Average Tenure", "metric": "avg_tenure", "type": "Years"},
+    {"label": "Average Age", "metric": "avg_age", "type": "Years"},
+    {"label": "Average Exp", "metric": "avg_exp", "type": "Years"},
+]
+
+def calc_kpis(df, fy_list, now, cache_key=None, timeline=None):
+    return compute_kpis(df, KPI_SPECS, now, cache_key, timeline)
 
 def run_report(data, config):
-    df = data.get("employee_master", pd.DataFrame())
-    now = datetime.now()
-    current_fy = now.year + 1 if now.month >= 4 else now.year
-    fy_list = get_last_fy_list(current_fy, n=5)
-
-    kpis = calc_kpis(df, fy_list, now)
+    ctx = ReportContext(data, config)
+    now = ctx.now
+    fy_list = get_last_fy_list(ctx.current_fy, n=5)
+
+    kpis = calc_kpis(ctx.employees, fy_list, now, kpi_cache_key(config), ctx.timeline)
+
+    # Chart data is prepared concurrently; failed steps come back empty and are listed in errors
+    attrition_dim = config.get("attrition_segment", "department")
+    prepared = run_prepare_steps(
+        [
+            lambda: prepare_manpower_charts(ctx.employees, fy_list, now, ctx.timeline),
+            lambda: prepare_attrition_data(ctx, fy_list),
+            lambda: prepare_rolling_attrition(ctx, fy_list, attrition_dim),
+            lambda: prepare_cohort_survival(ctx, fy_list),
+            lambda: prepare_gender_data(ctx),
+            lambda: prepare_age_distribution(ctx),
+            lambda: prepare_tenure_distribution(ctx),
+            lambda: prepare_experience_distribution(ctx),
+            lambda: prepare_education_distribution(ctx),
+            lambda: prepare_salary_distribution(ctx),
+        ],
+        max_workers=config.get("chart_workers"),
+        timeout=config.get("chart_timeout"),
+        default=pd.DataFrame,
+        names=["Headcount / Manpower Cost", "Attrition Rate", "Rolling 12-Month Attrition", "Joiner Cohort Retention",
+               "Gender Diversity", "Age Distribution", "Tenure Distribution", "Total Experience Distribution",
+               "Education Distribution", "Salary Distribution"],
+    )
+    manpower, attrition, rolling, cohorts, gender, age, tenure, experience, education, salary = prepared
     charts = []
 
     # Headcount + Cost
-    charts.extend(prepare_manpower_charts(df, fy_list, now))
+    if isinstance(manpower, list):
+        charts.extend(manpower)
 
     # Additional charts
-    attrition = prepare_attrition_data(df, fy_list)
     if not attrition.empty:
         charts.append(px.line(attrition, x="FY", y="Attrition %", title="Attrition Rate"))
 
-    gender = prepare_gender_data(df)
-    if not gender.empty:
-        charts.append(px.pie(gender, names="Gender", values="Count", title="Gender Diversity"))
+    if not rolling.empty:
+        label = str(attrition_dim).replace("_", " ").title() if attrition_dim else "Segment"
+        charts.append(px.imshow(
+            rolling, aspect="auto", color_continuous_scale="Reds",
+            labels={"x": "Month", "y": label, "color": "Attrition %"},
+            title=f"Rolling 12-Month Attrition % by {label}",
+        ))
 
-    age = prepare_age_distribution(df)
-    if not age.empty:
-        charts.append(px.bar(age, x="Age Group", y="Count", title="Age Distribution"))
+    if not cohorts.empty:
+        charts.append(px.line(cohorts, x="Months", y="Retained %", color="Cohort",
+                              title="Joiner Cohort Retention"))
 
-    tenure = prepare_tenure_distribution(df)
-    if not tenure.empty:
-        charts.append(px.bar(tenure, x="Tenure Group", y="Count", title="Tenure Distribution"))
+    if not gender.empty:
+        charts.append(px.pie(gender, names="Gender", values="Count", title="Gender Diversity"))
 
-    experience = prepare_experience_distribution(df)
-    if not experience.empty:
-        charts.append(px.bar(experience, x="Experience Group", y="Count", title="Total Experience Distribution"))
+    # Chart data of CHART_CONFIG metrics; the app renders them in the chosen type (see utils/chart_renderers.py)
+    for chart in (age, tenure, experience):
+        if isinstance(chart, dict):
+            charts.append(chart)
 
-    education = prepare_education_distribution(df)
     if not education.empty:
         charts.append(px.bar(education, x="Qualification", y="Count", title="Education Distribution"))
 
+    if isinstance(salary, dict):
+        charts.append(salary)
+
     return {
         "kpis": kpis,
         "charts": charts,
         "fy_list": fy_list,
-        "as_of": now
+        "as_of": now,
+        "errors": prepared.errors,
     }
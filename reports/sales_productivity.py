@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+from utils.chart_pipeline import run_prepare_steps
+from utils.report_context import ReportContext
+from utils.sales_index import rolling_sum
+from utils.tracing import traced
+import plotly.express as px
+
+REPORT_META = {
+    "title": "Sales Productivity",
+    "datasets": {
+        "sales": ["employee_id", "cost_center", "sale_date", "sale_amount_inr"],
+        "employee_master": [
+            "employee_id", "cost_center", "date_of_exit", "total_ctc_pa", "company", "business_unit",
+            "department", "function", "zone", "area", "band", "employment_type",
+        ],
+    },
+    "filters": ["company", "business_unit", "department", "function", "zone", "area", "band", "employment_type"],
+}
+
+TOP_N = 5
+
+def get_window(index, now, months=12):
+    """
+    (first, last) month of the trailing window ending at the latest sales month up to now.
+    """
+    available = index.months[index.months <= pd.Timestamp(now)]
+    if not len(available): return None, None
+    last = available[-1]
+    return last - pd.DateOffset(months=months - 1), last
+
+def group_dimension(ctx):
+    for dim in ("zone", "band"):
+        if ctx.has(dim): return dim
+    return None
+
+KEY_LABELS = {"employee_id": "Performer", "cost_center": "Cost Center"}
+
+def key_shares(index, ctx, dim):
+    """
+    Share of each join key's revenue per group. A key's revenue is split
+    evenly over its active holders in the whole population (see
+    utils/sales_index.py), so the groups of any selection, and disjoint
+    selections, add up instead of each taking the full revenue of a key.
+    """
+    active = ctx.active
+    pos, share = index.shares(active[index.key])
+    shares = pd.DataFrame({
+        "key": active[index.key].astype(object).to_numpy(),
+        "pos": pos,
+        "group": active[dim].astype(object).to_numpy() if dim else "All",
+        "share": share,
+    })
+    shares = shares[shares["share"] > 0]
+    return shares.groupby(["key", "pos", "group"], as_index=False, sort=False)["share"].sum()
+
+@traced()
+def prepare_revenue_trend(index, ctx):
+    shares = key_shares(index, ctx, None)
+    monthly = pd.Series(shares["share"].to_numpy() @ index.revenue[shares["pos"].to_numpy()], index=index.months)
+    if monthly.empty: return pd.DataFrame(columns=['Month','Series','Revenue (INR)'])
+    trend = pd.DataFrame({
+        'Month': monthly.index,
+        'Monthly': monthly.to_numpy(),
+        'Rolling 3M': rolling_sum(monthly, 3).to_numpy(),
+        'Rolling 12M': rolling_sum(monthly, 12).to_numpy(),
+    })
+    return trend.melt(id_vars='Month', var_name='Series', value_name='Revenue (INR)')
+
+@traced()
+def prepare_group_productivity(index, ctx, start, end):
+    dim = group_dimension(ctx)
+    if start is None or dim is None: return pd.DataFrame(columns=['Group','Revenue','Headcount','CTC'])
+    shares = key_shares(index, ctx, dim)
+    revenue = shares["share"] * index.totals(start, end)[shares["pos"].to_numpy()]
+    revenue = revenue.groupby(shares["group"].to_numpy()).sum()
+    active = ctx.active
+    ctc = pd.to_numeric(active["total_ctc_pa"], errors="coerce").fillna(0) if "total_ctc_pa" in active else pd.Series(0.0, index=active.index)
+    groups = active[dim].astype(object).to_numpy()
+    people = pd.DataFrame({"Headcount": ctc.groupby(groups).size(), "CTC": ctc.groupby(groups).sum()})
+    productivity = people.join(revenue.rename("Revenue"), how="outer").fillna(0)
+    productivity["Revenue per Head"] = np.divide(
+        productivity["Revenue"], productivity["Headcount"], out=np.zeros(len(productivity)), where=productivity["Headcount"] > 0
+    )
+    productivity["Revenue per CTC Rupee"] = np.divide(
+        productivity["Revenue"], productivity["CTC"], out=np.zeros(len(productivity)), where=productivity["CTC"] > 0
+    )
+    return productivity.rename_axis('Group').reset_index()
+
+@traced()
+def prepare_top_performers(index, ctx, start, end):
+    dim = group_dimension(ctx)
+    label = KEY_LABELS[index.key]
+    if start is None: return pd.DataFrame(columns=['Group',label,'Revenue'])
+    shares = key_shares(index, ctx, dim)
+    top = pd.DataFrame({
+        'Group': shares["group"].to_numpy(),
+        label: shares["key"].astype(str).to_numpy(),
+        'Revenue': shares["share"].to_numpy() * index.totals(start, end)[shares["pos"].to_numpy()],
+    })
+    top = top[top['Revenue'] > 0].sort_values('Revenue', ascending=False)
+    return top.groupby('Group', sort=False).head(TOP_N)
+
+def calc_kpis(trend, productivity, end):
+    rolling = trend[(trend['Series'] == 'Rolling 3M') & (trend['Month'] == end)] if not trend.empty else trend
+    revenue = productivity['Revenue'].sum() if not productivity.empty else 0.0
+    heads = productivity['Headcount'].sum() if not productivity.empty else 0
+    ctc = productivity['CTC'].sum() if not productivity.empty else 0.0
+    return [
+        {"label": "Revenue (Last 12 Months)", "value": revenue, "type": "Currency"},
+        {"label": "Revenue (Last 3 Months)", "value": rolling['Revenue (INR)'].sum() if len(rolling) else 0.0, "type": "Currency"},
+        {"label": "Revenue per Head", "value": revenue / heads if heads else 0.0, "type": "Currency"},
+        {"label": "Revenue per CTC Rupee", "value": revenue / ctc if ctc else 0.0, "type": "Decimal"},
+    ]
+
+def run_report(data, config):
+    ctx = ReportContext(data, config)
+    index = ctx.engine.sales_index()
+    if index is None:
+        return {
+            "kpis": [],
+            "charts": [],
+            "as_of": ctx.now,
+            "message": "Sales cannot be joined to the employee master: neither employee_id nor cost_center is in both."
+        }
+    start, end = get_window(index, ctx.now)
+
+    prepared = run_prepare_steps(
+        [
+            lambda: prepare_revenue_trend(index, ctx),
+            lambda: prepare_group_productivity(index, ctx, start, end),
+            lambda: prepare_top_performers(index, ctx, start, end),
+        ],
+        max_workers=config.get("chart_workers"),
+        timeout=config.get("chart_timeout"),
+        default=pd.DataFrame,
+        names=["Revenue Trend", "Revenue per Head / per CTC Rupee", f"Top {TOP_N} {KEY_LABELS[index.key]}s"],
+    )
+    trend, productivity, top = prepared
+    kpis = calc_kpis(trend, productivity, end)
+    dim = (group_dimension(ctx) or "group").replace("_", " ").title()
+
+    charts = []
+    if not trend.empty:
+        charts.append(px.line(trend, x="Month", y="Revenue (INR)", color="Series", title="Revenue Trend (Rolling 3M / 12M)"))
+
+    if not productivity.empty:
+        charts.append(px.bar(productivity, x="Group", y="Revenue per Head", title=f"Revenue per Head by {dim}",
+                             labels={"Group": dim}))
+        charts.append(px.bar(productivity, x="Group", y="Revenue per CTC Rupee", title=f"Revenue per CTC Rupee by {dim}",
+                             labels={"Group": dim}))
+
+    if not top.empty:
+        label = KEY_LABELS[index.key]
+        charts.append(px.bar(top, x="Revenue", y=label, color="Group", orientation="h",
+                             title=f"Top {TOP_N} {label}s per {dim}", labels={"Group": dim}))
+
+    return {
+        "kpis": kpis,
+        "charts": charts,
+        "as_of": ctx.now,
+        "errors": prepared.errors,
+    }
@@ -0,0 +1,20 @@
+# tests/test_chart_renderers.py
+
+import numpy as np
+
+from utils.chart_renderers import MAX_BINS, histogram_summary, render_metric
+
+
+def test_histogram_bins_are_capped_before_edges_are_built():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([rng.normal(1e6, 10, 1_000_000), np.full(100, 5e10)])
+    counts, edges = histogram_summary(values)
+    assert len(counts) == MAX_BINS
+    assert counts.sum() == len(values)
+    assert render_metric("salary_distribution", values, "histogram") is not None
+
+
+def test_histogram_matches_freedman_diaconis_below_the_cap():
+    values = np.random.default_rng(1).normal(50, 10, 5000)
+    counts, _ = histogram_summary(values)
+    assert len(counts) == len(np.histogram_bin_edges(values, bins="fd")) - 1
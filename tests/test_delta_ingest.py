@@ -0,0 +1,35 @@
+# tests/test_delta_ingest.py
+
+import pandas as pd
+
+from utils.columnar_store import read_cached
+from utils.delta_ingest import apply_delta
+
+
+def _employees(tmp_path):
+    path = tmp_path / "employee_master.xlsx"
+    pd.DataFrame({
+        "employee_id": [1, 2, 3],
+        "department": ["Sales", "Finance", "Data"],
+        "band": ["B1", "B2", "B3"],
+        "total_ctc_pa": [500000.0, 800000.0, 1200000.0],
+        "date_of_joining": pd.to_datetime(["2020-04-01", "2021-06-15", "2019-01-10"]),
+        "date_of_exit": pd.NaT,
+    }).to_excel(path, index=False)
+    return str(path)
+
+
+def test_partial_upsert_keeps_the_columns_the_delta_lacks(tmp_path):
+    path = _employees(tmp_path)
+    delta = tmp_path / "exits.csv"
+    pd.DataFrame({"employee_id": [2, 4], "date_of_exit": ["2025-01-31", None]}).to_csv(delta, index=False)
+
+    entry = apply_delta("employee_master", str(delta), "upsert", data_files={"employee_master": path})
+    df = read_cached(path).set_index("employee_id")
+
+    assert (entry["removed"], entry["added"]) == (1, 2)
+    assert df.loc[2, "date_of_exit"] == pd.Timestamp("2025-01-31")
+    assert df.loc[2, ["department", "band", "total_ctc_pa"]].tolist() == ["Finance", "B2", 800000.0]
+    assert df.loc[2, "date_of_joining"] == pd.Timestamp("2021-06-15")
+    assert df.loc[[1, 3], "department"].tolist() == ["Sales", "Data"]
+    assert pd.isna(df.loc[4, "department"])
@@ -0,0 +1,37 @@
+# tests/test_sales_productivity.py
+
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic_data import generate_datasets
+from reports import sales_productivity
+from utils.data_handler import normalize_dataset
+from utils.filter_index import FilterIndex
+
+NOW = datetime(2026, 3, 31)
+
+
+@pytest.fixture(scope="module")
+def datasets():
+    data = generate_datasets(4000, seed=3, today=NOW)
+    return {key: normalize_dataset(key, df) for key, df in data.items()}
+
+
+def _revenue(datasets, filters):
+    employees = datasets["employee_master"]
+    data = {**datasets, "employee_master": FilterIndex(employees).apply(employees, filters)}
+    report = sales_productivity.run_report(data, {"population": employees, "filters": filters, "engine": "pandas",
+                                                  "chart_workers": 1})
+    assert not report["errors"]
+    return {kpi["label"]: kpi["value"] for kpi in report["kpis"]}["Revenue (Last 12 Months)"]
+
+
+@pytest.mark.parametrize("dim", ["band", "department", "zone"])
+def test_slice_revenue_adds_up_to_the_total(datasets, dim):
+    total = _revenue(datasets, {})
+    values = FilterIndex(datasets["employee_master"]).options[dim]
+    slices = [_revenue(datasets, {dim: [value]}) for value in values]
+    assert total > 0
+    assert np.isclose(sum(slices), total)
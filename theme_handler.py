@@ -1,6 +1,16 @@
 import streamlit as st
 import os
 
+CSS_PATHS = ["style.css", ".streamlit/style.css", "config/style.css"]
+
+@st.cache_resource(show_spinner=False)
+def load_css(path, mtime):
+    """
+    Stylesheet contents, read from disk once per file modification time.
+    """
+    with open(path) as f:
+        return f.read()
+
 def selected_theme():
     st.set_page_config(
         page_title="Worklense HR BI",
@@ -10,12 +20,11 @@ def selected_theme():
     )
 
     # Find style.css in current, .streamlit, or config directory
-    css_paths = ["style.css", ".streamlit/style.css", "config/style.css"]
     css_found = False
-    for css_path in css_paths:
+    for css_path in CSS_PATHS:
         if os.path.exists(css_path):
-            with open(css_path) as f:
-                st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+            css = load_css(css_path, os.path.getmtime(css_path))
+            st.markdown(f"<style>{css}</style>", unsafe_allow_html=True)
             css_found = True
             break
     if not css_found:
@@ -0,0 +1,249 @@
+# utils/attrition_engine.py
+
+"""
+Monthly attrition and joiner-cohort survival for every segment at once.
+
+Join and exit dates are converted once to integer month numbers. For a set
+of segment dimensions (e.g. ["department"], or none for the whole
+population) each row gets a segment code, and a single bincount over
+(segment, month) buckets yields the joiners and leavers of every segment
+and month; a cumulative sum along the month axis turns them into month-end
+headcounts. Rolling and fiscal-year rates are differences of cumulative
+sums over that matrix, so the cost is one pass over the rows plus
+O(segments x months), with no loop per segment or month.
+
+MonthlyAttrition holds the rates and the survival estimate; subclasses only
+supply the event counts. AttritionEngine counts the rows of a frame;
+query_engine.SqlAttrition gets the same counts from a database group-by.
+
+Definitions (consistent with utils/headcount_engine.py):
+
+* month-end headcount: joined in or before the month and not exited by its
+  end;
+* rolling attrition for month M: leavers in the `window` months ending
+  with M divided by the average month-end headcount over those months;
+* FY attrition: leavers in the fiscal year divided by its average
+  month-end headcount (year to date for the current FY);
+* cohort survival: Kaplan-Meier share of a join-FY cohort still employed
+  k months after joining; employees still active are censored at today.
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils.fiscal_calendar import FY_START_MONTH, fiscal_year
+
+
+def _month_numbers(values):
+    """
+    Months since 1970-01 of each date (NaT -> -1, later masked out).
+    """
+    months = pd.to_datetime(values).to_numpy().astype("datetime64[M]")
+    missing = np.isnat(months)
+    return np.where(missing, -1, months.astype("int64")), ~missing
+
+
+def _month_start(number):
+    return pd.Timestamp(np.datetime64(int(number), "M"))
+
+
+def _with_level(index, values, name):
+    """
+    Row index of every (segment, value) pair, segment-major.
+    """
+    frame = index.to_frame(index=False).loc[np.repeat(np.arange(len(index)), len(values))]
+    frame[name] = np.tile(values, len(index))
+    return pd.MultiIndex.from_frame(frame.reset_index(drop=True))
+
+
+def _window_sum(matrix, window):
+    """
+    Sum over the trailing `window` columns of each column (first window-1 dropped).
+    """
+    padded = np.cumsum(np.pad(matrix, ((0, 0), (1, 0))), axis=1)
+    return padded[:, window:] - padded[:, :-window]
+
+
+class MonthlyAttrition:
+    """
+    Rolling / FY attrition and cohort survival over the event counts of a
+    subclass (monthly and cohort_events).
+    """
+
+    def __init__(self, now=None):
+        self.now = pd.Timestamp(now) if now is not None else pd.Timestamp.now()
+        self.current_month = int(np.datetime64(self.now, "M").astype("int64"))
+
+    def monthly(self, first, n_months, dims=()):
+        """
+        (index, month-end headcount, leavers) for months first..first+n_months-1
+        (month numbers); both arrays are segments x months.
+        """
+        raise NotImplementedError
+
+    def cohort_events(self, fy_years, dims, max_months):
+        """
+        (index, cohort slot, tenure months capped at max_months + 1, exited,
+        weight) per member group of the join-FY cohorts in fy_years; the
+        cohort slot is segment * len(fy_years) + position of the FY.
+        """
+        raise NotImplementedError
+
+    def _month_range(self, start, end):
+        first = int(np.datetime64(pd.Timestamp(start), "M").astype("int64"))
+        last = int(np.datetime64(pd.Timestamp(end or self.now), "M").astype("int64"))
+        return first, max(last - first + 1, 0)
+
+    def rolling_attrition(self, start, end=None, dims=(), window=12):
+        """
+        Rolling `window`-month attrition % per segment (rows) and month
+        (columns, month starts) from start to end (default: now). NaN where
+        the segment had no headcount.
+        """
+        first, n_months = self._month_range(start, end)
+        index, headcount, leavers = self.monthly(first - window + 1, n_months + window - 1, dims)
+        avg_headcount = _window_sum(headcount, window) / window
+        rate = np.divide(_window_sum(leavers, window) * 100.0, avg_headcount,
+                         out=np.full(avg_headcount.shape, np.nan), where=avg_headcount > 0)
+        columns = pd.DatetimeIndex([_month_start(first + i) for i in range(n_months)], name="month")
+        return pd.DataFrame(rate, index=index, columns=columns)
+
+    def fy_attrition(self, fy_years, dims=()):
+        """
+        Leavers, average month-end headcount and attrition % per segment and
+        FY code. Returns a DataFrame with a (segment..., fy) row index.
+        """
+        fy_years = np.asarray(fy_years, dtype=np.int64)
+        first = int((fy_years.min() - 1) * 12 + FY_START_MONTH - 1 - 1970 * 12)
+        last = min(int((fy_years.max()) * 12 + FY_START_MONTH - 2 - 1970 * 12), self.current_month)
+        n_months = max(last - first + 1, 0)
+        index, headcount, leavers = self.monthly(first, n_months, dims)
+
+        # Month -> FY slot as a (months x FYs) 0/1 matrix, so each sum is one matmul
+        month_fy = fiscal_year(np.arange(first, first + n_months).astype("datetime64[M]"))
+        in_fy = (month_fy[:, None] == fy_years[None, :]).astype("float64")
+        months_in_fy = in_fy.sum(axis=0)
+        avg_headcount = np.divide(headcount @ in_fy, months_in_fy, out=np.zeros((len(index), len(fy_years))),
+                                  where=months_in_fy > 0)
+        exits = leavers @ in_fy
+        rate = np.divide(exits * 100.0, avg_headcount, out=np.zeros_like(exits), where=avg_headcount > 0)
+        return pd.DataFrame({
+            "leavers": exits.ravel().astype(np.int64),
+            "avg_headcount": avg_headcount.ravel(),
+            "attrition": rate.ravel(),
+        }, index=_with_level(index, fy_years, "fy"))
+
+    def cohort_survival(self, fy_years, dims=(), max_months=36):
+        """
+        Kaplan-Meier survival (share still employed, 0-1) of each join-FY
+        cohort in fy_years at 0..max_months months of tenure. Rows are
+        (segment..., cohort FY), columns months since joining; NaN once no
+        member of the cohort has been observed that long.
+        """
+        fy_years = np.asarray(fy_years, dtype=np.int64)
+        index, cohort, capped, event, weight = self.cohort_events(fy_years, dims, max_months)
+        n_cohorts, width = len(index) * len(fy_years), max_months + 2
+
+        # Durations past max_months only matter as "still at risk" at the end
+        ended = np.bincount(cohort * width + capped, weights=weight,
+                            minlength=n_cohorts * width).reshape(n_cohorts, width)
+        exited = np.bincount(cohort[event] * width + capped[event], weights=weight[event],
+                             minlength=n_cohorts * width).reshape(n_cohorts, width)
+        at_risk = np.cumsum(ended[:, ::-1], axis=1)[:, ::-1]  # members with duration >= k
+        hazard = np.divide(exited, at_risk, out=np.zeros(at_risk.shape), where=at_risk > 0)
+        survival = np.cumprod(1.0 - hazard, axis=1)[:, :max_months + 1]
+        # Survival "at k months" counts exits up to and including month k-1
+        survival = np.concatenate([np.ones((n_cohorts, 1)), survival[:, :-1]], axis=1)
+        survival[at_risk[:, :max_months + 1] == 0] = np.nan
+
+        return pd.DataFrame(survival, index=_with_level(index, fy_years, "cohort"),
+                            columns=pd.RangeIndex(max_months + 1, name="months"))
+
+
+class AttritionEngine(MonthlyAttrition):
+    """
+    Month-bucketed join/exit events of an employee frame.
+    """
+
+    def __init__(self, df, now=None):
+        super().__init__(now)
+        self.df = df
+        if "date_of_joining" in df.columns:
+            joins, joined = _month_numbers(df["date_of_joining"])
+        else:
+            joins, joined = np.full(len(df), -1), np.zeros(len(df), dtype=bool)
+        if "date_of_exit" in df.columns:
+            exits, left = _month_numbers(df["date_of_exit"])
+        else:
+            exits, left = np.full(len(df), -1), np.zeros(len(df), dtype=bool)
+
+        # As in HeadcountTimeline: rows without a join date never count, and
+        # an exit before the join month is clamped so the two events cancel.
+        self.valid = joined
+        self.join_month = joins
+        self.left = left & joined
+        self.exit_month = np.where(self.left, np.maximum(exits, joins), -1)
+        self._segments = {}
+
+    def segments(self, dims=()):
+        """
+        (segment code per row, index of segments) for a tuple of dimensions.
+        Rows with a missing dimension value get code -1 and are left out.
+        """
+        dims = tuple(d for d in dims if d in self.df.columns)
+        if dims not in self._segments:
+            if not dims:
+                self._segments[dims] = np.zeros(len(self.df), dtype=np.int64), pd.Index(["All"], name="segment")
+            else:
+                self._segments[dims] = self._segment_codes(dims)
+        return self._segments[dims]
+
+    def _segment_codes(self, dims):
+        # Combine the per-dimension category codes into one integer per row
+        # and keep only the combinations that occur (sorted, like groupby).
+        codes, levels = [], []
+        for dim in dims:
+            column = self.df[dim]
+            if not isinstance(column.dtype, pd.CategoricalDtype):
+                column = column.astype("category")
+            codes.append(column.cat.codes.to_numpy().astype(np.int64))
+            levels.append(column.cat.categories)
+        missing = np.logical_or.reduce([c < 0 for c in codes])
+        combined = np.ravel_multi_index([np.where(missing, 0, c) for c in codes], [max(len(l), 1) for l in levels])
+        observed, inverse = np.unique(combined[~missing], return_inverse=True)
+        segment = np.full(len(self.df), -1, dtype=np.int64)
+        segment[~missing] = inverse
+        parts = np.unravel_index(observed, [max(len(l), 1) for l in levels])
+        index = pd.MultiIndex.from_arrays([l[p] for l, p in zip(levels, parts)], names=list(dims))
+        return segment, index if len(dims) > 1 else index.get_level_values(0)
+
+    def _counts(self, codes, n_segments, months, mask, first, n_months):
+        """
+        (segments x n_months+1) event counts; column 0 holds all events
+        before month `first`, events after the last month are dropped.
+        """
+        col = np.clip(months - first + 1, 0, None)
+        keep = mask & (codes >= 0) & (col <= n_months)
+        flat = codes[keep] * (n_months + 1) + col[keep]
+        return np.bincount(flat, minlength=n_segments * (n_months + 1)).reshape(n_segments, n_months + 1)
+
+    def monthly(self, first, n_months, dims=()):
+        codes, index = self.segments(tuple(dims))
+        joins = self._counts(codes, len(index), self.join_month, self.valid, first, n_months)
+        exits = self._counts(codes, len(index), self.exit_month, self.left, first, n_months)
+        headcount = np.cumsum(joins - exits, axis=1)[:, 1:]
+        return index, headcount, exits[:, 1:]
+
+    def cohort_events(self, fy_years, dims, max_months):
+        codes, index = self.segments(tuple(dims))
+        join_fy = fiscal_year(np.where(self.valid, self.join_month, 0).astype("datetime64[M]"))
+        slot = np.searchsorted(fy_years, join_fy)
+        slot_ok = (slot < len(fy_years)) & (fy_years[np.minimum(slot, len(fy_years) - 1)] == join_fy)
+        member = self.valid & slot_ok & (codes >= 0)
+
+        # Months of tenure at exit (event) or up to now (censored)
+        end = np.where(self.left, self.exit_month, self.current_month)
+        duration = np.clip(end - self.join_month, 0, None)[member]
+        cohort = codes[member] * len(fy_years) + slot[member]
+        capped = np.minimum(duration, max_months + 1)
+        return index, cohort, capped, self.left[member], np.ones(len(cohort))
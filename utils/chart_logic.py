@@ -3,32 +3,23 @@ import pandas as pd
 import plotly.express as px
 from datetime import datetime
 
-def prepare_manpower_charts(df, fy_list, now):
-    fy_years = [int(fy[-2:]) + 2000 for fy in fy_list]
-    fy_ends = [datetime(y, 3, 31) for y in fy_years]
-    year_end_headcounts = []
-    year_end_costs = []
-
-    for i, fy_end in enumerate(fy_ends):
-        if i == len(fy_ends) - 1:
-            mask = (pd.to_datetime(df["date_of_joining"], errors="coerce") <= now) & (
-                df["date_of_exit"].isna() | (pd.to_datetime(df["date_of_exit"], errors="coerce") > now)
-            )
-        else:
-            mask = (pd.to_datetime(df["date_of_joining"], errors="coerce") <= fy_end) & (
-                df["date_of_exit"].isna() | (pd.to_datetime(df["date_of_exit"], errors="coerce") > fy_end)
-            )
-
-        headcount = df[mask].shape[0]
-        cost = df.loc[mask, "total_ctc_pa"].sum() / 1e7 if "total_ctc_pa" in df.columns else 0
-
-        year_end_headcounts.append(headcount)
-        year_end_costs.append(cost)
+from utils.fiscal_calendar import parse_fy_label
+from utils.headcount_engine import HeadcountTimeline
+from utils.tracing import traced
+
+@traced()
+def prepare_manpower_charts(df, fy_list, now, timeline=None):
+    fy_years = [parse_fy_label(fy) for fy in fy_list]
+    # The last point is "Today" rather than the end of the current FY
+    as_of_dates = [datetime(y, 3, 31) for y in fy_years[:-1]] + [now]
+
+    timeline = timeline or HeadcountTimeline(df)
+    year_end_headcounts, year_end_costs = timeline.as_of(as_of_dates)
 
     df_out = pd.DataFrame({
         "FY": fy_list,
         "Year-End Headcount": year_end_headcounts,
-        "Year-End Cost (INR Cr)": year_end_costs
+        "Year-End Cost (INR Cr)": year_end_costs / 1e7
     })
 
     df_out.loc[df_out.index[-1], "FY"] = "Today"
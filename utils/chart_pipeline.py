@@ -0,0 +1,109 @@
+# utils/chart_pipeline.py
+
+"""
+Concurrent execution of independent chart prepare steps.
+
+Report prepare functions are pure pandas/NumPy aggregations over a shared
+ReportContext, so they can run side by side on a thread pool (large NumPy
+and pandas kernels release the GIL). Results come back in submission order
+for rendering; a step that raises or exceeds its timeout yields a default
+value instead of failing the whole page, and is listed in the results'
+`errors` so the report can say which chart is missing (and is not cached).
+
+A step that times out cannot be interrupted: it keeps running on the shared
+pool until it finishes and occupies one of its workers meanwhile, so later
+renders may queue behind it. The timeout bounds the page, not the work.
+
+Worker count and timeout default to WORKLENSE_CHART_WORKERS and
+WORKLENSE_CHART_TIMEOUT (seconds).
+"""
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from utils.tracing import current_trace
+
+logger = logging.getLogger(__name__)
+
+CHART_WORKERS = int(os.environ.get("WORKLENSE_CHART_WORKERS", min(8, os.cpu_count() or 1)))
+CHART_TIMEOUT = float(os.environ.get("WORKLENSE_CHART_TIMEOUT", 30))
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def _get_executor(max_workers):
+    """
+    Shared pool per worker count, so reruns do not spawn new threads.
+    """
+    with _executors_lock:
+        if max_workers not in _executors:
+            _executors[max_workers] = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="chart-prepare"
+            )
+        return _executors[max_workers]
+
+
+class PrepareResults(list):
+    """
+    Step results in submission order; errors maps the name of every step
+    that failed or timed out to a short reason.
+    """
+
+    def __init__(self, results, errors):
+        super().__init__(results)
+        self.errors = errors
+
+
+def run_prepare_steps(steps, max_workers=None, timeout=None, default=None, names=None):
+    """
+    Run the zero-argument callables in steps concurrently.
+
+    Returns their results in the same order as a PrepareResults list. A step
+    that raises, or is not done `timeout` seconds after submission, is
+    logged, recorded in .errors under its name (names[i], default "step i")
+    and replaced by default (called with no arguments when it is callable,
+    e.g. pd.DataFrame). With max_workers=1 the steps run inline and the
+    timeout does not apply.
+    """
+    max_workers = max_workers or CHART_WORKERS
+    timeout = CHART_TIMEOUT if timeout is None else timeout
+    names = names or [f"step {i}" for i in range(len(steps))]
+    errors = {}
+
+    def fallback(i, reason, exc):
+        logger.warning("Chart step %s %s: %r", names[i], reason, exc)
+        errors[names[i]] = reason
+        return default() if callable(default) else default
+
+    if max_workers <= 1:
+        results = []
+        for i, step in enumerate(steps):
+            try:
+                results.append(step())
+            except Exception as exc:
+                results.append(fallback(i, "failed", exc))
+        return PrepareResults(results, errors)
+
+    executor = _get_executor(max_workers)
+    deadline = time.monotonic() + timeout
+    if current_trace() is not None:
+        # Run each step in a copy of this context so its spans join the trace
+        futures = [executor.submit(contextvars.copy_context().run, step) for step in steps]
+    else:
+        futures = [executor.submit(step) for step in steps]
+    results = []
+    for i, future in enumerate(futures):
+        try:
+            results.append(future.result(timeout=max(0.0, deadline - time.monotonic())))
+        except TimeoutError as exc:
+            # Only drops a step still queued; a running one keeps its worker
+            future.cancel()
+            results.append(fallback(i, "timed out", exc))
+        except Exception as exc:
+            results.append(fallback(i, "failed", exc))
+    return PrepareResults(results, errors)
@@ -0,0 +1,324 @@
+# utils/chart_renderers.py
+
+"""
+Renderer registry for the distribution chart types of chart_config.CHART_CONFIG.
+
+Renderers are registered under the names listed in CHART_CONFIG
+("render_histogram", "render_box_plot", ...) and looked up with
+get_renderer(metric, chart_type). They take raw values (optionally split by
+a groups Series) and summarise them in NumPy before building the figure:
+
+* histogram / bell curve: bin counts (at most MAX_BINS bars);
+* box plot: quartiles, whiskers and mean per group;
+* violin / density: a binned Gaussian KDE sampled at KDE_POINTS.
+
+Only these summaries go into the figure, so its JSON stays in kilobytes for
+any number of employees. The points that must be drawn individually (box
+outliers) use WebGL (scattergl) and are capped at MAX_POINTS per group.
+
+The category renderers (pie, bar) are registered with counts=True: they take
+counts per category (a Series indexed by label, e.g. engine bin counts)
+instead of raw values; takes_counts tells a report which input to prepare.
+
+A report whose chart type is chosen by the user returns metric_chart(...)
+instead of a figure: the counts and/or raw values the metric's chart types
+need. The app renders it with render_prepared in the selected type, so a
+type change redraws the chart from the cached report without recomputing it.
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from chart_config import CHART_CONFIG
+from utils.tracing import traced
+
+MAX_BINS = 50
+KDE_POINTS = 200
+KDE_GRID = 1024
+MAX_POINTS = 500
+
+RENDERERS = {}
+COUNT_RENDERERS = set()
+
+
+def renderer(name, counts=False):
+    """
+    Register a renderer under its CHART_CONFIG name (counts: it takes counts
+    per category instead of raw values).
+    """
+    def register(fn):
+        RENDERERS[name] = fn
+        if counts:
+            COUNT_RENDERERS.add(name)
+        return fn
+    return register
+
+
+def _clean(values):
+    values = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype="float64")
+    return values[np.isfinite(values)]
+
+
+def _split(values, groups=None):
+    """
+    [(name, finite values)] per group, or one unnamed group.
+    """
+    if groups is None:
+        return [("", _clean(values))]
+    frame = pd.DataFrame({"value": pd.to_numeric(pd.Series(values).reset_index(drop=True), errors="coerce"),
+                          "group": pd.Series(groups).reset_index(drop=True)})
+    frame = frame[np.isfinite(frame["value"])]
+    return [(str(name), part["value"].to_numpy()) for name, part in frame.groupby("group", observed=True)]
+
+
+def histogram_summary(values, max_bins=MAX_BINS):
+    """
+    (counts, edges) with Freedman-Diaconis bins, capped at max_bins. The bin
+    count is derived from the IQR before any edges exist, so a few extreme
+    outliers cannot blow up the number of edges.
+    """
+    q1, q3 = np.percentile(values, [25, 75])
+    width = 2 * (q3 - q1) * len(values) ** (-1 / 3)
+    span = values.max() - values.min()
+    n_bins = int(np.ceil(span / width)) if width > 0 and span > 0 else 1
+    return np.histogram(values, bins=min(max(n_bins, 1), max_bins))
+
+
+def box_summary(values, max_points=MAX_POINTS):
+    """
+    Quartiles, 1.5 IQR whiskers, mean and (an evenly spaced subset of) outliers.
+    """
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    lower, upper = inside.min(), inside.max()
+    outliers = np.sort(values[(values < lower) | (values > upper)])
+    if len(outliers) > max_points:
+        outliers = outliers[np.linspace(0, len(outliers) - 1, max_points).astype(int)]
+    return {
+        "q1": q1, "median": median, "q3": q3,
+        "lowerfence": lower, "upperfence": upper,
+        "mean": values.mean(), "outliers": outliers,
+    }
+
+
+def kde_curve(values, points=KDE_POINTS, grid_size=KDE_GRID):
+    """
+    Gaussian KDE (Silverman bandwidth) from binned counts: values are counted
+    on a fine grid and the counts convolved with the kernel, which costs
+    O(n + grid) instead of O(n * points). Returns (x, density).
+    """
+    n = len(values)
+    spread = min(values.std(), np.subtract(*np.percentile(values, [75, 25])) / 1.34) or values.std()
+    bandwidth = 0.9 * spread * n ** -0.2 if spread > 0 else 1.0
+    lo, hi = values.min() - 3 * bandwidth, values.max() + 3 * bandwidth
+    step = (hi - lo) / (grid_size - 1)
+    counts = np.bincount(np.rint((values - lo) / step).astype(np.int64), minlength=grid_size)[:grid_size]
+
+    half = min(int(np.ceil(4 * bandwidth / step)), grid_size // 2 - 1)
+    kernel = np.exp(-0.5 * (np.arange(-half, half + 1) * step / bandwidth) ** 2)
+    density = np.convolve(counts, kernel / kernel.sum(), mode="same") / (n * step)
+
+    x = np.linspace(lo, hi, points)
+    return x, np.interp(x, lo + step * np.arange(grid_size), density)
+
+
+@renderer("render_histogram")
+def render_histogram(values, groups=None, title=None, label=None):
+    fig = go.Figure()
+    parts = [(name, v) for name, v in _split(values, groups) if len(v)]
+    if not parts:
+        return None
+    _, edges = histogram_summary(np.concatenate([v for _, v in parts]))
+    for name, v in parts:
+        counts, _ = np.histogram(v, bins=edges)
+        fig.add_trace(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges),
+                             name=name or "Count", marker_line_width=0))
+    fig.update_layout(title=title, xaxis_title=label, yaxis_title="Count", barmode="stack", bargap=0,
+                      showlegend=groups is not None)
+    return fig
+
+
+@renderer("render_box_plot")
+def render_box_plot(values, groups=None, title=None, label=None):
+    fig = go.Figure()
+    for name, v in _split(values, groups):
+        if not len(v):
+            continue
+        stats = box_summary(v)
+        name = name or label or "Values"
+        fig.add_trace(go.Box(
+            x=[name], q1=[stats["q1"]], median=[stats["median"]], q3=[stats["q3"]],
+            lowerfence=[stats["lowerfence"]], upperfence=[stats["upperfence"]], mean=[stats["mean"]],
+            name=name, boxpoints=False,
+        ))
+        if len(stats["outliers"]):
+            fig.add_trace(go.Scattergl(x=[name] * len(stats["outliers"]), y=stats["outliers"], mode="markers",
+                                       marker=dict(size=4, opacity=0.5), name=f"{name} outliers", showlegend=False))
+    if not fig.data:
+        return None
+    fig.update_layout(title=title, yaxis_title=label, showlegend=False)
+    return fig
+
+
+@renderer("render_violin_plot")
+def render_violin_plot(values, groups=None, title=None, label=None):
+    fig = go.Figure()
+    names = []
+    for name, v in _split(values, groups):
+        if len(v) < 2:
+            continue
+        i = len(names)
+        names.append(name or label or "Values")
+        y, density = kde_curve(v)
+        half_width = density / density.max() * 0.4
+        fig.add_trace(go.Scatter(x=np.concatenate([i - half_width, (i + half_width)[::-1]]),
+                                 y=np.concatenate([y, y[::-1]]), fill="toself", mode="lines",
+                                 name=names[-1], hoverinfo="name"))
+        stats = box_summary(v)
+        fig.add_trace(go.Scatter(x=[i, i], y=[stats["q1"], stats["q3"]], mode="lines",
+                                 line=dict(color="black", width=6), showlegend=False, hoverinfo="y"))
+        fig.add_trace(go.Scatter(x=[i], y=[stats["median"]], mode="markers",
+                                 marker=dict(color="white", size=7), showlegend=False, hoverinfo="y"))
+    if not names:
+        return None
+    fig.update_layout(title=title, yaxis_title=label, showlegend=False)
+    fig.update_xaxes(tickvals=list(range(len(names))), ticktext=names)
+    return fig
+
+
+@renderer("render_density_plot")
+def render_density_plot(values, groups=None, title=None, label=None):
+    fig = go.Figure()
+    for name, v in _split(values, groups):
+        if len(v) < 2:
+            continue
+        x, density = kde_curve(v)
+        fig.add_trace(go.Scatter(x=x, y=density, mode="lines", fill="tozeroy", name=name or "Density"))
+    if not fig.data:
+        return None
+    fig.update_layout(title=title, xaxis_title=label, yaxis_title="Density", showlegend=groups is not None)
+    return fig
+
+
+@renderer("render_bell_curve")
+def render_bell_curve(values, groups=None, title=None, label=None):
+    values = _clean(values)
+    if len(values) < 2:
+        return None
+    counts, edges = histogram_summary(values)
+    density = counts / (len(values) * np.diff(edges))
+    mean, std = values.mean(), values.std()
+    x = np.linspace(edges[0], edges[-1], KDE_POINTS)
+    normal = np.exp(-0.5 * ((x - mean) / std) ** 2) / (std * np.sqrt(2 * np.pi)) if std > 0 else np.zeros_like(x)
+    fig = go.Figure([
+        go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=density, width=np.diff(edges), name="Observed",
+               marker_line_width=0, opacity=0.6),
+        go.Scatter(x=x, y=normal, mode="lines", name="Normal fit"),
+    ])
+    fig.update_layout(title=title, xaxis_title=label, yaxis_title="Density", bargap=0)
+    return fig
+
+
+@renderer("render_pie_chart", counts=True)
+def render_pie_chart(counts, groups=None, title=None, label=None):
+    counts = counts[counts > 0]
+    if counts.empty:
+        return None
+    fig = go.Figure(go.Pie(labels=counts.index.astype(str), values=counts.to_numpy(), sort=False,
+                           textinfo="label+percent+value"))
+    fig.update_layout(title=title, legend_title=label)
+    return fig
+
+
+@renderer("render_bar_chart", counts=True)
+def render_bar_chart(counts, groups=None, title=None, label=None):
+    if not counts.any():
+        return None
+    fig = go.Figure(go.Bar(x=counts.index.astype(str), y=counts.to_numpy(), text=counts.to_numpy()))
+    fig.update_layout(title=title, xaxis_title=label, yaxis_title="Count")
+    return fig
+
+
+def _renderer_name(metric, chart_type=None):
+    config = CHART_CONFIG.get(metric)
+    if config is None:
+        return None
+    chart_type = chart_type or config["chart_types"][0]
+    if chart_type not in config["chart_types"]:
+        return None
+    return config["renderers"][config["chart_types"].index(chart_type)]
+
+
+def available_chart_types(metric):
+    """
+    Chart types of a CHART_CONFIG metric that have a registered renderer.
+    """
+    config = CHART_CONFIG.get(metric, {"chart_types": []})
+    return [chart_type for chart_type in config["chart_types"] if _renderer_name(metric, chart_type) in RENDERERS]
+
+
+def takes_counts(metric, chart_type=None):
+    """
+    Whether the renderer of metric and chart_type takes counts per category.
+    """
+    return _renderer_name(metric, chart_type) in COUNT_RENDERERS
+
+
+def get_renderer(metric, chart_type=None):
+    """
+    Registered renderer for a CHART_CONFIG metric and chart type (default:
+    the metric's first chart type), or None if it is not implemented here.
+    """
+    return RENDERERS.get(_renderer_name(metric, chart_type))
+
+
+def needed_inputs(metric):
+    """
+    (values, counts): whether any registered chart type of metric takes raw
+    values, and whether any takes counts per category.
+    """
+    counts = [takes_counts(metric, chart_type) for chart_type in available_chart_types(metric)]
+    return not all(counts), any(counts)
+
+
+def metric_chart(metric, values=None, counts=None, groups=None, label=None):
+    """
+    Prepared data of a CHART_CONFIG metric for any of its chart types: raw
+    values (optionally split by groups) for the value renderers, counts per
+    category (a Series indexed by label) for the count renderers.
+    """
+    return {
+        "metric": metric,
+        "values": pd.to_numeric(pd.Series(values), errors="coerce").astype("float64").to_numpy() if values is not None else None,
+        "groups": np.asarray(groups, dtype=object) if groups is not None else None,
+        "counts": counts,
+        "label": label,
+    }
+
+
+def render_prepared(chart, chart_type=None):
+    """
+    Figure of a metric_chart in chart_type (default: the metric's first
+    type), or None when that type has no data or renderer.
+    """
+    if takes_counts(chart["metric"], chart_type):
+        data, groups = chart["counts"], None
+    else:
+        data, groups = chart["values"], chart["groups"]
+    if data is None:
+        return None
+    return render_metric(chart["metric"], data, chart_type, groups=groups, label=chart["label"])
+
+
+@traced()
+def render_metric(metric, values, chart_type=None, groups=None, label=None):
+    """
+    Figure for metric from raw values (counts per category for the pie and
+    bar renderers), or None when there is no renderer or data.
+    """
+    render = get_renderer(metric, chart_type)
+    if render is None:
+        return None
+    return render(values, groups=groups, title=CHART_CONFIG[metric]["description"], label=label)
@@ -0,0 +1,304 @@
+# utils/columnar_store.py
+
+"""
+Persistent columnar cache for the Excel data files.
+
+Each workbook is parsed once and written as Parquet to a `.cache` folder next
+to it. Later loads memory-map the Parquet file instead of re-parsing the
+spreadsheet, until the source file changes.
+
+Delta extracts (see utils/delta_ingest.py) are applied to the cached Parquet
+rather than the workbook: each one is recorded in the manifest's "deltas"
+list, and its removed/added rows are kept as <stem>.delta-NNNN.parquet so
+in-memory aggregates can be updated from them. A new source file replaces
+the cache and drops the deltas.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; without it we always parse Excel
+    pa = pq = None
+
+CACHE_DIRNAME = ".cache"
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+def cache_lock(path):
+    """
+    Reentrant lock serializing the cache builds of one source file in this
+    process, so concurrent first loads stream the workbook only once.
+    """
+    key = os.path.abspath(path)
+    with _locks_lock:
+        return _locks.setdefault(key, threading.RLock())
+
+
+def _temp_path(target):
+    """
+    New empty file next to target, unique per writer (also across
+    processes), to be moved over target with os.replace.
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(target) + ".", suffix=".tmp",
+                                    dir=os.path.dirname(target))
+    os.close(fd)
+    os.chmod(tmp_path, 0o644)  # mkstemp creates 0600
+    return tmp_path
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """
+    SHA-256 of the file contents, read in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_signature(path):
+    """
+    Cheap identity of a source file: absolute path, mtime and size.
+    """
+    stat = os.stat(path)
+    return {
+        "source": os.path.abspath(path),
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+    }
+
+
+def cache_paths(path):
+    """
+    Return (parquet_path, manifest_path) for a source file.
+    """
+    folder = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIRNAME)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return (
+        os.path.join(folder, f"{stem}.parquet"),
+        os.path.join(folder, f"{stem}.manifest.json"),
+    )
+
+
+def read_manifest(path):
+    """
+    Load the cache manifest for a source file, or None if there is none.
+    """
+    _, manifest_path = cache_paths(path)
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(path, manifest):
+    """
+    Atomically replace the cache manifest for a source file.
+    """
+    _, manifest_path = cache_paths(path)
+    tmp_path = _temp_path(manifest_path)
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, manifest_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _check_manifest(path):
+    """
+    Return the manifest if the cached Parquet still matches the source file.
+
+    mtime/size are compared first; only when they differ is the content hash
+    recomputed, so a touched-but-identical file does not force a rebuild.
+    """
+    manifest = read_manifest(path)
+    parquet_path, _ = cache_paths(path)
+    if manifest is None or not os.path.exists(parquet_path):
+        return None
+    signature = source_signature(path)
+    if manifest.get("source") != signature["source"]:
+        return None
+    if manifest.get("mtime_ns") == signature["mtime_ns"] and manifest.get("size") == signature["size"]:
+        return manifest
+    if manifest.get("sha256") == file_hash(path):
+        manifest.update(signature)
+        write_manifest(path, manifest)
+        return manifest
+    return None
+
+
+def _write_table(parquet_path, df):
+    os.makedirs(os.path.dirname(parquet_path), exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp_path = _temp_path(parquet_path)
+    try:
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, parquet_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def delta_paths(path):
+    """
+    Stored change files of the deltas applied to the cache of path, in order.
+    """
+    parquet_path, _ = cache_paths(path)
+    return sorted(glob.glob(parquet_path[:-len(".parquet")] + ".delta-*.parquet"))
+
+
+def write_cache(path, df):
+    """
+    Write df as the columnar cache of the source file at path.
+    Returns the new manifest.
+    """
+    parquet_path, _ = cache_paths(path)
+    _write_table(parquet_path, df)
+    for stale in delta_paths(path):
+        os.remove(stale)
+
+    manifest = source_signature(path)
+    manifest["sha256"] = file_hash(path)
+    manifest["rows"] = len(df)
+    write_manifest(path, manifest)
+    return manifest
+
+
+def write_cache_chunks(path, chunks, columns=None):
+    """
+    Write the DataFrames yielded by chunks as the columnar cache of path,
+    one row group at a time through a ParquetWriter, so only one chunk is
+    in memory. Every chunk is cast to the schema of the first. columns (the
+    projection the chunks were read with, None for all) is recorded in the
+    manifest. Returns the new manifest.
+    """
+    parquet_path, _ = cache_paths(path)
+    os.makedirs(os.path.dirname(parquet_path), exist_ok=True)
+    tmp_path = _temp_path(parquet_path)
+    writer, rows = None, 0
+    try:
+        for df in chunks:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema)
+            else:
+                table = table.cast(writer.schema)
+            writer.write_table(table)
+            rows += len(df)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        os.remove(tmp_path)
+        raise
+    if writer is None:
+        os.remove(tmp_path)
+        raise ValueError(f"No rows or header read from {path}")
+    writer.close()
+    os.replace(tmp_path, parquet_path)
+    for stale in delta_paths(path):
+        os.remove(stale)
+
+    manifest = source_signature(path)
+    manifest["sha256"] = file_hash(path)
+    manifest["rows"] = rows
+    manifest["columns"] = columns
+    write_manifest(path, manifest)
+    return manifest
+
+
+def write_delta(path, df, changes, entry):
+    """
+    Replace the cached frame of path with df after a delta, keep its changed
+    rows and record entry in the manifest. The source signature is left as
+    is, so the cache stays valid until the workbook itself changes.
+    """
+    manifest = _check_manifest(path)
+    if manifest is None:
+        raise ValueError(f"No fresh columnar cache for {path}")
+    deltas = manifest.setdefault("deltas", [])
+    parquet_path, _ = cache_paths(path)
+    _write_table(parquet_path[:-len(".parquet")] + f".delta-{len(deltas) + 1:04d}.parquet", changes)
+    _write_table(parquet_path, df)
+    deltas.append(entry)
+    manifest["rows"] = len(df)
+    write_manifest(path, manifest)
+    return manifest
+
+
+def read_delta(path, n):
+    """
+    Changed rows of the n-th (1-based) delta applied to the cache of path.
+    """
+    parquet_path, _ = cache_paths(path)
+    return pq.read_table(parquet_path[:-len(".parquet")] + f".delta-{n:04d}.parquet").to_pandas()
+
+
+def read_cache(path):
+    """
+    Memory-map the cached Parquet file for a source path into a DataFrame.
+    """
+    parquet_path, _ = cache_paths(path)
+    return pq.read_table(parquet_path, memory_map=True).to_pandas()
+
+
+def read_cached(path, reader=pd.read_excel):
+    """
+    Read a source file through the columnar cache.
+
+    Returns the cached frame when it is still fresh, otherwise parses the
+    source with `reader` and rebuilds the cache. Falls back to the plain
+    reader when pyarrow is unavailable or the frame cannot be stored.
+    """
+    if pq is None:
+        return reader(path)
+    # Held across check, parse and write: a second thread waits for the
+    # first build and then reads its cache instead of parsing again
+    with cache_lock(path):
+        if _check_manifest(path) is not None:
+            return read_cache(path)
+        df = reader(path)
+        try:
+            write_cache(path, df)
+        except (pa.ArrowException, OSError):
+            pass  # Mixed-type columns or read-only disk: serve uncached
+        return df
+
+
+def cache_revision(path):
+    """
+    (source sha256, number of applied deltas) of a fresh cache, or None.
+    """
+    manifest = _check_manifest(path) if pq is not None else None
+    if manifest is None:
+        return None
+    return manifest["sha256"], len(manifest.get("deltas", []))
+
+
+def cached_version(path):
+    """
+    Version token for a source file, used to key downstream caches.
+    """
+    if not os.path.exists(path):
+        return "missing"
+    manifest = _check_manifest(path) if pq is not None else None
+    if manifest is not None and manifest.get("deltas"):
+        return f"{manifest['sha256']}+{len(manifest['deltas'])}-{manifest['deltas'][-1]['sha256'][:12]}"
+    if manifest is not None:
+        return manifest["sha256"]
+    signature = source_signature(path)
+    return f"{signature['mtime_ns']}-{signature['size']}"
@@ -1,20 +1,158 @@
 # utils/data_handler.py
 
+import hashlib
+import logging
+import os
+
 import pandas as pd
 import streamlit as st
 
-@st.cache_data(show_spinner=False)
-def load_all_data(data_files):
+from utils.columnar_store import read_cached, cached_version
+from utils.excel_ingest import ingest_excel
+from utils.schema import DATASET_SCHEMAS
+
+logger = logging.getLogger(__name__)
+
+# Debug mode: fingerprint every shared dataset at load time and check it after
+# each report run (see verify_unmodified); costs one hash pass per dataset.
+DEBUG_MUTATION = os.environ.get("WORKLENSE_DEBUG_MUTATION", "") not in ("", "0")
+_fingerprints = {}
+
+# Data versions published by the warm-up worker (utils/warmup.py) once
+# everything built on them is ready: {path: version}. Replaced as a whole,
+# so a reader sees either the old or the new mapping.
+_published_versions = {}
+# Frames of the last two published generations, held outside load_dataset's
+# bounded cache: a published version is never evicted and then re-read from
+# a newer file on disk. {(key, path, version): df}
+_pinned = {}
+_pinned_latest = {}
+
+# WORKLENSE_DATA_DIR points the app at another data directory (e.g. synthetic
+# data for load tests) without touching the files under data/.
+DATA_DIR = os.environ.get("WORKLENSE_DATA_DIR", "data")
+
+DATA_FILES = {
+    'employee_master': os.path.join(DATA_DIR, 'employee_master.xlsx'),
+    'leave': os.path.join(DATA_DIR, 'HRMS_Leave.xlsx'),
+    'sales': os.path.join(DATA_DIR, 'Sales_INR.xlsx')
+}
+
+def read_dataset(key, path):
+    """
+    Load one data file through the columnar cache (see utils/columnar_store.py)
+    and normalize it to its declared schema (see utils/schema.py). A workbook
+    without a fresh cache is first streamed into it (see utils/excel_ingest.py).
+    """
+    try:
+        ingest_excel(key, path)
+        return normalize_dataset(key, read_cached(path))
+    except Exception:
+        return pd.DataFrame()  # Empty fallback if missing/broken
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def load_dataset(key, path, version):
+    """
+    read_dataset held once per process and shared by all sessions (not
+    copied per caller); `version` keys the cache so a changed file is
+    reloaded. Treat the result as read-only: use load_all_data for views.
+
+    Raises StaleVersionError instead of caching the file under `version`
+    when the file on disk is no longer that version.
+    """
+    if cached_version(path) != version:
+        raise StaleVersionError(f"{path} is no longer at version {version}")
+    df = read_dataset(key, path)
+    if DEBUG_MUTATION:
+        _fingerprints[(key, path, version)] = frame_fingerprint(df)
+    return df
+
+class StaleVersionError(RuntimeError):
+    """
+    A data file changed after its version was read; reload the new version.
+    """
+
+def shared_dataset(key, path, version):
+    """
+    The shared frame of one dataset version: pinned if published, else
+    through load_dataset.
+    """
+    df = _pinned.get((key, path, version))
+    return df if df is not None else load_dataset(key, path, version)
+
+def load_all_data(data_files, versions=None):
     """
     Load all Excel data files into a dictionary of DataFrames.
+    Each file is cached separately, so loading a subset only parses that subset.
+    versions ({path: version}, default current_versions) selects the data version.
+
+    The frames are shallow views of the shared datasets: no data is copied,
+    and with pandas copy-on-write any change a caller makes to a view copies
+    the touched columns instead of writing into the shared frame.
+    """
+    versions = versions or current_versions(data_files)
+    return {
+        key: shared_dataset(key, path, versions[path]).copy(deep=False)
+        for key, path in data_files.items()
+    }
+
+def publish_versions(versions, data_files=DATA_FILES):
+    """
+    Make versions ({path: version}) current for every session at once and
+    pin their frames (the previous generation stays pinned for sessions
+    that took their snapshot just before the swap).
     """
-    data = {}
+    global _published_versions, _pinned, _pinned_latest
+    frames = {
+        (key, path, versions[path]): load_dataset(key, path, versions[path])
+        for key, path in data_files.items() if path in versions
+    }
+    _pinned = {**_pinned_latest, **frames}
+    _pinned_latest = frames
+    _published_versions = {**_published_versions, **versions}
+
+def current_versions(data_files):
+    """
+    {path: version} of data_files as one consistent snapshot: the published
+    version where the warm-up worker has published one, else the file's own.
+    """
+    published = _published_versions
+    return {
+        path: published.get(path) or cached_version(path)
+        for path in data_files.values()
+    }
+
+def frame_fingerprint(df):
+    """
+    Shape, columns, dtypes and a content hash of df.
+    """
+    content = int(pd.util.hash_pandas_object(df, index=True).sum()) if len(df.columns) else 0
+    return df.shape, tuple(df.columns), tuple(map(str, df.dtypes)), content
+
+def verify_unmodified(data_files, versions=None):
+    """
+    Debug check (WORKLENSE_DEBUG_MUTATION=1): return the names of the shared
+    datasets in data_files that changed since they were loaded.
+    """
+    changed = []
+    versions = versions or current_versions(data_files)
     for key, path in data_files.items():
-        try:
-            data[key] = pd.read_excel(path)
-        except Exception:
-            data[key] = pd.DataFrame()  # Empty fallback if missing/broken
-    return data
+        cache_key = (key, path, versions[path])
+        expected = _fingerprints.get(cache_key)
+        if expected is not None and frame_fingerprint(shared_dataset(*cache_key)) != expected:
+            logger.error("Shared dataset %s was modified in place", key)
+            changed.append(key)
+    return changed
+
+def data_version(data_files, versions=None):
+    """
+    Short token that changes whenever any of the data files changes.
+    """
+    versions = versions or current_versions(data_files)
+    digest = hashlib.sha1()
+    for key, path in sorted(data_files.items()):
+        digest.update(f"{key}={versions[path]};".encode())
+    return digest.hexdigest()[:12]
 
 def ensure_datetime(df, date_cols):
     """
@@ -25,6 +163,50 @@ def ensure_datetime(df, date_cols):
             df[col] = pd.to_datetime(df[col], errors='coerce')
     return df
 
+def _downcast_integer(series):
+    """
+    Downcast to the smallest integer type when that is lossless
+    (all values whole and present); otherwise just make it numeric.
+    """
+    numeric = pd.to_numeric(series, errors='coerce')
+    if numeric.isna().any() or not (numeric % 1 == 0).all():
+        return numeric
+    return pd.to_numeric(numeric, downcast='integer')
+
+def apply_schema(df, schema):
+    """
+    Convert the columns of df named in schema (if present).
+    Returns (df, report) with the row count and memory before/after in bytes.
+    """
+    before = int(df.memory_usage(deep=True).sum())
+    df = ensure_datetime(df.copy(), schema.get('dates', []))
+    for col in schema.get('categories', []):
+        if col in df and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    for col in schema.get('integers', []):
+        if col in df:
+            df[col] = _downcast_integer(df[col])
+    for col in schema.get('floats', []):
+        if col in df:
+            df[col] = pd.to_numeric(df[col], errors='coerce', downcast='float')
+    after = int(df.memory_usage(deep=True).sum())
+    return df, {'rows': len(df), 'bytes_before': before, 'bytes_after': after}
+
+def normalize_dataset(key, df):
+    """
+    Apply the declared schema for dataset `key` and log the memory saved.
+    Datasets without a schema (or empty fallbacks) are returned unchanged.
+    """
+    schema = DATASET_SCHEMAS.get(key)
+    if schema is None or df.empty:
+        return df
+    df, report = apply_schema(df, schema)
+    logger.info(
+        "%s: %d rows, %.1f MB -> %.1f MB", key, report['rows'],
+        report['bytes_before'] / 1e6, report['bytes_after'] / 1e6,
+    )
+    return df
+
 def filter_dataframe(df, filters):
     """
     Apply dict of {col: [values]} filters to df.
@@ -0,0 +1,181 @@
+# utils/delta_ingest.py
+
+"""
+Incremental refresh of the columnar cache from HRMS delta extracts.
+
+A delta file (.xlsx, .csv or .parquet) is applied to the cached Parquet of
+one data file in one of three modes:
+
+* append    - add the delta rows;
+* upsert    - update the rows whose key (employee_id) appears in the delta,
+              in the columns the delta carries only, and add the rest;
+* tombstone - delete the rows whose key appears in the delta.
+
+Each applied delta bumps the cached version of the file, so every cache keyed
+on data_version (datasets, filter index, KPIs, reports) moves on. The OLAP
+cube is not rebuilt: get_olap_cube updates the previous cube from the changed
+rows with update_cube. A delta is applied at most once (matched by content
+hash); a new full workbook replaces the cache and its deltas.
+
+Usage:
+    python -m utils.delta_ingest employee_master deltas/joiners.csv --mode append
+    python -m utils.delta_ingest employee_master deltas/changes.xlsx --mode upsert
+    python -m utils.delta_ingest leave deltas/leave.csv
+"""
+
+import argparse
+import logging
+import os
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+from utils.columnar_store import cache_lock, file_hash, pq, read_cached, read_delta, read_manifest, write_delta
+from utils.data_handler import DATA_FILES, normalize_dataset
+from utils.excel_ingest import ingest_excel
+
+logger = logging.getLogger(__name__)
+
+DELTA_MODES = ["append", "upsert", "tombstone"]
+DELTA_KEY = "employee_id"
+
+
+def read_delta_file(path):
+    """
+    Read a delta extract by its extension.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return pd.read_csv(path)
+    if ext == ".parquet":
+        return pd.read_parquet(path)
+    return pd.read_excel(path)
+
+
+def _align(delta, base):
+    """
+    Give delta the columns and dtypes of base, so both can be stored together.
+    """
+    delta = delta.reindex(columns=base.columns)
+    for col in base.columns:
+        dtype, values = base[col].dtype, delta[col]
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            delta[col] = pd.to_datetime(values, errors="coerce")
+        elif pd.api.types.is_numeric_dtype(dtype):
+            delta[col] = pd.to_numeric(values, errors="coerce")
+        else:
+            delta[col] = values.where(values.isna(), values.astype(str)).astype(dtype)
+    return delta
+
+
+def _upsert_rows(matched, delta, columns, key):
+    """
+    The rows matched by an upsert with the delta's values (its last row per
+    key) in the columns the delta carries, followed by the delta rows of new
+    keys. Columns the delta lacks keep their values: a partial extract
+    (e.g. employee_id, date_of_exit) never blanks the rest of the record.
+    """
+    latest = delta.drop_duplicates(key, keep="last").set_index(key)
+    source = latest.reindex(matched[key].to_numpy())
+    updated = matched.reset_index(drop=True)
+    for col in columns:
+        if col != key and col in updated.columns:
+            updated[col] = source[col].reset_index(drop=True)
+    new = delta[~delta[key].isin(matched[key])]
+    return pd.concat([updated, new], ignore_index=True)
+
+
+def apply_delta(dataset, delta_path, mode="append", data_files=DATA_FILES, key=DELTA_KEY):
+    """
+    Apply the delta file at delta_path to the cached frame of dataset.
+
+    Returns the manifest entry of the delta, or None if this file was
+    already applied.
+    """
+    if mode not in DELTA_MODES:
+        raise ValueError(f"Unknown delta mode '{mode}', expected one of {DELTA_MODES}")
+    if pq is None:
+        raise RuntimeError("Delta refresh needs pyarrow for the columnar cache")
+    path = data_files[dataset]
+    digest = file_hash(delta_path)
+    # Read, merge and write as one step against concurrent cache builds
+    with cache_lock(path):
+        ingest_excel(dataset, path)
+        base = read_cached(path)
+        if any(d["sha256"] == digest for d in (read_manifest(path) or {}).get("deltas", [])):
+            logger.info("%s: delta %s already applied", dataset, delta_path)
+            return None
+
+        raw = read_delta_file(delta_path)
+        delta = _align(raw, base)
+        if mode == "append":
+            removed, added = base.iloc[:0], delta
+            updated = pd.concat([base, delta], ignore_index=True)
+        else:
+            if key not in base.columns or key not in raw.columns:
+                raise ValueError(f"{mode} needs a '{key}' column in {dataset} and the delta")
+            hit = base[key].isin(delta[key].dropna()).to_numpy()
+            removed = base[hit]
+            added = _upsert_rows(removed, delta, raw.columns, key) if mode == "upsert" else base.iloc[:0]
+            updated = pd.concat([base[~hit], added], ignore_index=True)
+
+        changes = pd.concat(
+            [removed.assign(_delta_sign=-1), added.assign(_delta_sign=1)], ignore_index=True
+        )
+        entry = {
+            "file": os.path.abspath(delta_path),
+            "sha256": digest,
+            "mode": mode,
+            "removed": len(removed),
+            "added": len(added),
+            "applied_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        write_delta(path, updated, changes, entry)
+        logger.info("%s: %s delta removed %d and added %d rows", dataset, mode, len(removed), len(added))
+        return entry
+
+
+def update_cube(cube, path, revision):
+    """
+    Copy of cube brought up to revision (see cache_revision) by applying the
+    stored changes of the deltas since cube.revision, or None when the cube
+    has to be rebuilt instead (different source file or unknown revision).
+    """
+    if cube.revision is None or revision is None:
+        return None
+    if cube.revision[0] != revision[0] or cube.revision[1] > revision[1]:
+        return None
+    updated = cube.copy()
+    try:
+        for n in range(cube.revision[1] + 1, revision[1] + 1):
+            changes = read_delta(path, n)
+            sign = changes.pop("_delta_sign").to_numpy()
+            updated.apply_delta(
+                normalize_dataset("employee_master", changes[sign < 0].reset_index(drop=True)),
+                normalize_dataset("employee_master", changes[sign > 0].reset_index(drop=True)),
+            )
+    except OSError:
+        return None  # Change file missing: rebuild from the frame
+    updated.revision = revision
+    return updated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply a delta extract to the Worklense data cache.")
+    parser.add_argument("dataset", choices=sorted(DATA_FILES), help="Dataset the delta belongs to")
+    parser.add_argument("delta", help="Delta file (.xlsx, .csv or .parquet)")
+    parser.add_argument("--mode", choices=DELTA_MODES, default="append")
+    parser.add_argument("--key", default=DELTA_KEY, help="Key column for upsert/tombstone")
+    args = parser.parse_args(argv)
+
+    entry = apply_delta(args.dataset, args.delta, args.mode, key=args.key)
+    if entry is None:
+        print(f"{args.delta} was already applied to {args.dataset}")
+    else:
+        print(f"{args.dataset}: {args.mode} removed {entry['removed']} rows, added {entry['added']} rows")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
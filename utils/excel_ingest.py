@@ -0,0 +1,148 @@
+# utils/excel_ingest.py
+
+"""
+Streaming, column-projected first ingest of the Excel data files.
+
+pd.read_excel turns every cell of every column into a Python object before
+the frame is built, so a wide HRMS export of a few hundred MB needs several
+GB at its peak. ingest_excel instead reads the first sheet row by row
+(openpyxl read-only mode) and keeps only the columns the reports declare
+(report_registry.dataset_columns, plus the dataset's schema columns). Every
+CHUNK_ROWS rows become a small typed frame (dates and numbers converted as
+declared in utils/schema.py, everything else text), which is written as one
+row group of the columnar cache (columnar_store.write_cache_chunks). Peak
+memory is one chunk, whatever the size of the workbook.
+
+The result is an ordinary cache: read_cached serves it, normalize_dataset
+finishes the typing and delta extracts apply to it. A cache built from fewer
+columns than the reports now declare is rebuilt. Workbooks the streaming
+reader cannot handle (e.g. a text value in a column that started out
+numeric) are left to read_cached's full parse. Fully empty rows are skipped.
+"""
+
+import logging
+import os
+
+import pandas as pd
+
+from utils.columnar_store import cache_lock, cache_revision, pq, read_manifest, write_cache_chunks
+from utils.report_registry import dataset_columns
+from utils.schema import DATASET_SCHEMAS
+
+logger = logging.getLogger(__name__)
+
+STREAM_INGEST = os.environ.get("WORKLENSE_STREAM_INGEST", "1") not in ("", "0")
+CHUNK_ROWS = int(os.environ.get("WORKLENSE_INGEST_CHUNK_ROWS", 50_000))
+EXCEL_EXTENSIONS = (".xlsx", ".xlsm")
+
+
+def ingest_columns(key):
+    """
+    Columns of dataset key to keep, or None for all of them.
+    """
+    columns = dataset_columns(key)
+    if columns is None:
+        return None
+    schema = DATASET_SCHEMAS.get(key, {})
+    declared = [col for kind in ("dates", "categories", "integers", "floats") for col in schema.get(kind, [])]
+    return sorted(set(columns) | set(declared))
+
+
+def _header_names(header):
+    # Same names pd.read_excel gives blank or repeated header cells
+    names, seen = [], {}
+    for i, value in enumerate(header):
+        name = f"Unnamed: {i}" if value is None else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def convert_chunk(rows, names, schema):
+    """
+    DataFrame of rows (tuples of cell values) with the declared types.
+    """
+    numeric = set(schema.get("integers", [])) | set(schema.get("floats", []))
+    dates = set(schema.get("dates", []))
+    columns = list(zip(*rows)) if rows else [()] * len(names)
+    data = {}
+    for name, values in zip(names, columns):
+        series = pd.Series(values, dtype=object)
+        if name in dates:
+            data[name] = pd.to_datetime(series, errors="coerce")
+        elif name in numeric:
+            # Always float64, so a later chunk with a blank cell has the same type
+            data[name] = pd.to_numeric(series, errors="coerce").astype("float64")
+        else:
+            data[name] = series.where(series.isna(), series.astype(str)).astype("str")
+    return pd.DataFrame(data, columns=names)
+
+
+def iter_chunks(path, key, columns=None, chunk_rows=CHUNK_ROWS):
+    """
+    Typed DataFrames of up to chunk_rows rows of the first sheet of path,
+    with only columns (None: all) that exist in the sheet.
+    """
+    from openpyxl import load_workbook
+
+    schema = DATASET_SCHEMAS.get(key, {})
+    workbook = load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        names = _header_names(next(rows, ()))
+        keep = [i for i, name in enumerate(names) if columns is None or name in columns]
+        names = [names[i] for i in keep]
+        chunk, yielded = [], False
+        for row in rows:
+            values = tuple(row[i] if i < len(row) else None for i in keep)
+            if all(value is None for value in values):
+                continue
+            chunk.append(values)
+            if len(chunk) >= chunk_rows:
+                yield convert_chunk(chunk, names, schema)
+                chunk, yielded = [], True
+        if chunk or not yielded:
+            # An empty sheet still gets a (typed, empty) cache
+            yield convert_chunk(chunk, names, schema)
+    finally:
+        workbook.close()
+
+
+def ingest_excel(key, path, chunk_rows=CHUNK_ROWS):
+    """
+    Stream the workbook at path into its columnar cache unless the cache is
+    fresh and holds every needed column. Returns the new manifest, or None
+    when nothing was (or could be) streamed.
+    """
+    if not STREAM_INGEST or pq is None or not path.lower().endswith(EXCEL_EXTENSIONS):
+        return None
+    if not os.path.exists(path):
+        return None
+    # One build per file at a time; whoever waited finds the cache fresh below
+    with cache_lock(path):
+        return _ingest(key, path, chunk_rows)
+
+
+def _ingest(key, path, chunk_rows):
+    columns = ingest_columns(key)
+    if cache_revision(path) is not None:
+        manifest = read_manifest(path)
+        stored = manifest.get("columns")
+        if stored is None or (columns is not None and set(columns) <= set(stored)):
+            return None
+        if manifest.get("deltas"):
+            # Re-reading the workbook would drop the applied deltas
+            logger.warning("%s: cache lacks columns %s but has deltas; not rebuilt",
+                           key, sorted(set(columns or []) - set(stored)))
+            return None
+    try:
+        manifest = write_cache_chunks(path, iter_chunks(path, key, columns, chunk_rows), columns)
+    except Exception:
+        logger.warning("%s: streaming ingest of %s failed, parsing it whole", key, path, exc_info=True)
+        return None
+    logger.info("%s: streamed %d rows of %s into the columnar cache", key, manifest["rows"], path)
+    return manifest
@@ -0,0 +1,101 @@
+# utils/filter_index.py
+
+"""
+Inverted index over the sidebar filter dimensions of the employee master.
+
+For each dimension it keeps the integer category code of every row and, per
+value, the sorted array of row positions holding it. A selection is resolved
+by taking the union of postings of the most selective dimension and probing
+the remaining dimensions' codes for just those rows, followed by a single
+`take` on the frame.
+"""
+
+import numpy as np
+import pandas as pd
+
+FILTER_DIMENSIONS = [
+    "company", "business_unit", "department", "function",
+    "zone", "area", "band", "employment_type",
+]
+
+
+def filter_signature(filters):
+    """
+    Hashable, order-independent form of a {dim: [values]} selection.
+    Empty selections are dropped, so "no filter" always has the same key.
+    """
+    return tuple(sorted(
+        (dim, tuple(sorted(str(v) for v in selected)))
+        for dim, selected in filters.items() if selected
+    ))
+
+
+class FilterIndex:
+    """
+    Prebuilt value -> row-positions index for a fixed DataFrame.
+    """
+
+    def __init__(self, df, dimensions=FILTER_DIMENSIONS):
+        self.n_rows = len(df)
+        self.codes = {}
+        self.code_of = {}
+        self.postings = {}
+        self.options = {}
+        for dim in dimensions:
+            if dim in df.columns:
+                self._index_column(dim, df[dim])
+
+    def _index_column(self, dim, series):
+        if not isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.astype("category")
+        codes = series.cat.codes.to_numpy()
+        categories = series.cat.categories
+
+        # Stable argsort groups row positions by code, ascending within a code;
+        # missing values (code -1) sort first and are skipped.
+        order = np.argsort(codes, kind="stable")
+        counts = np.bincount(codes[codes >= 0], minlength=len(categories))
+        bounds = np.concatenate([[0], np.cumsum(counts)]) + np.count_nonzero(codes < 0)
+
+        self.codes[dim] = codes
+        self.code_of[dim] = {value: i for i, value in enumerate(categories)}
+        self.postings[dim] = [order[bounds[i]:bounds[i + 1]] for i in range(len(categories))]
+        self.options[dim] = sorted(v for v, c in zip(categories, counts) if c > 0)
+
+    def select(self, filters):
+        """
+        Return sorted row positions matching all non-empty selections in
+        filters ({dim: [values]}), or None when nothing is filtered.
+        """
+        resolved = []
+        for dim, selected in filters.items():
+            if not selected or dim not in self.codes:
+                continue
+            code_of = self.code_of[dim]
+            ids = sorted({code_of[v] for v in selected if v in code_of})
+            # One spare slot at the end so that code -1 (missing) maps to False
+            lookup = np.zeros(len(code_of) + 1, dtype=bool)
+            lookup[ids] = True
+            size = sum(len(self.postings[dim][i]) for i in ids)
+            resolved.append((size, dim, ids, lookup))
+        if not resolved:
+            return None
+
+        resolved.sort(key=lambda item: item[0])
+        _, dim, ids, _ = resolved[0]
+        if ids:
+            rows = np.sort(np.concatenate([self.postings[dim][i] for i in ids]))
+        else:
+            rows = np.empty(0, dtype=np.intp)
+        for _, dim, _, lookup in resolved[1:]:
+            rows = rows[lookup[self.codes[dim][rows]]]
+        return rows
+
+    def apply(self, df, filters):
+        """
+        Filter df (the frame this index was built on) by filters.
+        """
+        rows = self.select(filters)
+        if rows is None:
+            return df
+        return df.take(rows)
@@ -0,0 +1,98 @@
+# utils/fiscal_calendar.py
+
+"""
+Vectorized April-March fiscal calendar.
+
+FY codes are the calendar year in which the fiscal year ends, so
+2025-04-01 .. 2026-03-31 is FY 2026 ("FY-26", see
+utils/format_utils.format_financial_year). All conversions are plain NumPy
+arithmetic on datetime64 months; missing dates map to -1.
+"""
+
+import numpy as np
+import pandas as pd
+
+FY_START_MONTH = 4
+
+
+def _calendar_months(dates):
+    """
+    Return (year, month, missing) int arrays for an array of dates.
+    """
+    months = np.asarray(pd.to_datetime(dates), dtype="datetime64[M]")
+    missing = np.isnat(months)
+    offset = months.astype("int64")
+    return offset // 12 + 1970, offset % 12 + 1, missing
+
+
+def fiscal_year(dates):
+    """
+    Integer FY code (ending year) for each date, -1 where missing.
+    """
+    year, month, missing = _calendar_months(dates)
+    return np.where(missing, -1, year + (month >= FY_START_MONTH))
+
+
+def fiscal_quarter(dates):
+    """
+    Fiscal quarter 1-4 for each date (Q1 = Apr-Jun), -1 where missing.
+    """
+    _, month, missing = _calendar_months(dates)
+    return np.where(missing, -1, (month - FY_START_MONTH) % 12 // 3 + 1)
+
+
+def fiscal_month(dates):
+    """
+    Fiscal month 1-12 for each date (1 = April), -1 where missing.
+    """
+    _, month, missing = _calendar_months(dates)
+    return np.where(missing, -1, (month - FY_START_MONTH) % 12 + 1)
+
+
+def current_fiscal_year(now):
+    """
+    FY code containing the timestamp now.
+    """
+    return now.year + 1 if now.month >= FY_START_MONTH else now.year
+
+
+def fy_label(fy):
+    """
+    2026 -> 'FY-26'.
+    """
+    return f"FY-{str(fy)[-2:]}"
+
+
+def parse_fy_label(label):
+    """
+    'FY-26' -> 2026.
+    """
+    return int(label[-2:]) + 2000
+
+
+def last_fiscal_years(current_fy, n=5):
+    """
+    The n FY codes ending with current_fy, oldest first.
+    """
+    return list(range(current_fy - n + 1, current_fy + 1))
+
+
+def fy_labels(fy_years):
+    """
+    Ordered categorical of 'FY-xx' labels for a sequence of FY codes.
+    """
+    labels = [fy_label(fy) for fy in fy_years]
+    return pd.Categorical(labels, categories=labels, ordered=True)
+
+
+def count_by_fy(fy_codes, fy_years, weights=None):
+    """
+    Count (or sum weights of) rows per FY code, aligned to fy_years.
+    fy_years must be consecutive, as returned by last_fiscal_years.
+    """
+    first = fy_years[0]
+    fy_codes = np.asarray(fy_codes)
+    in_range = (fy_codes >= first) & (fy_codes <= fy_years[-1])
+    if weights is not None:
+        weights = np.asarray(weights, dtype="float64")[in_range]
+    return np.bincount(fy_codes[in_range] - first, weights=weights, minlength=len(fy_years))
@@ -0,0 +1,71 @@
+# utils/headcount_engine.py
+
+"""
+Point-in-time headcount and cost.
+
+An employee is active on date D when date_of_joining <= D and
+date_of_exit is empty or > D. Instead of building a mask over the whole
+frame for every date, HeadcountTimeline sorts join and exit dates once and
+answers any batch of dates with searchsorted over cumulative sums.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _as_datetime64(values):
+    return np.asarray(pd.to_datetime(values), dtype="datetime64[ns]")
+
+
+class HeadcountTimeline:
+    """
+    Sorted join/exit events of an employee frame.
+    """
+
+    def __init__(self, df, value_col="total_ctc_pa"):
+        if "date_of_joining" in df.columns:
+            joins = _as_datetime64(df["date_of_joining"])
+        else:
+            joins = np.full(len(df), np.datetime64("NaT"), dtype="datetime64[ns]")
+        if "date_of_exit" in df.columns:
+            exits = _as_datetime64(df["date_of_exit"])
+        else:
+            exits = np.full(len(df), np.datetime64("NaT"), dtype="datetime64[ns]")
+        if value_col in df.columns:
+            values = pd.to_numeric(df[value_col], errors="coerce").fillna(0).to_numpy(dtype="float64")
+        else:
+            values = np.zeros(len(df))
+
+        # Rows without a join date are never active. An exit before the join
+        # date means the row is never active either: clamping it to the join
+        # date makes its join and exit events cancel out.
+        joined = ~np.isnat(joins)
+        joins, exits, values = joins[joined], exits[joined], values[joined]
+        exits = np.where(exits < joins, joins, exits)
+        left = ~np.isnat(exits)
+
+        order = np.argsort(joins, kind="stable")
+        self.join_dates = joins[order]
+        self.join_values = np.concatenate([[0.0], np.cumsum(values[order])])
+
+        exits, exit_values = exits[left], values[left]
+        order = np.argsort(exits, kind="stable")
+        self.exit_dates = exits[order]
+        self.exit_values = np.concatenate([[0.0], np.cumsum(exit_values[order])])
+
+    def as_of(self, dates):
+        """
+        Return (headcount, value_sum) arrays for each date in dates.
+        """
+        dates = _as_datetime64(np.atleast_1d(dates))
+        joined = np.searchsorted(self.join_dates, dates, side="right")
+        left = np.searchsorted(self.exit_dates, dates, side="right")
+        return joined - left, self.join_values[joined] - self.exit_values[left]
+
+    def series(self, start, end, freq="MS"):
+        """
+        Headcount and value sum on every date of pd.date_range(start, end, freq).
+        """
+        dates = pd.date_range(start, end, freq=freq)
+        headcount, value = self.as_of(dates)
+        return pd.DataFrame({"Date": dates, "Headcount": headcount, "Value": value})
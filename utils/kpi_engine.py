@@ -0,0 +1,221 @@
+# utils/kpi_engine.py
+
+"""
+Declarative KPI computation.
+
+Reports describe their KPI cards as specs ({"label", "metric", "type"} plus an
+optional "scale"); every metric is a small function over a shared KpiFrame
+whose intermediates (date arrays, active mask, point-in-time headcounts, age)
+are computed at most once per call. Results are memoized by
+(cache key, as-of day, specs), so a rerun with the same data version and
+filters does no work.
+"""
+
+import threading
+from collections import OrderedDict
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from utils.filter_index import filter_signature
+from utils.fiscal_calendar import current_fiscal_year
+from utils.headcount_engine import HeadcountTimeline
+from utils.tracing import span
+
+METRICS = {}
+
+_MEMO = OrderedDict()
+_MEMO_LOCK = threading.Lock()
+MEMO_SIZE = 128
+
+
+def metric(name):
+    """
+    Register a metric function under name. It receives a KpiFrame.
+    """
+    def register(fn):
+        METRICS[name] = fn
+        return fn
+    return register
+
+
+class KpiFrame:
+    """
+    Lazily computed intermediates shared by all metrics of one frame/date.
+    """
+
+    def __init__(self, df, now, timeline=None):
+        self.df = df
+        self.timeline = timeline
+        self.now = pd.Timestamp(now)
+        self.current_fy = current_fiscal_year(self.now)
+        self.fy_start = pd.Timestamp(self.current_fy - 1, 4, 1)
+        self.fy_end = pd.Timestamp(self.current_fy, 3, 31)
+        self.fy_label = f"{str(self.current_fy - 1)[-2:]}-{str(self.current_fy)[-2:]}"
+
+    def has(self, col):
+        return col in self.df.columns
+
+    def dates(self, col):
+        if not self.has(col):
+            return np.full(len(self.df), np.datetime64("NaT"), dtype="datetime64[ns]")
+        return self.df[col].to_numpy(dtype="datetime64[ns]")
+
+    @cached_property
+    def joins(self):
+        return self.dates("date_of_joining")
+
+    @cached_property
+    def exits(self):
+        return self.dates("date_of_exit")
+
+    @cached_property
+    def active_mask(self):
+        now = np.datetime64(self.now, "ns")
+        return (self.joins <= now) & ~(self.exits <= now)
+
+    @cached_property
+    def headcounts(self):
+        """
+        (headcount, ctc sum) on today, FY start and FY end.
+        """
+        timeline = self.timeline or HeadcountTimeline(self.df)
+        return timeline.as_of([self.now, self.fy_start, self.fy_end])
+
+    @cached_property
+    def ctc(self):
+        return pd.to_numeric(self.df["total_ctc_pa"], errors="coerce").to_numpy(dtype="float64")
+
+    @cached_property
+    def age_years(self):
+        return (self.now - self.df["date_of_birth"]).dt.days.to_numpy(dtype="float64") // 365
+
+    def in_current_fy(self, values):
+        return (values >= np.datetime64(self.fy_start, "ns")) & (values <= np.datetime64(self.fy_end, "ns"))
+
+
+@metric("active")
+def _active(k):
+    return int(k.headcounts[0][0]) if k.has("date_of_joining") else 0
+
+
+@metric("headcount_fy_start")
+def _headcount_fy_start(k):
+    return int(k.headcounts[0][1]) if k.has("date_of_joining") else 0
+
+
+@metric("headcount_fy_end")
+def _headcount_fy_end(k):
+    return int(k.headcounts[0][2]) if k.has("date_of_joining") else 0
+
+
+@metric("leavers_fy")
+def _leavers_fy(k):
+    return int(k.in_current_fy(k.exits).sum()) if k.has("date_of_exit") else 0
+
+
+@metric("joiners_fy")
+def _joiners_fy(k):
+    return int(k.in_current_fy(k.joins).sum()) if k.has("date_of_joining") else 0
+
+
+@metric("attrition_fy")
+def _attrition_fy(k):
+    start, end = _headcount_fy_start(k), _headcount_fy_end(k)
+    avg_headcount = (start + end) / 2 if (start + end) else 1
+    return _leavers_fy(k) / avg_headcount * 100
+
+
+@metric("active_ctc")
+def _active_ctc(k):
+    return float(k.headcounts[1][0]) if k.has("total_ctc_pa") and k.has("date_of_joining") else 0
+
+
+@metric("total_ctc")
+def _total_ctc(k):
+    return float(np.nansum(k.ctc)) if k.has("total_ctc_pa") else 0
+
+
+@metric("female_ratio")
+def _female_ratio(k):
+    if not k.has("gender") or not k.has("date_of_joining"):
+        return 0
+    active = _active(k)
+    female = (k.active_mask & (k.df["gender"] == "Female").to_numpy()).sum()
+    return female / active * 100 if active > 0 else 0
+
+
+@metric("avg_exp")
+def _avg_exp(k):
+    return k.df["total_exp_yrs"].mean() if k.has("total_exp_yrs") else 0
+
+
+@metric("avg_tenure")
+def _avg_tenure(k):
+    if not k.has("date_of_joining") or not k.active_mask.any():
+        return 0
+    now = np.datetime64(k.now, "ns")
+    return float(((now - k.joins[k.active_mask]) / np.timedelta64(1, "D")).mean() / 365.25)
+
+
+@metric("avg_age")
+def _avg_age(k):
+    return float(np.nanmean(k.age_years)) if k.has("date_of_birth") and len(k.df) else 0
+
+
+def _evaluate(df, specs, now, timeline=None):
+    k = KpiFrame(df, now, timeline)
+    kpis = []
+    for spec in specs:
+        value = METRICS[spec["metric"]](k) * spec.get("scale", 1)
+        kpis.append({
+            "label": spec["label"].format(fy=k.fy_label),
+            "value": value,
+            "type": spec.get("type", "Integer"),
+        })
+    return kpis
+
+
+def kpi_cache_key(config):
+    """
+    Memo key for a report config, or None when it carries no data version.
+    """
+    if not config.get("data_version"):
+        return None
+    return (config["data_version"], filter_signature(config.get("filters", {})))
+
+
+def compute_kpis(df, specs, now, cache_key=None, timeline=None):
+    """
+    Evaluate KPI specs over df as of now.
+
+    Labels may contain "{fy}", replaced by the current FY (e.g. "25-26").
+    When cache_key is given (data version + filter signature), results are
+    memoized per as-of day. A timeline (e.g. ReportContext.timeline) can be
+    passed to answer point-in-time headcounts without re-sorting df.
+    """
+    with span("compute_kpis", rows_in=len(df)) as s:
+        kpis = _compute_kpis(df, specs, now, cache_key, timeline)
+        s.set(rows_out=len(kpis))
+    return kpis
+
+
+def _compute_kpis(df, specs, now, cache_key, timeline):
+    if cache_key is None:
+        return _evaluate(df, specs, now, timeline)
+    key = (
+        cache_key,
+        pd.Timestamp(now).date(),
+        tuple((s["label"], s["metric"], s.get("type"), s.get("scale", 1)) for s in specs),
+    )
+    with _MEMO_LOCK:
+        if key in _MEMO:
+            _MEMO.move_to_end(key)
+            return [dict(kpi) for kpi in _MEMO[key]]
+    kpis = _evaluate(df, specs, now, timeline)
+    with _MEMO_LOCK:
+        _MEMO[key] = kpis
+        while len(_MEMO) > MEMO_SIZE:
+            _MEMO.popitem(last=False)
+    return [dict(kpi) for kpi in kpis]
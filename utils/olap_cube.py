@@ -0,0 +1,292 @@
+# utils/olap_cube.py
+
+"""
+Pre-aggregated cube over the sidebar dimensions of the employee master.
+
+Rows are grouped into cells (one per distinct combination of CUBE_DIMENSIONS)
+and two kinds of measures are stored per cell:
+
+* stocks at a fixed set of snapshot dates (FY ends, the current FY start/end
+  and today): headcount, CTC sum, experience sum and date-of-birth sum,
+  built with a difference array over snapshot indices;
+* flows per fiscal year: joiners, joiner CTC and leavers.
+
+A sidebar selection is answered by summing the matching cells, so its cost
+depends on the number of cells, not on the number of employees. Anything the
+cube cannot answer (other dimensions, dates that are not snapshots) returns
+None and callers fall back to the raw frame.
+"""
+
+import copy
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.columnar_store import cache_revision
+from utils.delta_ingest import update_cube
+from utils.filter_index import FILTER_DIMENSIONS
+from utils.fiscal_calendar import current_fiscal_year, fiscal_year
+from utils.headcount_engine import HeadcountTimeline
+
+CUBE_DIMENSIONS = FILTER_DIMENSIONS + ["gender"]
+CUBE_YEARS = 10
+STOCK_MEASURES = ["headcount", "ctc", "exp_sum", "exp_count", "dob_days_sum", "dob_count"]
+FLOW_MEASURES = ["joiners", "joiner_ctc", "leavers"]
+
+
+def snapshot_dates(today, years=CUBE_YEARS):
+    """
+    FY ends of the last `years` fiscal years plus the current FY start, FY end and today.
+    """
+    today = pd.Timestamp(today).normalize()
+    current_fy = current_fiscal_year(today)
+    dates = [pd.Timestamp(fy, 3, 31) for fy in range(current_fy - years, current_fy + 1)]
+    dates += [pd.Timestamp(current_fy - 1, 4, 1), today]
+    return pd.DatetimeIndex(sorted(set(dates)))
+
+
+def _numeric(df, col):
+    if col not in df.columns:
+        return np.zeros(len(df)), np.zeros(len(df))
+    values = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64")
+    present = ~np.isnan(values)
+    return np.where(present, values, 0.0), present.astype("float64")
+
+
+def _dates(df, col):
+    if col not in df.columns:
+        return np.full(len(df), np.datetime64("NaT"), dtype="datetime64[ns]")
+    return df[col].to_numpy(dtype="datetime64[ns]")
+
+
+class OlapCube:
+    """
+    Cell-level stock and flow aggregates of an employee frame.
+
+    All measures are sums over rows, so the cube can be updated in place
+    from changed rows (see apply_delta) instead of being rebuilt.
+    """
+
+    def __init__(self, df, today, dimensions=CUBE_DIMENSIONS, years=CUBE_YEARS):
+        self.dimensions = [dim for dim in dimensions if dim in df.columns]
+        self.today = pd.Timestamp(today).normalize()
+        self.snapshots = snapshot_dates(today, years)
+        current_fy = current_fiscal_year(self.today)
+        self.fy_years = list(range(current_fy - years, current_fy + 1))
+        self.revision = None
+        self.code_of = {dim: {} for dim in self.dimensions}
+        self.cell_codes = pd.DataFrame({dim: np.zeros(0, dtype=np.int64) for dim in self.dimensions})
+        self.stocks = {name: np.zeros((0, len(self.snapshots))) for name in STOCK_MEASURES}
+        self.flows = {name: np.zeros((0, len(self.fy_years))) for name in FLOW_MEASURES}
+        self._add_rows(df, 1)
+
+    @property
+    def n_cells(self):
+        return len(self.cell_codes) if self.dimensions else len(self.stocks["headcount"])
+
+    def copy(self):
+        """
+        Independent copy, so a cached cube can be updated without touching it.
+        """
+        cube = copy.copy(self)
+        cube.code_of = {dim: dict(codes) for dim, codes in self.code_of.items()}
+        cube.cell_codes = self.cell_codes.copy()
+        cube.stocks = {name: values.copy() for name, values in self.stocks.items()}
+        cube.flows = {name: values.copy() for name, values in self.flows.items()}
+        return cube
+
+    def apply_delta(self, removed, added):
+        """
+        Update the measures in place: subtract the rows of removed and add
+        the rows of added (both normalized employee frames).
+        """
+        self._add_rows(removed, -1)
+        self._add_rows(added, 1)
+
+    def _encode(self, dim, series):
+        """
+        Codes of series in code_of[dim] (-1 for missing); new values get new codes.
+        """
+        code_of = self.code_of[dim]
+        if not isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.astype("category")
+        categories = series.cat.categories
+        for value in categories:
+            code_of.setdefault(value, len(code_of))
+        lookup = np.array([code_of[value] for value in categories] + [-1], dtype=np.int64)
+        return lookup[series.cat.codes.to_numpy()]
+
+    def _grow(self, n):
+        for measures in (self.stocks, self.flows):
+            for name, values in measures.items():
+                measures[name] = np.vstack([values, np.zeros((n, values.shape[1]))])
+
+    def _assign_cells(self, df):
+        """
+        Cell index of every row of df, adding cells for unseen combinations.
+        """
+        if not self.dimensions:
+            if self.n_cells == 0:
+                self._grow(1)
+            return np.zeros(len(df), dtype=np.int64)
+        codes = pd.DataFrame(
+            {dim: self._encode(dim, df[dim]) for dim in self.dimensions}, index=pd.RangeIndex(len(df))
+        )
+        keys = self.cell_codes.assign(_cell=np.arange(len(self.cell_codes)))
+        cells = codes.merge(keys, on=self.dimensions, how="left")["_cell"].to_numpy(dtype="float64", copy=True)
+        missing = np.isnan(cells)
+        if missing.any():
+            new = codes[missing].drop_duplicates().reset_index(drop=True)
+            start = len(self.cell_codes)
+            self.cell_codes = pd.concat([self.cell_codes, new], ignore_index=True)
+            self._grow(len(new))
+            new_keys = new.assign(_cell=np.arange(start, start + len(new)))
+            cells[missing] = codes[missing].merge(new_keys, on=self.dimensions, how="left")["_cell"].to_numpy()
+        return cells.astype(np.int64)
+
+    def _add_rows(self, df, sign):
+        if df is None or df.empty:
+            return
+        cells = self._assign_cells(df)
+        self._add_stocks(df, cells, sign)
+        self._add_flows(df, cells, sign)
+
+    def _add_stocks(self, df, cells, sign):
+        joins, exits = _dates(df, "date_of_joining"), _dates(df, "date_of_exit")
+        snaps = self.snapshots.to_numpy(dtype="datetime64[ns]")
+        n_snaps = len(snaps)
+        joined = ~np.isnat(joins)
+
+        # Active on snapshot s when join <= s < exit: snapshot indices [first, last)
+        first = np.searchsorted(snaps, joins, side="left")
+        last = np.where(np.isnat(exits), n_snaps, np.searchsorted(snaps, exits, side="left"))
+        last = np.maximum(first, last)
+        cell, first, last = cells[joined], first[joined], last[joined]
+
+        ctc, _ = _numeric(df, "total_ctc_pa")
+        exp, exp_count = _numeric(df, "total_exp_yrs")
+        dob = _dates(df, "date_of_birth")
+        dob_days = np.where(np.isnat(dob), 0.0, dob.astype("datetime64[D]").astype("float64"))
+        weights = {
+            "headcount": np.ones(len(df)),
+            "ctc": ctc,
+            "exp_sum": exp,
+            "exp_count": exp_count,
+            "dob_days_sum": dob_days,
+            "dob_count": (~np.isnat(dob)).astype("float64"),
+        }
+
+        width = n_snaps + 1
+        size = self.n_cells * width
+        for name, w in weights.items():
+            w = w[joined] * sign
+            diff = (np.bincount(cell * width + first, weights=w, minlength=size)
+                    - np.bincount(cell * width + last, weights=w, minlength=size))
+            self.stocks[name] += np.cumsum(diff.reshape(self.n_cells, width), axis=1)[:, :n_snaps]
+
+    def _add_flows(self, df, cells, sign):
+        n_years, first_fy = len(self.fy_years), self.fy_years[0]
+        size = self.n_cells * n_years
+        ctc, _ = _numeric(df, "total_ctc_pa")
+        for name, col, w in (
+            ("joiners", "date_of_joining", np.ones(len(df))),
+            ("joiner_ctc", "date_of_joining", ctc),
+            ("leavers", "date_of_exit", np.ones(len(df))),
+        ):
+            fy = fiscal_year(_dates(df, col)) - first_fy
+            keep = (fy >= 0) & (fy < n_years)
+            counts = np.bincount(cells[keep] * n_years + fy[keep], weights=w[keep] * sign, minlength=size)
+            self.flows[name] += counts.reshape(self.n_cells, n_years)
+
+    def can_answer(self, filters):
+        return all(dim in self.dimensions for dim, selected in filters.items() if selected)
+
+    def cell_mask(self, filters):
+        """
+        Boolean mask of the cells matching filters, or None if unanswerable.
+        """
+        if not self.can_answer(filters):
+            return None
+        mask = np.ones(self.n_cells, dtype=bool)
+        for dim, selected in filters.items():
+            if not selected:
+                continue
+            code_of = self.code_of[dim]
+            lookup = np.zeros(len(code_of) + 1, dtype=bool)
+            lookup[[code_of[v] for v in selected if v in code_of]] = True
+            mask &= lookup[self.cell_codes[dim].to_numpy()]
+        return mask
+
+    def stock(self, filters, dates):
+        """
+        Stock measures (DataFrame indexed by date) for dates that are all
+        snapshots, or None.
+        """
+        mask = self.cell_mask(filters)
+        dates = pd.DatetimeIndex(pd.to_datetime(dates)).normalize()
+        positions = self.snapshots.get_indexer(dates)
+        if mask is None or (positions < 0).any():
+            return None
+        return pd.DataFrame(
+            {name: values[mask][:, positions].sum(axis=0) for name, values in self.stocks.items()},
+            index=dates,
+        )
+
+    def flow(self, filters, fy_years):
+        """
+        Flow measures (DataFrame indexed by FY code) for fy_years, or None.
+        """
+        mask = self.cell_mask(filters)
+        if mask is None or not set(fy_years) <= set(self.fy_years):
+            return None
+        positions = [fy - self.fy_years[0] for fy in fy_years]
+        return pd.DataFrame(
+            {name: values[mask][:, positions].sum(axis=0) for name, values in self.flows.items()},
+            index=list(fy_years),
+        )
+
+
+class CubeTimeline:
+    """
+    HeadcountTimeline-compatible view of a cube selection. Dates that are not
+    cube snapshots are answered from a raw HeadcountTimeline built on demand.
+    """
+
+    def __init__(self, cube, filters, df):
+        self.cube = cube
+        self.filters = filters
+        self.df = df
+        self._raw = None
+
+    def as_of(self, dates):
+        stock = self.cube.stock(self.filters, np.atleast_1d(dates))
+        if stock is not None:
+            return stock["headcount"].to_numpy().round().astype(np.int64), stock["ctc"].to_numpy()
+        if self._raw is None:
+            self._raw = HeadcountTimeline(self.df)
+        return self._raw.as_of(dates)
+
+
+# Latest cube per source file, the starting point for delta updates
+_latest_cubes = {}
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def get_olap_cube(_emp_df, data_version, today, source=None):
+    """
+    Build the cube once per data version and day. When source (the employee
+    master path) only received delta extracts since the last cube, that cube
+    is updated from the changed rows instead of being rebuilt.
+    """
+    revision = cache_revision(source) if source else None
+    previous = _latest_cubes.get(source)
+    cube = None
+    if previous is not None and previous.today == pd.Timestamp(today).normalize():
+        cube = update_cube(previous, source, revision)
+    if cube is None:
+        cube = OlapCube(_emp_df, today)
+        cube.revision = revision
+    if source:
+        _latest_cubes[source] = cube
+    return cube
@@ -0,0 +1,694 @@
+# utils/query_engine.py
+
+"""
+Pluggable query engines behind the report group-bys.
+
+Both engines answer the same questions for one filtered selection, so a
+report reads the same numbers whichever engine runs it:
+
+* value_counts(column, active_only=True) -> DataFrame [value, count]
+* values(measure) -> Series of a measure on the active rows ("age", "tenure"
+  or a numeric column), for charts that summarise raw values
+* binned_counts(measure, bins) -> count per pd.cut bin of values(measure)
+* fy_flows(fy_years) -> DataFrame of joiners, joiner_ctc, leavers per FY
+* timeline() -> point-in-time headcount / CTC (as_of, see headcount_engine)
+* attrition() -> rolling / FY attrition and cohort survival (attrition_engine)
+* leave_totals(), leave_days_by_month(), people_on_leave(), leave_mix()
+* sales_index() -> monthly revenue per join key (utils/sales_index.py)
+
+PandasEngine works on the in-memory ReportContext. SqlEngine pushes the
+filters and group-bys down to an embedded database (DuckDB when installed,
+SQLite otherwise) and only small result frames come back. build_database
+writes one database file per report data set and version into the data's
+.cache folder: the (unfiltered) employee master, which stays in memory for
+the sidebar anyway, plus the report's other datasets streamed batch by batch
+from their Parquet caches, so with the SQL engine the leave and sales
+history is never held in a worker's memory (see frame_data_files). Dates are
+stored as day numbers, and build-time columns (join/exit month, FY,
+clamped exit day, one row per employee and leave day) turn every question
+into a plain group-by.
+
+The engine is chosen with config["engine"] / WORKLENSE_QUERY_ENGINE:
+
+* "cube" (default): the OLAP cube answers what it covers (utils/olap_cube.py),
+  pandas the rest;
+* "pandas": always the in-memory rows, no cube;
+* "sql": always the database, no cube.
+
+so "pandas" and "sql" can be compared on the same report.
+"""
+
+import glob
+import os
+import sqlite3
+import threading
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.attrition_engine import AttritionEngine, MonthlyAttrition
+from utils.columnar_store import cache_lock, cache_paths, cache_revision, cached_version, pq, read_cached
+from utils.data_handler import StaleVersionError, normalize_dataset, shared_dataset
+from utils.excel_ingest import ingest_excel
+from utils.fiscal_calendar import count_by_fy, fiscal_year
+from utils.headcount_engine import HeadcountTimeline
+from utils.interval_engine import daily_totals, merge_overlaps, monthly_totals
+from utils.sales_index import SalesIndex, get_sales_index, sales_join_key
+
+try:
+    import duckdb
+except ImportError:  # duckdb is optional; SQLite ships with Python
+    duckdb = None
+
+ENGINES = ("cube", "pandas", "sql")
+QUERY_ENGINE = os.environ.get("WORKLENSE_QUERY_ENGINE", "cube")
+BATCH_ROWS = 100_000  # Parquet rows per insert when building the database
+KEEP_DATABASES = 2  # current and previous version, for renders started before a swap
+
+LEAVE_COLUMNS = ["employee_id", "start_date", "end_date", "leave_type", "value", "department"]
+
+DATABASE_ERRORS = (sqlite3.Error,) + ((duckdb.Error,) if duckdb is not None else ())
+
+_build_lock = threading.Lock()
+
+
+def frame_data_files(data_files, engine=QUERY_ENGINE):
+    """
+    The part of data_files to load as DataFrames: with the SQL engine only
+    the employee master (the sidebar filters it); the rest is queried from
+    the database.
+    """
+    if engine == "sql":
+        return {key: path for key, path in data_files.items() if key == "employee_master"}
+    return dict(data_files)
+
+
+def _date_numbers(values, unit="D"):
+    """
+    Days (unit "D") or months ("M") since 1970-01 as nullable Int64, NA for
+    missing dates.
+    """
+    dates = pd.Series(values).to_numpy(dtype="datetime64[ns]").astype(f"datetime64[{unit}]")
+    missing = np.isnat(dates)
+    return pd.arrays.IntegerArray(np.where(missing, 0, dates.astype("int64")), missing)
+
+
+def leave_days(leave):
+    """
+    Recorded leave days per record (value), or calendar days when not recorded.
+    """
+    length = (leave["end_date"].fillna(leave["start_date"]) - leave["start_date"]).dt.days + 1
+    if "value" not in leave:
+        return length.fillna(0)
+    return pd.to_numeric(leave["value"], errors="coerce").fillna(length).fillna(0)
+
+
+def _leave_per_day(leave):
+    # Each record's leave days spread evenly over its calendar days
+    length = (leave["end_date"].fillna(leave["start_date"]) - leave["start_date"]).dt.days + 1
+    return (leave_days(leave) / length.where(length > 0)).fillna(0)
+
+
+class PandasEngine:
+    """
+    Group-bys over the (already filtered) frames of a ReportContext.
+    """
+
+    def __init__(self, ctx):
+        self.ctx = ctx
+
+    def value_counts(self, column, active_only=True):
+        frame = self.ctx.active if active_only else self.ctx.employees
+        counts = frame[column].value_counts()
+        counts = counts[counts > 0]
+        return pd.DataFrame({"value": counts.index.astype(object), "count": counts.to_numpy()})
+
+    def values(self, measure):
+        ctx = self.ctx
+        values = {"age": lambda: ctx.age, "tenure": lambda: ctx.tenure_yrs}.get(measure, lambda: ctx.employees[measure])()
+        return ctx.active_values(values)
+
+    def binned_counts(self, measure, bins):
+        return pd.cut(self.values(measure), bins=bins).value_counts(sort=False).to_numpy()
+
+    def fy_flows(self, fy_years):
+        ctx = self.ctx
+        ctc = ctx.employees["total_ctc_pa"].fillna(0) if ctx.has("total_ctc_pa") else None
+        return pd.DataFrame({
+            "joiners": count_by_fy(ctx.join_fy, fy_years),
+            "joiner_ctc": count_by_fy(ctx.join_fy, fy_years, weights=ctc) if ctc is not None else 0.0,
+            "leavers": count_by_fy(ctx.exit_fy, fy_years),
+        }, index=list(fy_years))
+
+    def timeline(self):
+        return HeadcountTimeline(self.ctx.employees)
+
+    def attrition(self):
+        return AttritionEngine(self.ctx.employees, self.ctx.now)
+
+    @cached_property
+    def selected_leave(self):
+        """
+        Leave records of the employees in the current selection, with their department.
+        """
+        ctx = self.ctx
+        leave = ctx.data.get("leave", pd.DataFrame())
+        needed = {"employee_id", "start_date", "end_date"}
+        if leave.empty or not needed <= set(leave.columns) or not ctx.has("employee_id"):
+            return pd.DataFrame(columns=LEAVE_COLUMNS)
+        rows = ctx.employee_rows(leave["employee_id"])
+        keep = rows >= 0
+        leave = leave[keep].reset_index(drop=True)
+        department = ctx.employees["department"].to_numpy()[rows[keep]] if ctx.has("department") else "All"
+        return leave.assign(department=department)
+
+    def leave_totals(self):
+        leave = self.selected_leave
+        return {
+            "days": float(leave_days(leave).sum()) if not leave.empty else 0.0,
+            "records": len(leave),
+            "employees": leave["employee_id"].nunique() if not leave.empty else 0,
+        }
+
+    def leave_days_by_month(self):
+        leave = self.selected_leave
+        if leave.empty:
+            return pd.Series(dtype="float64")
+        return monthly_totals(daily_totals(leave["start_date"], leave["end_date"], _leave_per_day(leave)))
+
+    def people_on_leave(self):
+        leave = self.selected_leave
+        if leave.empty:
+            return pd.Series(dtype="int64")
+        # Overlapping records of one employee count once per day
+        runs = merge_overlaps(leave["employee_id"], leave["start_date"], leave["end_date"])
+        return daily_totals(runs["start"], runs["end"]).round().astype(int)
+
+    def leave_mix(self):
+        leave = self.selected_leave
+        if leave.empty or "leave_type" not in leave:
+            return pd.DataFrame(columns=["department", "leave_type", "days"])
+        mix = (
+            leave.assign(days=leave_days(leave))
+            .groupby(["department", "leave_type"], observed=True)["days"].sum()
+            .reset_index()
+        )
+        return mix[mix["days"] > 0]
+
+    def sales_index(self):
+        """
+        The prebuilt SalesIndex for this data version, or None when sales cannot be joined.
+        """
+        ctx = self.ctx
+        sales = ctx.data.get("sales", pd.DataFrame())
+        key = sales_join_key(sales, ctx.employees)
+        if sales.empty or key is None or "sale_date" not in sales or "sale_amount_inr" not in sales:
+            return None
+        population = ctx.population
+        if "date_of_exit" in population:
+            population = population[population["date_of_exit"].isna()]
+        holders = population[key]
+        version = ctx.config.get("data_version")
+        return get_sales_index(sales, key, holders, version) if version else SalesIndex(sales, key, holders)
+
+
+def _connect(path, read_only=True):
+    if duckdb is not None:
+        return duckdb.connect(path, read_only=read_only)
+    if read_only:
+        return sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    return sqlite3.connect(path)
+
+
+def _sql_frame(df):
+    """
+    Plain column types for the database: categoricals as values, dates as day numbers.
+    """
+    out = {}
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.astype(object)
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            series = _date_numbers(series)
+        out[col] = series
+    return pd.DataFrame(out)
+
+
+def _insert(con, name, df, create):
+    if duckdb is not None:
+        con.register("_frame", df)
+        con.execute(f'CREATE TABLE "{name}" AS SELECT * FROM _frame' if create
+                    else f'INSERT INTO "{name}" SELECT * FROM _frame')
+        con.unregister("_frame")
+    else:
+        df.to_sql(name, con, index=False, if_exists="append")
+
+
+def _employee_table(df):
+    """
+    The employee master with the columns the SQL engine groups on: _row
+    (frame order), join/exit day and month (exit clamped to the join and
+    only for joined rows, as in HeadcountTimeline), FY codes and is_active.
+    """
+    frame = _sql_frame(df)
+    frame["_row"] = np.arange(len(df))
+    joins = df["date_of_joining"] if "date_of_joining" in df else pd.Series(pd.NaT, index=df.index)
+    exits = df["date_of_exit"] if "date_of_exit" in df else pd.Series(pd.NaT, index=df.index)
+    exits = exits.where(joins.notna()).where(~(exits < joins), joins)
+    frame["join_day"], frame["exit_day"] = _date_numbers(joins), _date_numbers(exits)
+    frame["join_month"], frame["exit_month"] = _date_numbers(joins, "M"), _date_numbers(exits, "M")
+    frame["join_fy"] = fiscal_year(df["date_of_joining"]) if "date_of_joining" in df else -1
+    frame["exit_fy"] = fiscal_year(df["date_of_exit"]) if "date_of_exit" in df else -1
+    frame["is_active"] = df["date_of_exit"].isna().astype(int) if "date_of_exit" in df else 1
+    return frame
+
+
+def _leave_tables(leave):
+    """
+    (leave, leave_day) rows for one batch of leave records: the records with
+    their leave days, and one row per employee and covered day with the
+    record's leave days per day and the day's month.
+    """
+    table = _sql_frame(leave)
+    table["days"] = leave_days(leave).to_numpy()
+    start = leave["start_date"].to_numpy(dtype="datetime64[ns]").astype("datetime64[D]")
+    end = leave["end_date"].fillna(leave["start_date"]).to_numpy(dtype="datetime64[ns]").astype("datetime64[D]")
+    valid = ~np.isnat(start) & ~np.isnat(end) & (end >= start)
+    length = np.where(valid, (end - start).astype("int64") + 1, 0)
+    record = np.repeat(np.arange(len(leave)), length)
+    offset = np.arange(len(record)) - np.repeat(np.cumsum(length) - length, length)
+    day = start[record] + offset
+    daily = pd.DataFrame({
+        "employee_id": leave["employee_id"].to_numpy()[record],
+        "day": day.astype("int64"),
+        "month": day.astype("datetime64[M]").astype("int64"),
+        "days": _leave_per_day(leave).to_numpy()[record],
+    })
+    return table, daily
+
+
+def _sales_table(sales):
+    table = _sql_frame(sales)
+    if "sale_date" in sales:
+        # SalesIndex month numbers: year * 12 + month - 1
+        table["sale_month"] = _date_numbers(sales["sale_date"], "M") + 1970 * 12
+    return table
+
+
+def _dataset_frames(key, path, version, batch_rows=BATCH_ROWS):
+    """
+    DataFrames of one dataset version, read from its Parquet cache one batch
+    at a time so the whole dataset is never in memory. Like load_dataset,
+    raises StaleVersionError when the file is no longer at version.
+    """
+    if not os.path.exists(path):
+        return
+    if pq is None:
+        yield shared_dataset(key, path, version)  # no Parquet cache to stream from
+        return
+    with cache_lock(path):
+        # Checked before ingesting: a file never loaded yet is versioned by its signature
+        if cached_version(path) != version:
+            raise StaleVersionError(f"{path} is no longer at version {version}")
+        ingest_excel(key, path)
+        if cache_revision(path) is None:
+            read_cached(path)  # not streamable: parsed whole once to build the cache
+        parquet_file = pq.ParquetFile(cache_paths(path)[0])
+        for batch in parquet_file.iter_batches(batch_size=batch_rows):
+            yield normalize_dataset(key, batch.to_pandas())
+
+
+def database_path(data_files, version, folder=None):
+    """
+    Database file of a report data set (the dataset names) at version,
+    in the .cache folder next to the data.
+    """
+    folder = folder or os.path.dirname(cache_paths(data_files["employee_master"])[0])
+    suffix = "duckdb" if duckdb is not None else "sqlite"
+    return os.path.join(folder, f"worklense-{'+'.join(sorted(data_files))}-{version}.{suffix}")
+
+
+def _remove_old_databases(path, keep=KEEP_DATABASES):
+    # Other versions of the same data set, newest first; the newest `keep` stay
+    prefix = path[:path.rindex("-") + 1]
+    suffix = os.path.splitext(path)[1]
+    others = sorted(glob.glob(glob.escape(prefix) + "*" + suffix), key=os.path.getmtime, reverse=True)
+    others = [other for other in others if other != path]
+    for old in others[keep - 1:]:
+        try:
+            os.remove(old)
+        except OSError:
+            pass  # Still being replaced or already removed by another process
+
+
+def build_database(employees, data_files, versions, version, folder=None):
+    """
+    Write the datasets of data_files at versions ({path: version}) to the
+    database file of this data set and version, unless it exists, and
+    remove the files of older versions. employees is the (unfiltered)
+    employee master frame; the other datasets are streamed from their
+    Parquet caches. Returns the path.
+    """
+    path = database_path(data_files, version, folder)
+    with _build_lock:
+        if os.path.exists(path):
+            return path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Unique per writer, so concurrent processes never share a build file
+        tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        con = _connect(tmp_path, read_only=False)
+        try:
+            _insert(con, "employee_master", _employee_table(employees), create=True)
+            for key, data_path in data_files.items():
+                if key == "employee_master":
+                    continue
+                created = set()
+                for frame in _dataset_frames(key, data_path, versions[data_path]):
+                    if key == "leave" and {"employee_id", "start_date", "end_date"} <= set(frame.columns):
+                        tables = dict(zip(("leave", "leave_day"), _leave_tables(frame)))
+                    elif key == "sales":
+                        tables = {"sales": _sales_table(frame)}
+                    else:
+                        tables = {key: _sql_frame(frame)}
+                    for name, table in tables.items():
+                        _insert(con, name, table, create=name not in created)
+                        created.add(name)
+            if duckdb is None:
+                con.commit()
+        except BaseException:
+            con.close()
+            os.remove(tmp_path)
+            raise
+        con.close()
+        os.replace(tmp_path, path)
+        _remove_old_databases(path)
+    return path
+
+
+class SqlTimeline:
+    """
+    HeadcountTimeline.as_of answered by the database: one aggregate query
+    for a batch of dates.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def as_of(self, dates):
+        """
+        Return (headcount, CTC sum) arrays for each date in dates.
+        """
+        days = pd.to_datetime(np.atleast_1d(dates)).to_numpy(dtype="datetime64[D]").astype("int64")
+        ctc = "COALESCE(total_ctc_pa, 0)" if self.engine.has("total_ctc_pa") else "0"
+        active, columns, params = "join_day <= ? AND (exit_day IS NULL OR exit_day > ?)", [], []
+        for i, day in enumerate(days):
+            columns.append(f"SUM(CASE WHEN {active} THEN 1 ELSE 0 END) AS h{i}")
+            columns.append(f"SUM(CASE WHEN {active} THEN {ctc} ELSE 0 END) AS v{i}")
+            params.extend([int(day)] * 4)
+        where, where_params = self.engine._where("join_day IS NOT NULL")
+        row = self.engine._query(f"SELECT {', '.join(columns)} FROM employee_master{where}",
+                                 params + where_params).fillna(0).iloc[0].to_numpy(dtype="float64")
+        return row[0::2].astype(np.int64), row[1::2]
+
+
+class SqlAttrition(MonthlyAttrition):
+    """
+    AttritionEngine's monthly events and cohort groups, counted by the database.
+    """
+
+    def __init__(self, engine, now=None):
+        super().__init__(now)
+        self.engine = engine
+        self._segments = {}
+
+    def segments(self, dims=()):
+        """
+        Index of the segments (observed dimension combinations, sorted) of dims.
+        """
+        dims = tuple(d for d in dims if self.engine.has(d))
+        if dims not in self._segments:
+            if not dims:
+                self._segments[dims] = pd.Index(["All"], name="segment")
+            else:
+                cols = ", ".join(f'"{d}"' for d in dims)
+                where, params = self.engine._where(*[f'"{d}" IS NOT NULL' for d in dims])
+                combos = self.engine._query(f"SELECT DISTINCT {cols} FROM employee_master{where}", params)
+                combos = combos.sort_values(list(dims), ignore_index=True)
+                index = pd.MultiIndex.from_frame(combos)
+                self._segments[dims] = index if len(dims) > 1 else index.get_level_values(0)
+        return dims, self._segments[dims]
+
+    def _grouped(self, dims, columns, conditions, params=()):
+        """
+        (segment code, result frame) of a GROUP BY dims plus columns.
+        """
+        dims, index = self.segments(dims)
+        keys = [f'"{d}"' for d in dims] + [expr for expr, _ in columns]
+        names = list(dims) + [name for _, name in columns]
+        where, where_params = self.engine._where(*conditions, *[f'"{d}" IS NOT NULL' for d in dims])
+        select = ", ".join(f"{expr} AS {name}" for expr, name in zip(keys, names))
+        frame = self.engine._query(
+            f"SELECT {select}, COUNT(*) AS n FROM employee_master{where} GROUP BY {', '.join(keys)}",
+            list(params) + where_params,
+        )
+        if not dims:
+            codes = np.zeros(len(frame), dtype=np.int64)
+        elif len(dims) == 1:
+            codes = index.get_indexer(frame[dims[0]])
+        else:
+            codes = index.get_indexer(pd.MultiIndex.from_frame(frame[list(dims)]))
+        return index, codes, frame
+
+    def _counts(self, dims, month_col, first, n_months):
+        index, codes, frame = self._grouped(dims, [(month_col, "month")],
+                                            [f"{month_col} IS NOT NULL", f"{month_col} < ?"], [first + n_months])
+        col = np.clip(frame["month"].to_numpy(dtype=np.int64) - first + 1, 0, None)
+        flat = codes * (n_months + 1) + col
+        counts = np.bincount(flat[codes >= 0], weights=frame["n"].to_numpy(dtype="float64")[codes >= 0],
+                             minlength=len(index) * (n_months + 1))
+        return index, counts.reshape(len(index), n_months + 1).astype(np.int64)
+
+    def monthly(self, first, n_months, dims=()):
+        index, joins = self._counts(dims, "join_month", first, n_months)
+        _, exits = self._counts(dims, "exit_month", first, n_months)
+        headcount = np.cumsum(joins - exits, axis=1)[:, 1:]
+        return index, headcount, exits[:, 1:]
+
+    def cohort_events(self, fy_years, dims, max_months):
+        cap = max_months + 1
+        # Months of tenure at exit (event) or up to now (censored), clipped to 0..cap
+        duration = f"(CASE WHEN exit_month IS NOT NULL THEN exit_month ELSE {self.current_month} END - join_month)"
+        capped = f"(CASE WHEN {duration} < 0 THEN 0 WHEN {duration} > {cap} THEN {cap} ELSE {duration} END)"
+        index, codes, frame = self._grouped(
+            dims,
+            [("join_fy", "fy"), (capped, "capped"), ("CASE WHEN exit_month IS NOT NULL THEN 1 ELSE 0 END", "exited")],
+            ["join_month IS NOT NULL", f"join_fy IN ({', '.join('?' * len(fy_years))})"],
+            [int(fy) for fy in fy_years],
+        )
+        slot = np.searchsorted(fy_years, frame["fy"].to_numpy(dtype=np.int64))
+        keep = codes >= 0
+        return (index, (codes * len(fy_years) + slot)[keep], frame["capped"].to_numpy(dtype=np.int64)[keep],
+                frame["exited"].to_numpy(dtype=bool)[keep], frame["n"].to_numpy(dtype="float64")[keep])
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _database_sales_index(path, key):
+    """
+    SalesIndex of the sales table in the database at path, built from its
+    revenue per key and month and the active employees per key.
+    """
+    engine = SqlEngine(path, {})
+    monthly = engine._query(
+        f'SELECT "{key}" AS key, sale_month, SUM(sale_amount_inr) AS amount FROM sales '
+        f'WHERE "{key}" IS NOT NULL AND sale_month IS NOT NULL GROUP BY "{key}", sale_month', [],
+    )
+    holders = engine._query(
+        f'SELECT "{key}" AS key, COUNT(*) AS n FROM employee_master '
+        f'WHERE is_active = 1 AND "{key}" IS NOT NULL GROUP BY "{key}"', [],
+    )
+    return SalesIndex.from_monthly(key, monthly["key"], monthly["sale_month"], monthly["amount"].fillna(0),
+                                   holders["key"], holders["n"])
+
+
+class SqlEngine:
+    """
+    The same group-bys as PandasEngine, pushed down to the embedded database.
+    """
+
+    def __init__(self, path, filters, now=None):
+        self.path = path
+        self.filters = {dim: list(values) for dim, values in filters.items() if values}
+        self.now = pd.Timestamp(now) if now is not None else pd.Timestamp.now()
+        self._columns = {}
+
+    def _query(self, sql, params):
+        con = _connect(self.path)
+        try:
+            cursor = con.execute(sql, params)
+            columns = [d[0] for d in cursor.description]
+            return pd.DataFrame(cursor.fetchall(), columns=columns)
+        finally:
+            con.close()
+
+    def columns(self, table):
+        """
+        Column names of table (empty when the database has no such table).
+        """
+        if table not in self._columns:
+            try:
+                self._columns[table] = list(self._query(f'SELECT * FROM "{table}" LIMIT 0', []).columns)
+            except DATABASE_ERRORS:
+                self._columns[table] = []
+        return self._columns[table]
+
+    def has(self, column):
+        return column in self.columns("employee_master")
+
+    def _where(self, *conditions):
+        clauses, params = list(conditions), []
+        for dim, values in self.filters.items():
+            clauses.append(f'"{dim}" IN ({", ".join("?" * len(values))})')
+            params.extend(v.item() if isinstance(v, np.generic) else v for v in values)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _today(self):
+        return int(np.datetime64(self.now, "D").astype("int64"))
+
+    def value_counts(self, column, active_only=True):
+        conditions = [f'"{column}" IS NOT NULL'] + (["is_active = 1"] if active_only else [])
+        where, params = self._where(*conditions)
+        return self._query(
+            f'SELECT "{column}" AS value, COUNT(*) AS count FROM employee_master{where} '
+            f'GROUP BY "{column}" ORDER BY count DESC',
+            params,
+        )
+
+    def values(self, measure):
+        # Projects the source column in row order; age and tenure are derived from
+        # its day numbers as in ReportContext (SQLite and DuckDB divide differently)
+        column = {"age": "date_of_birth", "tenure": "date_of_joining"}.get(measure, measure)
+        where, params = self._where("is_active = 1")
+        values = self._query(f'SELECT "{column}" AS value FROM employee_master{where} ORDER BY _row', params)["value"]
+        values = pd.to_numeric(values, errors="coerce").astype("float64")
+        if measure == "age":
+            return (self._today() - values) // 365
+        if measure == "tenure":
+            return (self._today() - values) / 365.25
+        return values
+
+    def binned_counts(self, measure, bins):
+        today, cases, params = self._today(), [], []
+        for i, (lo, hi) in enumerate(zip(bins[:-1], bins[1:])):
+            if measure == "age":
+                # Completed years (days // 365) in (lo, hi], compared on days
+                cases.append(f"WHEN (? - date_of_birth) >= ? AND (? - date_of_birth) < ? THEN {i}")
+                params.extend([today, 365 * (int(np.floor(lo)) + 1), today, 365 * (int(np.floor(hi)) + 1)])
+            elif measure == "tenure":
+                cases.append(f"WHEN (? - date_of_joining) / 365.25 > ? AND (? - date_of_joining) / 365.25 <= ? THEN {i}")
+                params.extend([today, float(lo), today, float(hi)])
+            else:
+                cases.append(f'WHEN "{measure}" > ? AND "{measure}" <= ? THEN {i}')
+                params.extend([float(lo), float(hi)])
+        where, where_params = self._where("is_active = 1")
+        frame = self._query(
+            f"SELECT bin, COUNT(*) AS n FROM (SELECT CASE {' '.join(cases)} END AS bin "
+            f"FROM employee_master{where}) AS binned WHERE bin IS NOT NULL GROUP BY bin",
+            params + where_params,
+        )
+        counts = np.zeros(len(bins) - 1, dtype=np.int64)
+        counts[frame["bin"].to_numpy(dtype=np.int64)] = frame["n"].to_numpy(dtype=np.int64)
+        return counts
+
+    def fy_flows(self, fy_years):
+        ctc = "COALESCE(total_ctc_pa, 0)" if self.has("total_ctc_pa") else "0"
+        where, params = self._where("join_fy BETWEEN ? AND ?")
+        joiners = self._query(
+            f"SELECT join_fy AS fy, COUNT(*) AS joiners, SUM({ctc}) AS joiner_ctc "
+            f"FROM employee_master{where} GROUP BY join_fy",
+            [fy_years[0], fy_years[-1]] + params,
+        ).set_index("fy")
+        where, params = self._where("exit_fy BETWEEN ? AND ?")
+        leavers = self._query(
+            f"SELECT exit_fy AS fy, COUNT(*) AS leavers FROM employee_master{where} GROUP BY exit_fy",
+            [fy_years[0], fy_years[-1]] + params,
+        ).set_index("fy")
+        flows = joiners.join(leavers, how="outer").reindex(list(fy_years)).fillna(0)
+        return flows[["joiners", "joiner_ctc", "leavers"]].astype("float64")
+
+    def timeline(self):
+        return SqlTimeline(self)
+
+    def attrition(self):
+        return SqlAttrition(self, self.now)
+
+    def _selected_ids(self):
+        """
+        (SQL, params) of the employee_ids in the selection.
+        """
+        where, params = self._where("employee_id IS NOT NULL")
+        return f"SELECT employee_id FROM employee_master{where}", params
+
+    def _has_leave(self):
+        return {"employee_id", "start_date", "end_date"} <= set(self.columns("leave")) and self.has("employee_id")
+
+    def leave_totals(self):
+        if not self._has_leave():
+            return {"days": 0.0, "records": 0, "employees": 0}
+        ids, params = self._selected_ids()
+        row = self._query(
+            "SELECT COALESCE(SUM(days), 0) AS days, COUNT(*) AS records, COUNT(DISTINCT employee_id) AS employees "
+            f"FROM leave WHERE employee_id IN ({ids})", params,
+        ).iloc[0]
+        return {"days": float(row["days"]), "records": int(row["records"]), "employees": int(row["employees"])}
+
+    def leave_days_by_month(self):
+        if not self._has_leave():
+            return pd.Series(dtype="float64")
+        ids, params = self._selected_ids()
+        monthly = self._query(
+            f"SELECT month, SUM(days) AS days FROM leave_day WHERE employee_id IN ({ids}) GROUP BY month", params,
+        )
+        if monthly.empty:
+            return pd.Series(dtype="float64")
+        months = np.arange(monthly["month"].min(), monthly["month"].max() + 1)
+        totals = monthly.set_index("month")["days"].reindex(months, fill_value=0.0).to_numpy(dtype="float64")
+        return pd.Series(totals, index=pd.DatetimeIndex(months.astype("datetime64[M]"), freq="MS"))
+
+    def people_on_leave(self):
+        if not self._has_leave():
+            return pd.Series(dtype="int64")
+        ids, params = self._selected_ids()
+        daily = self._query(
+            "SELECT day, COUNT(DISTINCT employee_id) AS people FROM leave_day "
+            f"WHERE employee_id IN ({ids}) GROUP BY day", params,
+        )
+        if daily.empty:
+            return pd.Series(dtype="int64")
+        days = np.arange(daily["day"].min(), daily["day"].max() + 1)
+        people = daily.set_index("day")["people"].reindex(days, fill_value=0).to_numpy(dtype=np.int64)
+        return pd.Series(people, index=pd.DatetimeIndex(days.astype("datetime64[D]"), freq="D"))
+
+    def leave_mix(self):
+        if not self._has_leave() or "leave_type" not in self.columns("leave"):
+            return pd.DataFrame(columns=["department", "leave_type", "days"])
+        # Department of each selected employee's first row, as employee_rows maps it
+        department = "e.department" if self.has("department") else "'All'"
+        where, params = self._where("employee_id IS NOT NULL")
+        return self._query(
+            f"SELECT {department} AS department, l.leave_type AS leave_type, SUM(l.days) AS days "
+            "FROM leave AS l JOIN employee_master AS e ON l.employee_id = e.employee_id "
+            f"WHERE e._row IN (SELECT MIN(_row) FROM employee_master{where} GROUP BY employee_id) "
+            f"AND {department} IS NOT NULL AND l.leave_type IS NOT NULL "
+            f"GROUP BY {department}, l.leave_type HAVING SUM(l.days) > 0 ORDER BY 1, 2",
+            params,
+        )
+
+    def sales_index(self):
+        columns = self.columns("sales")
+        key = sales_join_key(pd.DataFrame(columns=columns), pd.DataFrame(columns=self.columns("employee_master")))
+        if key is None or "sale_month" not in columns or "sale_amount_inr" not in columns:
+            return None
+        return _database_sales_index(self.path, key)
@@ -0,0 +1,112 @@
+# utils/report_cache.py
+
+"""
+Result cache in front of report run_report calls.
+
+Entries are keyed on (report name, data version, filter signature, as-of
+day) and hold the report dict with its Plotly figures serialized to JSON, so
+a hit rebuilds the page without recomputing any KPI or chart. The cache is
+an LRU bounded by a byte budget (WORKLENSE_REPORT_CACHE_MB, default 256).
+"""
+
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.io as pio
+import streamlit as st
+
+from utils.filter_index import filter_signature
+from utils.tracing import span
+
+REPORT_CACHE_MB = float(os.environ.get("WORKLENSE_REPORT_CACHE_MB", 256))
+
+
+def report_cache_key(report_name, data_version, filters, as_of):
+    """
+    Cache key for one report render.
+    """
+    return (report_name, data_version, filter_signature(filters), pd.Timestamp(as_of).date())
+
+
+def _serialize(report):
+    with span("report_cache.serialize", rows_in=len(report.get("charts", []))):
+        payload = dict(report)
+        # Figures as JSON; prepared chart data (dicts, see chart_renderers.metric_chart) as is
+        payload["charts"] = [chart if isinstance(chart, dict) else chart.to_json() for chart in report.get("charts", [])]
+        return pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _deserialize(blob):
+    with span("report_cache.deserialize"):
+        report = pickle.loads(blob)
+        report["charts"] = [chart if isinstance(chart, dict) else pio.from_json(chart) for chart in report["charts"]]
+        return report
+
+
+class ReportCache:
+    """
+    Byte-budgeted LRU cache of serialized report results.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return a fresh copy of the cached report for key, or None.
+        """
+        with self._lock:
+            blob = self._entries.get(key)
+            if blob is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return _deserialize(blob)
+
+    def put(self, key, report):
+        """
+        Store a report dict; entries larger than the whole budget are skipped.
+        """
+        blob = _serialize(report)
+        if len(blob) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old)
+            self._entries[key] = blob
+            self.bytes += len(blob)
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+@st.cache_resource(show_spinner=False)
+def get_report_cache():
+    """
+    Process-wide report cache shared by all sessions.
+    """
+    return ReportCache(int(REPORT_CACHE_MB * 1e6))
@@ -0,0 +1,189 @@
+# utils/report_context.py
+
+"""
+Per-rerun context handed to report prepare functions.
+
+run_report builds one ReportContext from (data, config); the active-employee
+view and derived columns (age, tenure, FY buckets, headcount timeline) are
+computed lazily on first access and shared by every chart of the rerun.
+The group-bys go through ctx.engine (see utils/query_engine.py). With the
+"cube" engine, headcounts and FY flows come from the OlapCube in config when
+it covers the selected filters; the "pandas" and "sql" engines never use it.
+"""
+
+from datetime import datetime
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from utils.data_handler import current_versions
+from utils.fiscal_calendar import current_fiscal_year, fiscal_year
+from utils.olap_cube import CubeTimeline, get_olap_cube
+from utils.query_engine import QUERY_ENGINE, PandasEngine, SqlEngine, build_database
+
+
+def build_report_config(emp_df, filters, version, data_files, now, versions=None, engine=QUERY_ENGINE):
+    """
+    The config dict run_report receives for one render: data version,
+    filters, the unfiltered employee master ("population"), the query
+    engine and what it reads, i.e. the OLAP cube of the (unfiltered)
+    employee master for "cube", the database of the report's data_files for
+    "sql". Used by app.py, the warm-up worker and the batch runner, so all
+    of them key and compute results the same way; versions ({path: version},
+    default current_versions) selects the data version.
+    """
+    config = {"data_version": version, "filters": filters, "population": emp_df, "engine": engine}
+    if engine == "cube":
+        config["cube"] = get_olap_cube(emp_df, version, pd.Timestamp(now).date(), data_files["employee_master"])
+    elif engine == "sql":
+        versions = versions or current_versions(data_files)
+        config["database"] = build_database(emp_df, data_files, versions, version)
+    return config
+
+
+class ReportContext:
+    """
+    Shared inputs and derived columns for one report render.
+    """
+
+    def __init__(self, data, config=None, now=None):
+        self.data = data
+        self.config = config or {}
+        self.now = pd.Timestamp(now or datetime.now())
+        self.current_fy = current_fiscal_year(self.now)
+
+    def has(self, col):
+        return col in self.employees.columns
+
+    @cached_property
+    def employees(self):
+        return self.data.get("employee_master", pd.DataFrame())
+
+    @cached_property
+    def population(self):
+        """
+        The unfiltered employee master (config["population"]), or the
+        selection itself when the config does not carry it.
+        """
+        return self.config.get("population", self.employees)
+
+    @cached_property
+    def active_mask(self):
+        """
+        Rows without an exit date (the "current" population of the charts).
+        """
+        if not self.has("date_of_exit"):
+            return np.ones(len(self.employees), dtype=bool)
+        return self.employees["date_of_exit"].isna().to_numpy()
+
+    @cached_property
+    def active(self):
+        if self.active_mask.all():
+            return self.employees
+        return self.employees[self.active_mask]
+
+    @cached_property
+    def age(self):
+        """
+        Completed years since date_of_birth (NaN when unknown).
+        """
+        return (self.now - self.employees["date_of_birth"]).dt.days // 365
+
+    @cached_property
+    def tenure_yrs(self):
+        """
+        Years since date_of_joining, up to the exit date for leavers (the
+        tenure distribution and the "avg_tenure" KPI use the active rows).
+        """
+        end = self.now
+        if self.has("date_of_exit"):
+            end = self.employees["date_of_exit"].fillna(self.now)
+        return (end - self.employees["date_of_joining"]).dt.days / 365.25
+
+    @cached_property
+    def join_fy(self):
+        """
+        Integer FY code of date_of_joining (-1 where missing).
+        """
+        return fiscal_year(self.employees["date_of_joining"])
+
+    @cached_property
+    def exit_fy(self):
+        """
+        Integer FY code of date_of_exit (-1 where missing).
+        """
+        return fiscal_year(self.employees["date_of_exit"])
+
+    @cached_property
+    def filters(self):
+        return self.config.get("filters", {})
+
+    @cached_property
+    def cube(self):
+        """
+        The OlapCube passed in config, if the engine is "cube" and the cube
+        can answer the current filters.
+        """
+        cube = self.config.get("cube")
+        if self.config.get("engine", QUERY_ENGINE) != "cube" or cube is None:
+            return None
+        return cube if cube.can_answer(self.filters) else None
+
+    @cached_property
+    def timeline(self):
+        if self.cube is not None:
+            return CubeTimeline(self.cube, self.filters, self.employees)
+        return self.engine.timeline()
+
+    @cached_property
+    def attrition(self):
+        """
+        Monthly attrition / cohort engine over the selected employees.
+        """
+        return self.engine.attrition()
+
+    @cached_property
+    def engine(self):
+        """
+        Query engine for the group-bys (see utils/query_engine.py).
+        """
+        if self.config.get("engine", QUERY_ENGINE) == "sql" and self.config.get("database"):
+            return SqlEngine(self.config["database"], self.filters, self.now)
+        return PandasEngine(self)
+
+    @cached_property
+    def employee_index(self):
+        """
+        (Index of employee_id, row position) over the first row of each ID.
+        """
+        ids = self.employees["employee_id"] if self.has("employee_id") else pd.Series(dtype="int64")
+        first = ~ids.duplicated().to_numpy()
+        return pd.Index(ids[first]), np.flatnonzero(first)
+
+    def employee_rows(self, ids):
+        """
+        Row positions in employees of ids (-1 where not in the selection).
+        """
+        index, positions = self.employee_index
+        found = index.get_indexer(ids)
+        rows = np.full(len(found), -1, dtype=np.int64)
+        hit = found >= 0
+        rows[hit] = positions[found[hit]]
+        return rows
+
+    def fy_flows(self, fy_years):
+        """
+        Joiners, joiner CTC and leavers per FY code (DataFrame indexed by fy_years).
+        """
+        if self.cube is not None:
+            flows = self.cube.flow(self.filters, fy_years)
+            if flows is not None:
+                return flows
+        return self.engine.fy_flows(fy_years)
+
+    def active_values(self, derived):
+        """
+        Restrict a derived Series (e.g. ctx.age) to the active rows.
+        """
+        return derived[self.active_mask]
@@ -0,0 +1,108 @@
+# utils/report_registry.py
+
+"""
+Registry of report modules under reports/.
+
+The folder is scanned once per process. Each report may declare a literal
+module-level REPORT_META dict, which is read with `ast` without importing
+the module:
+
+    REPORT_META = {
+        "title": "Executive Summary",
+        "datasets": {"employee_master": ["date_of_joining", ...]},
+        "filters": ["company", "department", ...],
+        "cacheable": True,
+    }
+
+"cacheable" (default True) says run_report returns a result dict that can
+be cached and precomputed; a report that draws itself with st.* and returns
+None sets it to False, so it is never run off the script thread.
+
+Modules are imported on first use, and only the datasets listed under
+"datasets" are loaded for the selected report. The declared columns also
+decide which workbook columns are ingested (see utils/excel_ingest.py).
+"""
+
+import ast
+import importlib
+import os
+from functools import lru_cache
+
+from utils.filter_index import FILTER_DIMENSIONS
+
+REPORT_FOLDER = "reports"
+
+
+def _read_meta(path):
+    with open(path) as f:
+        tree = ast.parse(f.read(), filename=path)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(target, ast.Name) and target.id == "REPORT_META" for target in node.targets
+        ):
+            return ast.literal_eval(node.value)
+    return {}
+
+
+@lru_cache(maxsize=None)
+def discover_reports(folder=REPORT_FOLDER):
+    """
+    Return {report name: metadata} for every report module in folder.
+    """
+    reports = {}
+    for filename in sorted(os.listdir(folder)):
+        if not filename.endswith(".py") or filename.startswith("_"):
+            continue
+        name = filename[:-3]
+        meta = _read_meta(os.path.join(folder, filename))
+        reports[name] = {
+            "name": name,
+            "module": f"{folder}.{name}",
+            "title": meta.get("title", name.replace("_", " ").title()),
+            "datasets": meta.get("datasets", {"employee_master": []}),
+            "filters": meta.get("filters", FILTER_DIMENSIONS),
+            "cacheable": meta.get("cacheable", True),
+        }
+    return reports
+
+
+def report_names():
+    return list(discover_reports())
+
+
+def get_report_meta(name):
+    return discover_reports()[name]
+
+
+def load_report(name):
+    """
+    Import (on first use) and return the module of report name.
+    """
+    return importlib.import_module(get_report_meta(name)["module"])
+
+
+def required_data_files(name, data_files):
+    """
+    Subset of data_files ({dataset: path}) needed by report name.
+    The employee master is always included because the sidebar filters it.
+    """
+    keys = set(get_report_meta(name)["datasets"]) | {"employee_master"}
+    return {key: path for key, path in data_files.items() if key in keys}
+
+
+def dataset_columns(key):
+    """
+    Columns of dataset key that any report declares (for the employee master
+    including the report filters), or None when a report uses the dataset
+    without listing its columns, so every column has to be kept.
+    """
+    columns = set()
+    for meta in discover_reports().values():
+        if key == "employee_master":
+            columns.update(meta["filters"])
+        if key not in meta["datasets"]:
+            continue
+        if not meta["datasets"][key]:
+            return None
+        columns.update(meta["datasets"][key])
+    return sorted(columns)
@@ -0,0 +1,139 @@
+# utils/sales_index.py
+
+"""
+Precomputed monthly sales per join key, for re-slicing by sidebar selection.
+
+Sales rows are aggregated once per data version into a (keys x months)
+revenue matrix. The join key is employee_id when the sales extract carries
+it, otherwise cost_center. A selection of employees is answered by looking
+their keys up in the key index and summing the matching rows of the matrix,
+so changing filters never re-joins the raw transactions.
+
+A key shared by several employees (a cost center) has its revenue split
+evenly over its holders: the active employees of the whole, unfiltered
+population carrying it, counted once per data version. A selection then
+gets 1 / holders of the revenue per selected employee, so the revenue of
+disjoint selections adds up to the revenue of their union.
+"""
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+SALES_KEYS = ["employee_id", "cost_center"]
+
+
+def sales_join_key(sales, employees):
+    """
+    First of SALES_KEYS present in both frames, or None.
+    """
+    for key in SALES_KEYS:
+        if key in sales.columns and key in employees.columns:
+            return key
+    return None
+
+
+def _key_values(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(object)
+    return series
+
+
+class SalesIndex:
+    """
+    Revenue per join key and calendar month, and the number of active
+    employees (holders) per key. holders are the join key values of the
+    active employees of the whole population.
+    """
+
+    def __init__(self, sales, key, holders, date_col="sale_date", amount_col="sale_amount_inr"):
+        sales = sales[sales[key].notna() & sales[date_col].notna()]
+        month_no = (sales[date_col].dt.year * 12 + sales[date_col].dt.month - 1).to_numpy(dtype=np.int64)
+        amounts = pd.to_numeric(sales[amount_col], errors="coerce").fillna(0).to_numpy(dtype="float64")
+        counts = _key_values(pd.Series(holders)).value_counts()
+        self._build(key, _key_values(sales[key]), month_no, amounts, counts.index, counts.to_numpy())
+
+    @classmethod
+    def from_monthly(cls, key, keys, month_no, amounts, holder_keys, holder_counts):
+        """
+        Index from revenue already summed per key and month number
+        (year * 12 + month - 1) and holders counted per key, e.g. by
+        database group-bys.
+        """
+        index = cls.__new__(cls)
+        index._build(key, _key_values(pd.Series(keys)), np.asarray(month_no, dtype=np.int64),
+                     np.asarray(amounts, dtype="float64"), _key_values(pd.Series(holder_keys)),
+                     np.asarray(holder_counts, dtype=np.int64))
+        return index
+
+    def _build(self, key, keys, month_no, amounts, holder_keys, holder_counts):
+        self.key = key
+        self.keys = pd.Index(keys.unique())
+        if len(month_no):
+            first, n_months = month_no.min(), int(month_no.max() - month_no.min() + 1)
+            self.months = pd.date_range(pd.Timestamp(first // 12, first % 12 + 1, 1), periods=n_months, freq="MS")
+        else:
+            first, n_months = 0, 0
+            self.months = pd.DatetimeIndex([])
+
+        n_keys = len(self.keys)
+        key_pos = self.keys.get_indexer(keys)
+        month_pos = month_no - first
+        self.revenue = np.bincount(
+            key_pos * n_months + month_pos, weights=amounts, minlength=n_keys * n_months
+        ).reshape(n_keys, n_months)
+
+        holder_pos = self.keys.get_indexer(holder_keys)
+        known = holder_pos >= 0
+        self.holders = np.bincount(holder_pos[known], weights=holder_counts[known], minlength=n_keys).astype(np.int64)
+
+    def positions(self, values):
+        """
+        Row positions in the revenue matrix of join key values (-1 when unknown).
+        """
+        return self.keys.get_indexer(_key_values(pd.Series(values)))
+
+    def shares(self, values):
+        """
+        Matrix row position and revenue share of each selected active
+        employee's key value: 1 / holders of the key (0 when unknown).
+        """
+        pos = self.positions(values)
+        holders = np.zeros(len(pos), dtype=np.int64)
+        holders[pos >= 0] = self.holders[pos[pos >= 0]]
+        return pos, np.divide(1.0, holders, out=np.zeros(len(pos)), where=holders > 0)
+
+    def monthly(self, values):
+        """
+        Monthly revenue (Series by month start) of the distinct keys in values.
+        """
+        pos = np.unique(self.positions(values))
+        pos = pos[pos >= 0]
+        return pd.Series(self.revenue[pos].sum(axis=0), index=self.months)
+
+    def totals(self, start=None, end=None):
+        """
+        Revenue per key over the months from start to end (inclusive).
+        """
+        keep = np.ones(len(self.months), dtype=bool)
+        if start is not None:
+            keep &= self.months >= pd.Timestamp(start)
+        if end is not None:
+            keep &= self.months <= pd.Timestamp(end)
+        return self.revenue[:, keep].sum(axis=1)
+
+
+def rolling_sum(series, months):
+    """
+    Trailing sum over `months` periods via a cumulative sum (partial at the start).
+    """
+    total = series.cumsum()
+    return total - total.shift(months, fill_value=0)
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def get_sales_index(_sales, key, _holders, data_version):
+    """
+    Build the sales index once per data version.
+    """
+    return SalesIndex(_sales, key, _holders)
@@ -0,0 +1,34 @@
+# utils/schema.py
+
+"""
+Declared column types for each dataset. They are applied once at load time
+(utils/data_handler.normalize_dataset) so report code can rely on datetime64
+dates, categorical dimensions and compact numerics.
+"""
+
+# Sidebar / grouping dimensions of the employee master
+EMPLOYEE_DIMENSIONS = [
+    "company", "business_unit", "department", "function", "zone",
+    "area", "band", "employment_type", "gender", "qualification_type",
+]
+
+DATASET_SCHEMAS = {
+    "employee_master": {
+        "dates": ["date_of_joining", "date_of_exit", "date_of_birth"],
+        "categories": EMPLOYEE_DIMENSIONS,
+        "integers": ["employee_id", "total_ctc_pa"],
+        "floats": ["total_exp_yrs"],
+    },
+    "leave": {
+        "dates": ["start_date", "end_date"],
+        "categories": ["leave_type"],
+        "integers": ["employee_id", "value"],
+        "floats": [],
+    },
+    "sales": {
+        "dates": ["sale_date"],
+        "categories": ["cost_center"],
+        "integers": ["sale_amount_inr"],
+        "floats": [],
+    },
+}
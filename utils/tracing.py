@@ -0,0 +1,209 @@
+# utils/tracing.py
+
+"""
+Lightweight per-page tracing.
+
+A page run starts a Trace with start_trace(); code inside it opens spans
+with `with span(name, rows_in=...)` or the @traced() decorator. Each span
+records wall time, rows in/out and the change in process resident memory,
+nested under the span that was open when it started (also across the chart
+thread pool, which copies the context).
+
+finish_trace() writes one JSON line per span to the "worklense.trace"
+logger and, when WORKLENSE_TRACE_FILE is set, appends them to that file.
+Without an active trace span() returns a shared no-op object and @traced
+calls straight through, so instrumentation is close to free when disabled.
+Tracing is on for every page when WORKLENSE_TRACE=1, or per session from
+the sidebar debug panel.
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+logger = logging.getLogger("worklense.trace")
+
+TRACE_ENABLED = os.environ.get("WORKLENSE_TRACE", "") not in ("", "0")
+TRACE_FILE = os.environ.get("WORKLENSE_TRACE_FILE")
+
+_trace = contextvars.ContextVar("worklense_trace", default=None)
+_parent = contextvars.ContextVar("worklense_span", default=None)
+_file_lock = threading.Lock()
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+
+def _rss_bytes():
+    """
+    Current resident set size (Linux /proc), or 0 where unavailable.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def _rows(value):
+    """
+    Row count of a DataFrame/Series/list, or of a ReportContext's employees.
+    """
+    if hasattr(value, "employees"):
+        value = value.employees
+    if hasattr(value, "__len__") and not isinstance(value, (str, bytes, dict)):
+        try:
+            return len(value)
+        except TypeError:
+            return None
+    return None
+
+
+class Trace:
+    """
+    Spans recorded during one page run.
+    """
+
+    def __init__(self, name, **attrs):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.attrs = attrs
+        self.started = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        with self._lock:
+            self.spans.append(record)
+
+    def records(self):
+        """
+        Span records in start order.
+        """
+        with self._lock:
+            return sorted(self.spans, key=lambda record: record["start_ms"])
+
+
+class Span:
+    def __init__(self, trace, name, rows_in=None):
+        self.trace = trace
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+
+    def set(self, rows_out=None, rows_in=None):
+        if rows_out is not None:
+            self.rows_out = rows_out
+        if rows_in is not None:
+            self.rows_in = rows_in
+
+    def __enter__(self):
+        parent = _parent.get()
+        self.parent = parent.name if parent is not None else None
+        self.depth = parent.depth + 1 if parent is not None else 0
+        self._token = _parent.set(self)
+        self._rss = _rss_bytes()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        _parent.reset(self._token)
+        self.trace.add({
+            "trace": self.trace.id,
+            "page": self.trace.name,
+            "span": self.name,
+            "parent": self.parent,
+            "depth": self.depth,
+            "start_ms": round((self._start - self.trace.started) * 1000, 3),
+            "wall_ms": round((end - self._start) * 1000, 3),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "mem_delta_mb": round((_rss_bytes() - self._rss) / 1e6, 3),
+            "thread": threading.current_thread().name,
+            "error": repr(exc) if exc is not None else None,
+        })
+        return False
+
+
+class _NoopSpan:
+    def set(self, rows_out=None, rows_in=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def start_trace(name, enabled=True, **attrs):
+    """
+    Make a new Trace current for this page run (or clear it when not
+    enabled, so spans from an earlier run on this thread stop recording).
+    """
+    trace = Trace(name, **attrs) if enabled else None
+    _trace.set(trace)
+    _parent.set(None)
+    return trace
+
+
+def current_trace():
+    return _trace.get()
+
+
+def span(name, rows_in=None):
+    """
+    Context manager timing a block inside the current trace (no-op without one).
+    """
+    trace = _trace.get()
+    if trace is None:
+        return _NOOP
+    return Span(trace, name, rows_in)
+
+
+def traced(name=None):
+    """
+    Decorator opening a span around each call. rows_in is taken from the
+    first argument and rows_out from the result when they have a length.
+    """
+    def decorate(fn):
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            trace = _trace.get()
+            if trace is None:
+                return fn(*args, **kwargs)
+            with Span(trace, span_name, _rows(args[0]) if args else None) as s:
+                result = fn(*args, **kwargs)
+                s.set(rows_out=_rows(result))
+                return result
+        return wrapper
+    return decorate
+
+
+def finish_trace(trace):
+    """
+    Emit the spans of trace as JSON lines and return them.
+    """
+    if trace is None:
+        return []
+    records = trace.records()
+    lines = [json.dumps({**record, **trace.attrs}, default=str) for record in records]
+    for line in lines:
+        logger.info(line)
+    if TRACE_FILE and lines:
+        with _file_lock, open(TRACE_FILE, "a") as f:
+            f.write("\n".join(lines) + "\n")
+    return records
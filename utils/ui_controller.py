@@ -1,54 +1,123 @@
+import pandas as pd
+import plotly.graph_objects as go
 import streamlit as st
-import os
 
-def setup_sidebar(emp_df):
-    # 1. Report selector at top
-    report_folder = "reports"
-    report_modules = [f[:-3] for f in os.listdir(report_folder) if f.endswith(".py") and not f.startswith("_")]
+from chart_config import CHART_CONFIG
+from kpi_design import render_kpi_grid
+from utils.chart_renderers import available_chart_types, render_prepared
+from utils.filter_index import FILTER_DIMENSIONS, FilterIndex
+from utils.report_registry import get_report_meta, report_names
+from utils.tracing import span
+
+FILTER_LABELS = {
+    "company": "Company",
+    "business_unit": "Business Unit",
+    "department": "Department",
+    "function": "Function",
+    "zone": "Zone",
+    "area": "Area",
+    "band": "Band",
+    "employment_type": "Employment Type",
+}
+
+# Sidebar layout: filters side-by-side in two columns
+FILTER_COLUMNS = (
+    ["company", "department", "zone", "band"],
+    ["business_unit", "function", "area", "employment_type"],
+)
+
+# Chart style label -> Plotly template (None keeps the figure's own template)
+CHART_TEMPLATES = {
+    "Default": None,
+    "White Classic": "simple_white",
+    "Seaborn": "seaborn",
+    "Plotly": "plotly",
+    "Dark": "plotly_dark",
+}
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def get_filter_index(_emp_df, data_version):
+    """
+    Build the sidebar filter index once per data version.
+    """
+    return FilterIndex(_emp_df)
+
+def select_report():
+    # 1. Report selector at top (report list comes from the cached registry)
     selected_report = st.sidebar.selectbox(
         "Select Report",
-        report_modules,
-        format_func=lambda x: x.replace("_", " ").title()
+        report_names(),
+        format_func=lambda name: get_report_meta(name)["title"]
     )
     st.session_state["selected_report"] = selected_report
+    return selected_report
 
-    # 2. Filters: side-by-side in two columns
+def setup_sidebar(emp_df, data_version=None, filters=FILTER_DIMENSIONS):
+    # 2. Filters: side-by-side in two columns (options come from the prebuilt index)
+    index = get_filter_index(emp_df, data_version) if data_version else FilterIndex(emp_df)
+    options = index.options
+    # Only the filters the selected report supports are shown; the rest stay empty
+    filter_dict = {dim: [] for dim in FILTER_DIMENSIONS}
     col1, col2 = st.sidebar.columns(2, gap="small")
-    with col1:
-        company = st.multiselect("Company", sorted(emp_df['company'].dropna().unique()))
-        department = st.multiselect("Department", sorted(emp_df['department'].dropna().unique()))
-        zone = st.multiselect("Zone", sorted(emp_df['zone'].dropna().unique()))
-        band = st.multiselect("Band", sorted(emp_df['band'].dropna().unique()))
-    with col2:
-        business_unit = st.multiselect("Business Unit", sorted(emp_df['business_unit'].dropna().unique()))
-        function = st.multiselect("Function", sorted(emp_df['function'].dropna().unique()))
-        area = st.multiselect("Area", sorted(emp_df['area'].dropna().unique()))
-        employment_type = st.multiselect("Employment Type", sorted(emp_df['employment_type'].dropna().unique()))
-
-    filter_dict = {
-        "company": company,
-        "business_unit": business_unit,
-        "department": department,
-        "function": function,
-        "zone": zone,
-        "area": area,
-        "band": band,
-        "employment_type": employment_type,
-    }
+    for column, dims in ((col1, FILTER_COLUMNS[0]), (col2, FILTER_COLUMNS[1])):
+        with column:
+            for dim in dims:
+                if dim in filters:
+                    filter_dict[dim] = st.multiselect(FILTER_LABELS[dim], options.get(dim, []))
 
     # 3. Chart style selector at bottom, with minimal spacing above
     st.sidebar.markdown('<div style="margin-top: 10px"></div>', unsafe_allow_html=True)
-    chart_styles = ["Default", "White Classic", "Seaborn", "Plotly", "Dark"]
-    chart_style = st.sidebar.selectbox("Chart Style (Plotly Theme)", chart_styles)
+    chart_style = st.sidebar.selectbox("Chart Style (Plotly Theme)", list(CHART_TEMPLATES))
+    st.session_state["plotly_template"] = CHART_TEMPLATES[chart_style]
 
     # 4. Apply filters to the dataframe (data updates as filters change)
-    filtered_df = emp_df.copy()
-    for col, selected in filter_dict.items():
-        if selected:
-            filtered_df = filtered_df[filtered_df[col].isin(selected)]
+    filtered_df = index.apply(emp_df, filter_dict)
 
     return filtered_df, filter_dict
 
+def render_kpis(kpis, per_row=4):
+    # KPI cards go out as one HTML element instead of one per card
+    st.markdown(render_kpi_grid(kpis, per_row), unsafe_allow_html=True)
+
+def render_chart(fig, key):
+    # The sidebar chart style is applied at render time, so cached figures stay theme-free
+    template = st.session_state.get("plotly_template")
+    if template:
+        fig = go.Figure(fig).update_layout(template=template)
+    with span(f"plotly_chart[{key}]", rows_in=len(fig.data)):
+        st.plotly_chart(fig, use_container_width=True, key=f"chart_{key}")
+
+@st.fragment
+def render_metric_chart(chart, key):
+    # Its own fragment: changing the chart type reruns only this chart, drawn
+    # from the prepared data in the (cached) report, not the report itself
+    options = available_chart_types(chart["metric"])
+    chart_type = None
+    if len(options) > 1:
+        chart_type = st.selectbox(f"{CHART_CONFIG[chart['metric']]['description']} chart type", options,
+                                  key=f"chart_type_{key}", format_func=lambda name: name.replace("_", " ").title(),
+                                  label_visibility="collapsed")
+    fig = render_prepared(chart, chart_type)
+    if fig is not None:
+        render_chart(fig, key)
+
+def render_debug_panel(records, cache_stats=None):
+    # Opt-in performance panel at the bottom of the sidebar
+    st.sidebar.checkbox("Performance debug", key="debug_trace")
+    if not st.session_state.get("debug_trace") or not records:
+        return
+    with st.sidebar.expander("Performance trace", expanded=True):
+        spans = pd.DataFrame(records)
+        top = spans[spans["depth"] == 0]
+        st.caption(f"{top['wall_ms'].sum():,.0f} ms in {len(spans)} spans")
+        if cache_stats:
+            lookups = cache_stats["hits"] + cache_stats["misses"]
+            st.caption(f"Report cache: {cache_stats['hits']:,} hits / {lookups:,} lookups, "
+                       f"{cache_stats['entries']:,} entries, {cache_stats['bytes'] / 1e6:,.1f} MB")
+        spans["span"] = ["\u00a0\u00a0" * depth + name for depth, name in zip(spans["depth"], spans["span"])]
+        st.dataframe(spans[["span", "wall_ms", "rows_in", "rows_out", "mem_delta_mb", "thread"]],
+                     hide_index=True, use_container_width=True)
+
 def render_footer():
     st.markdown("""
         <div class="custom-footer">
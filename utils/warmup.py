@@ -0,0 +1,269 @@
+# utils/warmup.py
+
+"""
+Background warm-up worker and data-file watcher.
+
+One WarmupWorker thread per server process (started by app.py through
+get_warmup_worker) keeps the expensive state ready before a user asks for
+it:
+
+1. It polls the data files (mtime/size of each source and its cache
+   manifest, so delta extracts count too) every WARMUP_INTERVAL seconds. A
+   change is acted on once the signature has been stable for one more poll,
+   so a file that is still being copied in is not read half-written.
+2. For a changed data set it builds the Parquet cache and the shared
+   frames (load_dataset) of the new version, then warms, for every report,
+   the filter index, the OLAP cube (or SQL database, see
+   utils/query_engine.py) and the report results of the most
+   requested report/filter combinations (learned from record_usage, which
+   app.py calls on every render).
+3. Only then does it publish the new versions (data_handler.publish_versions),
+   which also pins their frames so they cannot be evicted from the bounded
+   dataset cache and re-read from a newer file. Sessions read one
+   consistent snapshot of the published versions per rerun, so they switch
+   from a fully built old version to a fully built new one and never see a
+   half-built state. If the rebuild fails, the old
+   version stays published and the next poll retries.
+
+Between changes it re-warms combinations that dropped out of the report
+cache or whose as-of day rolled over. Disable it with WORKLENSE_WARMUP=0.
+
+`python -m utils.warmup` builds the Parquet caches of all data files once,
+e.g. from a deploy hook before the server starts.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+import streamlit as st
+
+from utils.columnar_store import cache_paths, cache_revision, cached_version, read_cached
+from utils.data_handler import DATA_FILES, data_version, load_all_data, load_dataset, publish_versions
+from utils.excel_ingest import ingest_excel
+from utils.filter_index import FILTER_DIMENSIONS, filter_signature
+from utils.query_engine import frame_data_files
+from utils.report_cache import get_report_cache, report_cache_key
+from utils.report_context import build_report_config
+from utils.report_registry import get_report_meta, load_report, report_names, required_data_files
+from utils.ui_controller import get_filter_index
+
+logger = logging.getLogger(__name__)
+
+WARMUP_ENABLED = os.environ.get("WORKLENSE_WARMUP", "1") not in ("", "0")
+WARMUP_INTERVAL = float(os.environ.get("WORKLENSE_WARMUP_INTERVAL", 5))
+WARMUP_TOP_N = int(os.environ.get("WORKLENSE_WARMUP_TOP_N", 10))
+USAGE_WINDOW = 1000  # recent renders the top combinations are learned from
+
+# (report name, filter signature) of recent renders, newest last
+_usage = deque(maxlen=USAGE_WINDOW)
+
+
+def record_usage(report_name, filters):
+    """
+    Note one render of report_name with filters ({dim: [values]}).
+    """
+    _usage.append((report_name, filter_signature(filters)))
+
+
+def top_combinations(n=WARMUP_TOP_N):
+    """
+    The n most requested (report name, filters) pairs of the recent renders.
+    """
+    counts = Counter(list(_usage))
+    return [(report, {dim: list(values) for dim, values in signature})
+            for (report, signature), _ in counts.most_common(n)]
+
+
+def file_signature(path):
+    """
+    Cheap change marker of a data file: stat of the source and its manifest.
+    """
+    stats = []
+    for candidate in (path, cache_paths(path)[1]):
+        try:
+            stat = os.stat(candidate)
+            stats.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            stats.append(None)
+    return tuple(stats)
+
+
+def build_versions(data_files=DATA_FILES):
+    """
+    Build the Parquet cache and the shared frame of each data file and
+    return {path: version} of what was built.
+    """
+    versions = {}
+    for key, path in data_files.items():
+        ingest_excel(key, path)
+        if os.path.exists(path) and cache_revision(path) is None:
+            read_cached(path)  # not streamable: parse whole; the frame is read back below
+        version = cached_version(path)
+        load_dataset(key, path, version)
+        versions[path] = version
+    return versions
+
+
+class WarmupWorker:
+    """
+    Daemon thread that watches the data files and keeps caches warm.
+    """
+
+    def __init__(self, data_files=DATA_FILES, interval=WARMUP_INTERVAL, top_n=WARMUP_TOP_N):
+        self.data_files = dict(data_files)
+        self.interval = interval
+        self.top_n = top_n
+        self.versions = {}
+        self.signatures = {}
+        self.pending = {}
+        self.uncacheable = set()
+        self.status = "starting"
+        self.last_build = None
+        self.error = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="worklense-warmup", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as exc:  # never let the worker die; retry next poll
+                self.error = repr(exc)
+                self.status = "error"
+                logger.exception("Warm-up pass failed")
+            self._stop.wait(self.interval)
+
+    def poll(self):
+        """
+        One watcher pass: rebuild and publish changed data, else re-warm.
+        """
+        signatures = {path: file_signature(path) for path in self.data_files.values()}
+        changed = {path for path, sig in signatures.items() if sig != self.signatures.get(path)}
+        # Act only on files whose signature held still since the last poll
+        settled = {path for path in changed if self.pending.get(path) == signatures[path]}
+        self.pending = {path: signatures[path] for path in changed}
+        if not self.versions or settled:
+            self.refresh(signatures)
+        else:
+            self.warm(self.versions)
+
+    def refresh(self, signatures):
+        """
+        Build every changed file's new version, warm it, then publish.
+        """
+        self.status = "building"
+        started = time.perf_counter()
+        versions = build_versions(self.data_files)
+        if versions != self.versions:
+            self.warm(versions)
+            publish_versions(versions)
+            logger.info("Published data versions %s", versions)
+        self.versions = versions
+        # The source as seen before the build (so an edit made meanwhile is
+        # picked up next poll), the manifest as the build left it
+        self.signatures = {path: (signatures[path][0], file_signature(path)[1]) for path in signatures}
+        self.pending = {}
+        self.last_build = {"at": datetime.now().isoformat(timespec="seconds"),
+                           "seconds": round(time.perf_counter() - started, 2)}
+        self.status = "ready"
+        self.error = None
+
+    def warm(self, versions):
+        """
+        Warm filter indexes, cubes and the top report results for versions.
+        """
+        now = datetime.now()
+        combos = [(name, {}) for name in report_names()] + top_combinations(self.top_n)
+        warmed = set()
+        for report_name, filters in combos:
+            if self._stop.is_set():
+                return
+            if report_name in self.uncacheable or (report_name, filter_signature(filters)) in warmed:
+                continue
+            warmed.add((report_name, filter_signature(filters)))
+            try:
+                self.warm_report(report_name, filters, versions, now)
+            except Exception:
+                logger.exception("Warm-up of %s %s failed", report_name, filters)
+
+    def warm_report(self, report_name, filters, versions, now):
+        """
+        Compute and cache one report render exactly as app.py would.
+        """
+        if not get_report_meta(report_name)["cacheable"]:
+            # Self-rendering reports need a script run context to draw into
+            self.uncacheable.add(report_name)
+            return
+        data_files = required_data_files(report_name, self.data_files)
+        report_versions = {path: versions[path] for path in data_files.values()}
+        version = data_version(data_files, report_versions)
+        # The same shape of selection setup_sidebar returns
+        allowed = get_report_meta(report_name)["filters"]
+        filters = {dim: list(filters.get(dim, [])) if dim in allowed else [] for dim in FILTER_DIMENSIONS}
+        cache = get_report_cache()
+        key = report_cache_key(report_name, version, filters, now)
+        if key in cache:
+            return
+
+        data = load_all_data(frame_data_files(data_files), report_versions)
+        emp_df = data["employee_master"]
+        index = get_filter_index(emp_df, version)
+        data["employee_master"] = index.apply(emp_df, filters)
+
+        mod = load_report(report_name)
+        if not hasattr(mod, "run_report"):
+            self.uncacheable.add(report_name)
+            return
+        report = mod.run_report(data, build_report_config(emp_df, filters, version, data_files, now, report_versions))
+        if isinstance(report, dict) and report.get("errors"):
+            logger.warning("Warm-up of %s %s left out failed charts %s", report_name, filters, report["errors"])
+        elif isinstance(report, dict):
+            cache.put(key, report)
+        else:
+            # Returned no result although REPORT_META does not say so
+            logger.warning("%s returned no result dict; set \"cacheable\": False in its REPORT_META", report_name)
+            self.uncacheable.add(report_name)
+
+    def stats(self):
+        return {
+            "status": self.status,
+            "versions": dict(self.versions),
+            "last_build": self.last_build,
+            "pending": sorted(self.pending),
+            "uncacheable": sorted(self.uncacheable),
+            "error": self.error,
+        }
+
+
+@st.cache_resource(show_spinner=False)
+def get_warmup_worker():
+    """
+    The process-wide warm-up worker, started on first use.
+    """
+    return WarmupWorker().start()
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO)
+    started = time.perf_counter()
+    for path, version in build_versions(DATA_FILES).items():
+        print(f"{path}: {version}")
+    print(f"Data caches ready in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())